@@ -0,0 +1,162 @@
+"""
+Batched processing of stored recordings.
+
+Bulk work over many audio predictions (feature export, re-scoring) would
+otherwise decode and featurize one clip per worker call. Here recordings are
+fetched from storage with bounded concurrency, grouped into batches of
+AUDIO_BATCH_SIZE and handed to the process pool as one call per batch, which
+stacks the clips and runs the spectral pipeline once for all of them
+(features.extract_features_batch). The next batch is fetched while the
+current one is on the pool, and results are yielded per clip, in input
+order, so callers can stream them.
+"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from storage import LocalStorage, StorageBackend, prediction_storage
+from upload_queue import AUDIO_STATUS_STORED, get_spool_storage
+from audio_ingest import new_spool_key
+
+load_dotenv()
+
+AUDIO_BATCH_SIZE = int(os.getenv("AUDIO_BATCH_SIZE", "8"))
+AUDIO_BATCH_FETCH_CONCURRENCY = int(os.getenv("AUDIO_BATCH_FETCH_CONCURRENCY", "4"))
+# Upper bound on prediction IDs per batch features request
+AUDIO_BATCH_MAX_ITEMS = int(os.getenv("AUDIO_BATCH_MAX_ITEMS", "500"))
+
+BatchRunner = Callable[[List[str]], Awaitable[List[Dict[str, Any]]]]
+
+
+class FetchedAudio:
+    """A recording available as a local file (or why it is not)"""
+
+    def __init__(self, path: Optional[str] = None, temporary: bool = False, error: Optional[str] = None):
+        self.path = path
+        self.temporary = temporary
+        self.error = error
+
+    def cleanup(self):
+        if self.temporary and self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def _download(storage: StorageBackend, key: str, path: Path):
+    """Copy a stored object into a local file (blocking)"""
+    try:
+        with open(path, "wb") as out:
+            for chunk in storage.get(key):
+                out.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+
+async def fetch_audio(prediction: Dict[str, Any], semaphore: asyncio.Semaphore) -> FetchedAudio:
+    """
+    Local file for a prediction's recording
+
+    Used in place for local storage, downloaded to the spool otherwise.
+    """
+    status = prediction.get("status", AUDIO_STATUS_STORED)
+    if status != AUDIO_STATUS_STORED:
+        return FetchedAudio(error=f"Audio file is not available (upload {status})")
+    try:
+        storage, key = prediction_storage(prediction)
+    except ValueError as e:
+        return FetchedAudio(error=str(e))
+    if not key:
+        return FetchedAudio(error="Audio file not found")
+
+    if isinstance(storage, LocalStorage):
+        path = storage.path(key)
+        if not path.exists():
+            return FetchedAudio(error="Audio file not found")
+        return FetchedAudio(str(path))
+
+    extension = key.rsplit(".", 1)[-1] if "." in key else "wav"
+    path = get_spool_storage().path(new_spool_key(extension))
+    async with semaphore:
+        try:
+            await run_in_threadpool(_download, storage, key, path)
+        except Exception as e:
+            return FetchedAudio(error=f"Could not fetch audio from {storage.name} storage: {e}")
+    return FetchedAudio(str(path), temporary=True)
+
+
+async def _chunks(predictions, size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Group a list or an async iterator (e.g. a Motor cursor) of documents into lists"""
+    batch = []
+    if hasattr(predictions, "__aiter__"):
+        async for prediction in predictions:
+            batch.append(prediction)
+            if len(batch) == size:
+                yield batch
+                batch = []
+    else:
+        for prediction in predictions:
+            batch.append(prediction)
+            if len(batch) == size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+async def _next_batch(batches):
+    """Next batch from _chunks, or None (anext() needs Python 3.10)"""
+    try:
+        return await batches.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def iter_audio_batches(
+    predictions,
+    run_batch: BatchRunner,
+    batch_size: int = AUDIO_BATCH_SIZE
+) -> AsyncIterator[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Yield (prediction, result) for every prediction, in order
+
+    `run_batch` gets the local paths of one batch and returns one result per
+    path (e.g. inference_engine.featurize_batch or classify_batch). Clips that
+    cannot be fetched or processed get {"error": ...} instead of failing the
+    batch.
+    """
+    semaphore = asyncio.Semaphore(AUDIO_BATCH_FETCH_CONCURRENCY)
+
+    async def fetch(batch):
+        return await asyncio.gather(*(fetch_audio(prediction, semaphore) for prediction in batch))
+
+    batches = _chunks(predictions, batch_size)
+    batch = await _next_batch(batches)
+    pending = asyncio.ensure_future(fetch(batch)) if batch else None
+    try:
+        while batch:
+            fetched = await pending
+            pending = None
+            try:
+                # Fetch the next batch while this one is on the process pool
+                next_batch = await _next_batch(batches)
+                pending = asyncio.ensure_future(fetch(next_batch)) if next_batch else None
+
+                paths = [item.path for item in fetched if item.path]
+                try:
+                    results = iter(await run_batch(paths) if paths else [])
+                except Exception as e:
+                    results = iter([{"error": f"Batch failed: {e}"}] * len(paths))
+                for prediction, item in zip(batch, fetched):
+                    yield prediction, next(results) if item.path else {"error": item.error}
+            finally:
+                for item in fetched:
+                    item.cleanup()
+            batch = next_batch
+    finally:
+        if pending is not None:
+            # Let in-flight downloads finish so their files can be removed
+            for item in await pending:
+                item.cleanup()
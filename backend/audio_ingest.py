@@ -0,0 +1,257 @@
+"""
+Shared ingest path for recorded audio.
+
+Both the one-shot upload (POST /audio-predictions/) and the finalize step of
+resumable uploads end here: the audio is stored (or spooled for the
+background upload queue, see upload_queue.py), the prediction document is
+inserted and the user's stats are incremented (see prediction_stats.py).
+
+With AUDIO_DEDUP_ENABLED the upload is hashed (SHA-256, streamed from the
+spooled file) before anything is sent to storage. Objects are stored under
+their content hash and tracked in the audio_blobs collection with a
+reference count, so re-submitted or retried recordings reuse the stored
+object instead of being uploaded again.
+
+With AUDIO_NORMALIZE_ENABLED new recordings are downmixed, resampled and
+re-encoded before being stored (see audio_normalize.py).
+"""
+
+import hashlib
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from models import AudioPredictionResponse
+from repositories import AudioBlobRepository, AudioPredictionRepository, PredictionStatsRepository
+from prediction_stats import bucket_hour, prediction_label, stats_increment
+from storage import StorageBackend, StoredObject, get_storage_backend
+from audio_normalize import AUDIO_NORMALIZE_ENABLED, media_fields, normalize_for_storage, remove_normalized
+from upload_stream import UploadTooLarge, upload_too_large_error
+from upload_queue import (
+    AUDIO_INGEST_MODE,
+    AUDIO_STATUS_PENDING,
+    AUDIO_STATUS_STORED,
+    get_spool_storage,
+    upload_queue
+)
+
+load_dotenv()
+
+AUDIO_DEDUP_ENABLED = os.getenv("AUDIO_DEDUP_ENABLED", "True").lower() == "true"
+
+
+def content_sha256(reader) -> str:
+    """Hash an upload in bounded chunks, then rewind it for storing (blocking)"""
+    digest = hashlib.sha256()
+    for chunk in reader:
+        digest.update(chunk)
+    reader.seek(0)
+    return digest.hexdigest()
+
+
+def blob_fields(stored: StoredObject, media: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """audio_blobs fields describing a stored object (and how it was normalized)"""
+    return {"storage_key": stored.key, "audio_url": stored.url, "size": stored.size, "media": media or {}}
+
+
+def label_fields(prediction_result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Top-level label and confidence, so history lists need not load prediction_result"""
+    prediction_result = prediction_result or {}
+    return {
+        "predicted_label": prediction_label(prediction_result),
+        "confidence": prediction_result.get("confidence")
+    }
+
+
+def new_spool_key(extension: str) -> str:
+    return f"{uuid4().hex}.{extension}" if extension else uuid4().hex
+
+
+async def store_normalized(
+    storage: StorageBackend,
+    storage_key: str,
+    reader,
+    extension: str,
+    tags: List[str]
+) -> Tuple[StoredObject, Dict[str, Any]]:
+    """Spool an upload to disk, normalize it on the process pool and store the result"""
+    spool = get_spool_storage()
+    spooled = await run_in_threadpool(spool.put, new_spool_key(extension), reader)
+    path = spool.path(spooled.key)
+    normalized = await normalize_for_storage(path)
+    try:
+        if normalized is None:
+            return await run_in_threadpool(storage.put_file, storage_key, path, extension, tags), {}
+        stored = await run_in_threadpool(
+            storage.put_file, storage_key, normalized.path, normalized.extension, tags
+        )
+        return stored, media_fields(normalized)
+    finally:
+        remove_normalized(normalized)
+        spool.delete(spooled.key)
+
+
+async def discard_stored_audio(
+    storage: StorageBackend,
+    audio_blobs: AudioBlobRepository,
+    content_hash: Optional[str],
+    referenced: bool,
+    stored: Optional[StoredObject],
+    spooled: Optional[StoredObject]
+):
+    """Undo the storing of an upload whose prediction document could not be saved"""
+    try:
+        if spooled is not None:
+            await run_in_threadpool(get_spool_storage().delete, spooled.key)
+        orphan_key = None
+        if referenced:
+            # Drop our reference; the object goes only if nobody else uses it
+            released = await audio_blobs.release(content_hash, storage.name)
+            orphan_key = released["storage_key"] if released else None
+        elif stored is not None and not content_hash:
+            orphan_key = stored.key
+        if orphan_key:
+            await run_in_threadpool(storage.delete, orphan_key)
+    except Exception as e:
+        print(f"Warning: Could not clean up audio after a failed save: {e}")
+
+
+def check_ingest_capacity():
+    """Reject early with 503 when background ingest is on and its queue is full"""
+    if AUDIO_INGEST_MODE == "async" and not upload_queue.has_room():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Upload queue is full, please retry",
+            headers={"Retry-After": "5"}
+        )
+
+
+async def ingest_audio(
+    reader,
+    filename: str,
+    user_id: str,
+    prediction_data: Dict[str, Any],
+    audio_size: Optional[int],
+    audio_duration: Optional[float],
+    audio_predictions: AudioPredictionRepository,
+    audio_blobs: AudioBlobRepository,
+    prediction_stats: PredictionStatsRepository
+) -> Tuple[AudioPredictionResponse, bool]:
+    """
+    Store the audio read from `reader` and save its prediction document
+
+    Returns the response and whether the upload was handed to the background
+    queue (the caller answers 202 instead of 201 in that case).
+    """
+    check_ingest_capacity()
+
+    # Generate unique storage key
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    file_extension = Path(filename).suffix.replace(".", "")
+    storage_key = f"audio_predictions/{user_id}_{timestamp}"
+    storage = get_storage_backend()
+    background = AUDIO_INGEST_MODE == "async"
+    content_hash = None
+    tags = [user_id, "audio_prediction"]
+    media: Dict[str, Any] = {}
+    stored: Optional[StoredObject] = None
+    spooled: Optional[StoredObject] = None
+    # Whether we hold a reference on the audio_blobs entry (released on failure)
+    referenced = False
+
+    try:
+        blob = None
+        if AUDIO_DEDUP_ENABLED:
+            # Content-addressed key: identical recordings map to one object
+            content_hash = await run_in_threadpool(content_sha256, reader)
+            storage_key = f"audio_predictions/{content_hash}"
+            blob = await audio_blobs.acquire(content_hash, storage.name)
+            referenced = blob is not None
+
+        if blob is not None:
+            # Same recording is already stored: reuse it, nothing to upload
+            stored = StoredObject(blob["storage_key"], blob["audio_url"], blob["size"])
+            media = blob.get("media") or {}
+            background = False
+        elif background:
+            spooled = await run_in_threadpool(get_spool_storage().put, new_spool_key(file_extension), reader)
+        elif AUDIO_NORMALIZE_ENABLED:
+            stored, media = await store_normalized(storage, storage_key, reader, file_extension, tags)
+        else:
+            stored = await run_in_threadpool(storage.put, storage_key, reader, file_extension, tags)
+
+        if content_hash and blob is None and stored is not None:
+            blob = await audio_blobs.add_reference(content_hash, storage.name, blob_fields(stored, media))
+            referenced = True
+            stored = StoredObject(blob["storage_key"], blob["audio_url"], blob["size"])
+            media = blob.get("media") or {}
+
+        audio_size_bytes = media.get("audio_size") or audio_size or (spooled.size if background else stored.size)
+        audio_duration = media.get("audio_duration") or audio_duration
+
+    except UploadTooLarge:
+        await discard_stored_audio(storage, audio_blobs, content_hash, referenced, stored, spooled)
+        raise upload_too_large_error()
+    except Exception as e:
+        await discard_stored_audio(storage, audio_blobs, content_hash, referenced, stored, spooled)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to upload audio to {storage.name} storage: {str(e)}"
+        )
+
+    # Save to database
+    audio_prediction_doc = {
+        "user_id": user_id,
+        "audio_filename": filename,
+        "storage_backend": storage.name,
+        "storage_key": storage_key if background else stored.key,
+        "audio_url": "" if background else stored.url,
+        "audio_size": audio_size_bytes,
+        "audio_duration": audio_duration,
+        "prediction_result": prediction_data,
+        **label_fields(prediction_data),
+        "status": AUDIO_STATUS_PENDING if background else AUDIO_STATUS_STORED,
+        "created_at": datetime.utcnow()
+    }
+    # Original size, codec and sample rate of normalized recordings
+    audio_prediction_doc.update({k: v for k, v in media.items() if k not in audio_prediction_doc})
+    if content_hash:
+        audio_prediction_doc["content_sha256"] = content_hash
+    if background:
+        audio_prediction_doc["spool_key"] = spooled.key
+
+    try:
+        inserted_id = await audio_predictions.insert(audio_prediction_doc)
+    except Exception:
+        await discard_stored_audio(storage, audio_blobs, content_hash, referenced, stored, spooled)
+        raise
+    try:
+        await prediction_stats.increment(
+            user_id, bucket_hour(audio_prediction_doc["created_at"]), stats_increment(prediction_data)
+        )
+    except Exception as e:
+        # The recording is saved; rebuild_prediction_stats.py repairs the counts
+        print(f"Warning: Could not update prediction stats: {e}")
+
+    if background:
+        # Room was checked above; if another request took the last slot the
+        # document stays pending and is picked up on the next restart
+        upload_queue.enqueue(inserted_id)
+
+    response = AudioPredictionResponse(
+        id=inserted_id,
+        user_id=user_id,
+        audio_filename=filename,
+        audio_url=audio_prediction_doc["audio_url"],
+        audio_size=audio_size_bytes,
+        audio_duration=audio_duration,
+        prediction_result=prediction_data,
+        original_size=audio_prediction_doc.get("original_size"),
+        status=audio_prediction_doc["status"],
+        created_at=audio_prediction_doc["created_at"]
+    )
+    return response, background
@@ -0,0 +1,280 @@
+"""
+Optional normalization of uploaded audio before it is stored.
+
+Clients upload whatever container, sample rate and channel layout they
+recorded. With AUDIO_NORMALIZE_ENABLED the ingest path decodes each new
+upload, downmixes it to mono, resamples it to the model's sample rate and
+re-encodes it compactly before storing it:
+
+- with ffmpeg on the PATH: any input format -> Opus in Ogg (AUDIO_NORMALIZE_CODEC=opus)
+  or 16-bit PCM WAV (AUDIO_NORMALIZE_CODEC=wav)
+- without ffmpeg: WAV input only -> 16-bit PCM WAV, decoded and resampled with numpy
+
+Decoding and encoding are CPU bound, so they run in a process pool sized by
+AUDIO_NORMALIZE_WORKERS. Uploads that cannot be normalized are stored as
+they are.
+"""
+
+import asyncio
+import os
+import shutil
+import subprocess
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+AUDIO_NORMALIZE_ENABLED = os.getenv("AUDIO_NORMALIZE_ENABLED", "False").lower() == "true"
+AUDIO_NORMALIZE_SAMPLE_RATE = int(os.getenv("AUDIO_NORMALIZE_SAMPLE_RATE", "16000"))
+AUDIO_NORMALIZE_CODEC = os.getenv("AUDIO_NORMALIZE_CODEC", "opus").lower()
+AUDIO_NORMALIZE_BITRATE = os.getenv("AUDIO_NORMALIZE_BITRATE", "24k")
+AUDIO_NORMALIZE_WORKERS = int(os.getenv("AUDIO_NORMALIZE_WORKERS", str(os.cpu_count() or 1)))
+AUDIO_NORMALIZE_TIMEOUT_SECONDS = float(os.getenv("AUDIO_NORMALIZE_TIMEOUT_SECONDS", "60"))
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
+
+
+class NormalizeError(Exception):
+    """Raised when an upload cannot be decoded or re-encoded"""
+
+
+class NormalizedAudio:
+    """A normalized copy of an upload, written next to the original"""
+
+    def __init__(self, path: str, codec: str, sample_rate: int, duration: float, original_size: int):
+        self.path = path
+        self.codec = codec
+        self.sample_rate = sample_rate
+        self.duration = duration
+        self.original_size = original_size
+        self.size = os.path.getsize(path)
+
+    @property
+    def extension(self) -> str:
+        return "ogg" if self.codec == "opus" else "wav"
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which(FFMPEG_BINARY) is not None
+
+
+def _ffmpeg_normalize(src: str, dst: str, codec: str, sample_rate: int, bitrate: str) -> float:
+    """Transcode with ffmpeg; returns the duration in seconds"""
+    if codec == "opus":
+        encode = ["-c:a", "libopus", "-b:a", bitrate, "-f", "ogg"]
+    else:
+        encode = ["-c:a", "pcm_s16le", "-f", "wav"]
+    command = [
+        FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", src, "-vn", "-ac", "1", "-ar", str(sample_rate), *encode, dst
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True, timeout=AUDIO_NORMALIZE_TIMEOUT_SECONDS)
+        probe = subprocess.run(
+            [FFPROBE_BINARY, "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", dst],
+            check=True, capture_output=True, text=True, timeout=AUDIO_NORMALIZE_TIMEOUT_SECONDS
+        )
+    except subprocess.CalledProcessError as e:
+        raise NormalizeError(e.stderr.decode(errors="replace").strip() if isinstance(e.stderr, bytes) else str(e))
+    except (subprocess.TimeoutExpired, FileNotFoundError) as e:
+        raise NormalizeError(str(e))
+    try:
+        return float(probe.stdout.strip())
+    except ValueError:
+        return 0.0
+
+
+def read_wav(path: str) -> Tuple["np.ndarray", int]:
+    """Decode a PCM WAV to mono float32 samples in [-1, 1]; returns (samples, sample rate)"""
+    import numpy as np
+
+    try:
+        with wave.open(path, "rb") as reader:
+            channels = reader.getnchannels()
+            width = reader.getsampwidth()
+            source_rate = reader.getframerate()
+            frames = reader.readframes(reader.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise NormalizeError(f"Unsupported audio (install ffmpeg for non-WAV input): {e}")
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise NormalizeError(f"Unsupported WAV sample width: {width * 8} bits")
+
+    # Downmix to mono
+    samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+    return samples, source_rate
+
+
+def resample(samples: "np.ndarray", source_rate: int, sample_rate: int) -> "np.ndarray":
+    """Band-limited resampling by truncating (or zero-padding) the spectrum"""
+    import numpy as np
+
+    if source_rate == sample_rate or not len(samples):
+        return samples
+    target_length = max(1, int(round(len(samples) * sample_rate / source_rate)))
+    spectrum = np.fft.rfft(samples)
+    bins = target_length // 2 + 1
+    if bins <= len(spectrum):
+        spectrum = spectrum[:bins]
+    else:
+        spectrum = np.pad(spectrum, (0, bins - len(spectrum)))
+    resampled = np.fft.irfft(spectrum, n=target_length) * (target_length / len(samples))
+    return resampled.astype(np.float32)
+
+
+def decode_audio(path: str, sample_rate: int = AUDIO_NORMALIZE_SAMPLE_RATE) -> "np.ndarray":
+    """Decode audio to mono float32 samples at `sample_rate` (WAV only without ffmpeg)"""
+    import numpy as np
+
+    if ffmpeg_available():
+        command = [
+            FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-i", path, "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "f32le", "-"
+        ]
+        try:
+            decoded = subprocess.run(command, check=True, capture_output=True, timeout=AUDIO_NORMALIZE_TIMEOUT_SECONDS)
+        except subprocess.CalledProcessError as e:
+            raise NormalizeError(e.stderr.decode(errors="replace").strip())
+        except subprocess.TimeoutExpired as e:
+            raise NormalizeError(str(e))
+        return np.frombuffer(decoded.stdout, dtype="<f4")
+
+    samples, source_rate = read_wav(path)
+    return resample(samples, source_rate, sample_rate)
+
+
+def _wav_normalize(src: str, dst: str, sample_rate: int) -> float:
+    """Downmix and resample a PCM WAV with numpy; returns the duration in seconds"""
+    import numpy as np
+
+    samples, source_rate = read_wav(src)
+    duration = len(samples) / source_rate if source_rate else 0.0
+    samples = resample(samples, source_rate, sample_rate)
+
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(dst, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        writer.writeframes(pcm.tobytes())
+    return duration
+
+
+def normalize_file(
+    src: str,
+    codec: str = AUDIO_NORMALIZE_CODEC,
+    sample_rate: int = AUDIO_NORMALIZE_SAMPLE_RATE,
+    bitrate: str = AUDIO_NORMALIZE_BITRATE
+) -> NormalizedAudio:
+    """Write a mono, resampled, re-encoded copy of `src` next to it (runs in a worker process)"""
+    use_ffmpeg = ffmpeg_available()
+    if not use_ffmpeg:
+        codec = "wav"
+    dst = str(Path(src).with_suffix(".normalized." + ("ogg" if codec == "opus" else "wav")))
+    try:
+        if use_ffmpeg:
+            duration = _ffmpeg_normalize(src, dst, codec, sample_rate, bitrate)
+        else:
+            duration = _wav_normalize(src, dst, sample_rate)
+    except BaseException:
+        if os.path.exists(dst):
+            os.unlink(dst)
+        raise
+    return NormalizedAudio(dst, codec, sample_rate, duration, os.path.getsize(src))
+
+
+class AudioNormalizer:
+    """Process pool running normalize_file, with throughput counters"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._files = 0
+        self._failed = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._audio_seconds = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def normalize(self, src: str) -> NormalizedAudio:
+        """Normalize a file on the pool; raises NormalizeError if it cannot be decoded"""
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._get_executor(), normalize_file, src)
+        except Exception:
+            self._failed += 1
+            raise
+        self._files += 1
+        self._bytes_in += result.original_size
+        self._bytes_out += result.size
+        self._audio_seconds += result.duration
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Pipeline counters for the /metrics endpoint"""
+        return {
+            "enabled": AUDIO_NORMALIZE_ENABLED,
+            "ffmpeg": ffmpeg_available(),
+            "codec": AUDIO_NORMALIZE_CODEC if ffmpeg_available() else "wav",
+            "sample_rate": AUDIO_NORMALIZE_SAMPLE_RATE,
+            "workers": self.workers,
+            "files": self._files,
+            "failed": self._failed,
+            "bytes_in": self._bytes_in,
+            "bytes_out": self._bytes_out,
+            "compression_ratio": round(self._bytes_in / self._bytes_out, 2) if self._bytes_out else 0,
+            "audio_seconds": round(self._audio_seconds, 2),
+        }
+
+    def shutdown(self):
+        """Stop the worker processes (called on app shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+audio_normalizer = AudioNormalizer(AUDIO_NORMALIZE_WORKERS)
+
+
+async def normalize_for_storage(path) -> Optional[NormalizedAudio]:
+    """Normalized copy of a file, or None to store it as uploaded (disabled or undecodable)"""
+    if not AUDIO_NORMALIZE_ENABLED:
+        return None
+    try:
+        return await audio_normalizer.normalize(str(path))
+    except Exception as e:
+        print(f"Warning: Could not normalize audio, storing it as uploaded: {e}")
+        return None
+
+
+def remove_normalized(normalized: Optional[NormalizedAudio]):
+    """Delete the temporary normalized copy once it has been stored"""
+    if normalized is not None and os.path.exists(normalized.path):
+        os.unlink(normalized.path)
+
+
+def media_fields(normalized: NormalizedAudio) -> Dict[str, Any]:
+    """Document fields describing a normalized recording"""
+    fields = {
+        "audio_size": normalized.size,
+        "original_size": normalized.original_size,
+        "audio_codec": normalized.codec,
+        "sample_rate": normalized.sample_rate,
+    }
+    if normalized.duration:
+        # Measured from the decoded audio, so it replaces the client's value
+        fields["audio_duration"] = round(normalized.duration, 3)
+    return fields
@@ -0,0 +1,166 @@
+"""
+Per-connection state for live predictions over a WebSocket.
+
+Instead of recording a whole clip and uploading it, the listening screen can
+send microphone PCM as it is captured. Each connection keeps the most recent
+STREAM_WINDOW_SECONDS of audio in a fixed-size ring buffer. The first window
+is classified once STREAM_MIN_SECONDS have arrived and then again after
+every STREAM_HOP_SECONDS of new audio; when the model is still busy with the
+previous window the hop is skipped instead of queued, so partial results
+never fall behind the microphone.
+"""
+
+import os
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+STREAM_WINDOW_SECONDS = float(os.getenv("STREAM_WINDOW_SECONDS", "2.0"))
+STREAM_HOP_SECONDS = float(os.getenv("STREAM_HOP_SECONDS", "0.5"))
+STREAM_MIN_SECONDS = float(os.getenv("STREAM_MIN_SECONDS", "0.5"))
+# Per connection; longer streams are closed
+STREAM_MAX_SECONDS = float(os.getenv("STREAM_MAX_SECONDS", "300"))
+STREAM_MAX_CONNECTIONS = int(os.getenv("STREAM_MAX_CONNECTIONS", "50"))
+STREAM_MAX_FRAME_BYTES = int(os.getenv("STREAM_MAX_FRAME_BYTES", str(256 * 1024)))
+
+# Accepted PCM encodings (little-endian, interleaved channels)
+STREAM_SAMPLE_FORMATS = {"s16le": ("<i2", 32768.0), "f32le": ("<f4", 1.0)}
+
+
+class StreamError(Exception):
+    """Raised for streams that cannot be handled (bad parameters, too long, oversized frames)"""
+
+
+class RingBuffer:
+    """Fixed-capacity float32 buffer holding the most recent samples"""
+
+    def __init__(self, capacity: int):
+        import numpy as np
+        self.capacity = max(1, capacity)
+        self.total = 0
+        self._data = np.zeros(self.capacity, dtype=np.float32)
+        self._write = 0
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    def write(self, samples: "np.ndarray"):
+        self.total += len(samples)
+        samples = samples[-self.capacity:]
+        end = self._write + len(samples)
+        if end <= self.capacity:
+            self._data[self._write:end] = samples
+        else:
+            split = self.capacity - self._write
+            self._data[self._write:] = samples[:split]
+            self._data[:end - self.capacity] = samples[split:]
+        self._write = end % self.capacity
+
+    def snapshot(self) -> "np.ndarray":
+        """Copy of the buffered samples, oldest first"""
+        import numpy as np
+        if self.total < self.capacity:
+            return self._data[:self.total].copy()
+        return np.concatenate((self._data[self._write:], self._data[:self._write]))
+
+
+class AudioStream:
+    """PCM decoding, windowing and result aggregation for one connection"""
+
+    def __init__(self, sample_rate: int, sample_format: str = "s16le", channels: int = 1):
+        import numpy as np
+        if sample_format not in STREAM_SAMPLE_FORMATS:
+            raise StreamError(f"format must be one of {', '.join(STREAM_SAMPLE_FORMATS)}")
+        if not 8000 <= sample_rate <= 96000:
+            raise StreamError("sample_rate must be between 8000 and 96000")
+        if not 1 <= channels <= 2:
+            raise StreamError("channels must be 1 or 2")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._dtype, self._scale = STREAM_SAMPLE_FORMATS[sample_format]
+        self._frame_bytes = np.dtype(self._dtype).itemsize * channels
+        self._remainder = b""
+        self.buffer = RingBuffer(int(STREAM_WINDOW_SECONDS * sample_rate))
+        self._min_samples = int(STREAM_MIN_SECONDS * sample_rate)
+        self._hop_samples = max(1, int(STREAM_HOP_SECONDS * sample_rate))
+        self._next_at = self._min_samples
+        self._probability_sums: Dict[str, float] = {}
+        self.windows = 0
+
+    @property
+    def received_seconds(self) -> float:
+        return self.buffer.total / self.sample_rate
+
+    def feed(self, data: bytes):
+        """Append a binary message of PCM; a sample split across messages is carried over"""
+        if len(data) > STREAM_MAX_FRAME_BYTES:
+            raise StreamError(f"Frames are limited to {STREAM_MAX_FRAME_BYTES} bytes")
+        import numpy as np
+        data = self._remainder + data
+        usable = len(data) - len(data) % self._frame_bytes
+        self._remainder = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self._dtype).astype(np.float32) / self._scale
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1)
+        self.buffer.write(samples)
+        if self.received_seconds > STREAM_MAX_SECONDS:
+            raise StreamError(f"Streams are limited to {STREAM_MAX_SECONDS:.0f} seconds")
+
+    def window_due(self) -> bool:
+        return self.buffer.total >= self._next_at
+
+    def take_window(self) -> "np.ndarray":
+        """Current window for classification; the next one is due a hop from now"""
+        self._next_at = self.buffer.total + self._hop_samples
+        return self.buffer.snapshot()
+
+    def skip_window(self):
+        """Drop the due window (the model is busy); the next one is due a hop from now"""
+        self._next_at = self.buffer.total + self._hop_samples
+
+    def add_result(self, result: Dict[str, Any]):
+        self.windows += 1
+        for label, probability in result.get("probabilities", {}).items():
+            self._probability_sums[label] = self._probability_sums.get(label, 0.0) + probability
+
+    def summary(self) -> Optional[Dict[str, Any]]:
+        """Whole-stream result: probabilities averaged over every classified window"""
+        if not self.windows:
+            return None
+        probabilities = {label: round(total / self.windows, 4) for label, total in self._probability_sums.items()}
+        label = max(probabilities, key=probabilities.get)
+        return {
+            "predicted_label": label,
+            "confidence": round(probabilities[label] * 100, 2),
+            "probabilities": probabilities,
+            "windows": self.windows,
+            "audio_seconds": round(self.received_seconds, 3),
+        }
+
+
+class StreamStats:
+    """Connection and window counters for the /metrics endpoint"""
+
+    def __init__(self):
+        self.active = 0
+        self.connections = 0
+        self.rejected = 0
+        self.windows = 0
+        self.skipped_hops = 0
+        self.first_result_ms_total = 0.0
+        self.first_results = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "max_connections": STREAM_MAX_CONNECTIONS,
+            "connections": self.connections,
+            "rejected": self.rejected,
+            "windows": self.windows,
+            "skipped_hops": self.skipped_hops,
+            "avg_time_to_first_result_ms": round(self.first_result_ms_total / self.first_results, 1) if self.first_results else 0,
+        }
+
+
+stream_stats = StreamStats()
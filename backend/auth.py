@@ -1,19 +1,57 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
+import uuid
+import hashlib
+import secrets
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, WebSocket, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 from dotenv import load_dotenv
+from password_pool import password_pool
+from token_cache import token_cache
+from repositories import RevokedTokenRepository, get_revoked_token_repository
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "30"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing: the first scheme is used for new hashes, the others are
+# still accepted but rehashed on the next successful login.
+PASSWORD_SCHEMES = [
+    scheme.strip() for scheme in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if scheme.strip()
+]
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "2"))
+
+
+def build_password_context(
+    schemes=None,
+    bcrypt_rounds: int = BCRYPT_ROUNDS,
+    argon2_time_cost: int = ARGON2_TIME_COST,
+    argon2_memory_cost: int = ARGON2_MEMORY_COST,
+    argon2_parallelism: int = ARGON2_PARALLELISM
+) -> CryptContext:
+    """Build a CryptContext; hashes with a different cost are flagged for rehash"""
+    schemes = schemes or PASSWORD_SCHEMES
+    settings = {}
+    if "bcrypt" in schemes:
+        settings["bcrypt__rounds"] = bcrypt_rounds
+    if "argon2" in schemes:
+        # Requires the optional argon2-cffi package
+        settings["argon2__time_cost"] = argon2_time_cost
+        settings["argon2__memory_cost"] = argon2_memory_cost
+        settings["argon2__parallelism"] = argon2_parallelism
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+
+pwd_context = build_password_context()
 security = HTTPBearer()
 
 
@@ -27,6 +65,29 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a new hash if the stored one is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password worker pool"""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """Verify (and possibly rehash) a password on the password worker pool"""
+    return await password_pool.run(verify_and_update_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the password worker pool"""
+    return await password_pool.run(get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -34,11 +95,23 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # jti lets a single token be revoked (see token_cache)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def create_refresh_token() -> Tuple[str, str]:
+    """Create an opaque refresh token; returns (token, hash to store)"""
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token)
+
+
+def hash_refresh_token(token: str) -> str:
+    """Refresh tokens are stored hashed (SHA-256 is enough for random tokens)"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def decode_token(token: str):
     """Decode and verify JWT token"""
     try:
@@ -48,8 +121,38 @@ def decode_token(token: str):
         return None
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get current user from JWT token"""
+async def revoke_token(claims: Dict[str, Any], revoked_tokens: RevokedTokenRepository):
+    """Revoke a token by its jti, in this process and for every other worker (revoked_tokens)"""
+    jti, exp = claims.get("jti"), claims.get("exp")
+    token_cache.revoke(jti, exp)
+    if jti:
+        if exp:
+            expires_at = datetime.utcfromtimestamp(exp)
+        else:
+            expires_at = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        await revoked_tokens.add(jti, expires_at)
+
+
+async def verify_token(token: str, revoked_tokens: RevokedTokenRepository) -> Optional[Dict[str, Any]]:
+    """Verified JWT claims (from the token cache when possible), or None if invalid or revoked"""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_token(token)
+        if payload is None or token_cache.is_revoked(payload.get("jti")):
+            return None
+        # Another worker may have revoked it
+        if payload.get("jti") and await revoked_tokens.is_revoked(payload["jti"]):
+            token_cache.revoke(payload["jti"], payload.get("exp"))
+            return None
+        token_cache.put(token, payload)
+    return payload
+
+
+async def get_token_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    revoked_tokens: RevokedTokenRepository = Depends(get_revoked_token_repository)
+) -> Dict[str, Any]:
+    """Get verified JWT claims, served from the token cache when possible"""
     token = credentials.credentials
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,12 +160,33 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    payload = decode_token(token)
+    payload = await verify_token(token, revoked_tokens)
     if payload is None:
         raise credentials_exception
     
+    return payload
+
+
+def get_current_user(payload: Dict[str, Any] = Depends(get_token_claims)):
+    """Get current user from JWT token"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
     user_id: str = payload.get("sub")
     if user_id is None:
         raise credentials_exception
     
     return user_id
+
+
+async def get_websocket_user(websocket: WebSocket, revoked_tokens: RevokedTokenRepository) -> Optional[str]:
+    """User ID from a WebSocket's Authorization header, or ?token= (browsers cannot set headers)"""
+    authorization = websocket.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        token = websocket.query_params.get("token", "")
+    payload = await verify_token(token, revoked_tokens) if token else None
+    return payload.get("sub") if payload else None
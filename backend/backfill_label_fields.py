@@ -0,0 +1,53 @@
+"""
+Copy predicted_label / confidence to the top level of older audio predictions
+New recordings (and re-scored ones) store both next to prediction_result, so
+GET /audio-predictions/ can project just those fields and filter by ?label=.
+This walks the documents saved before that in _id order and sets them with
+one unordered bulk write per batch. It only touches documents that still
+lack the fields, so it can be stopped and re-run at any time.
+
+    python backfill_label_fields.py
+    python backfill_label_fields.py --batch-size 2000
+"""
+
+import argparse
+import asyncio
+import time
+from pymongo import UpdateOne
+from database import connect_to_mongo, close_mongo_connection, get_database, init_database
+from repositories import AudioPredictionRepository
+from audio_ingest import label_fields
+
+
+async def run(batch_size: int):
+    await connect_to_mongo()
+    await init_database()
+    audio_predictions = AudioPredictionRepository(get_database())
+    try:
+        start = time.perf_counter()
+        after_id, total = None, 0
+        while True:
+            page = await audio_predictions.list_without_label_fields(after_id, batch_size)
+            if not page:
+                break
+            await audio_predictions.bulk_update([
+                UpdateOne({"_id": doc["_id"]}, {"$set": label_fields(doc.get("prediction_result"))})
+                for doc in page
+            ])
+            total += len(page)
+            after_id = str(page[-1]["_id"])
+            print(f"   {total:>8} documents updated")
+        print(f"✓ Backfilled {total} documents in {time.perf_counter() - start:.2f}s")
+    finally:
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="documents per bulk write")
+    args = parser.parse_args()
+    asyncio.run(run(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Audio normalization throughput benchmark
+Runs synthetic recordings (44.1kHz stereo 16-bit WAV by default) through the
+normalization process pool and reports files/sec, input MB/sec, how many
+seconds of audio are processed per wall-clock second, and the size reduction.
+Uses ffmpeg (Opus) when it is on the PATH, otherwise the numpy WAV path.
+
+    python bench_audio_normalize.py
+    python bench_audio_normalize.py --files 40 --seconds 30 --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import wave
+import numpy as np
+from audio_normalize import (
+    AUDIO_NORMALIZE_CODEC,
+    AUDIO_NORMALIZE_SAMPLE_RATE,
+    AudioNormalizer,
+    ffmpeg_available
+)
+
+
+def make_wav(path: str, seconds: float, rate: int, channels: int, seed: int):
+    """A tone plus noise, so the encoder has real content to compress"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    tone = 0.3 * np.sin(2 * np.pi * (300 + seed % 200) * t)
+    signal = tone[:, None] + 0.05 * rng.standard_normal((len(t), channels))
+    pcm = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+    with wave.open(path, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(pcm.tobytes())
+
+
+async def normalize_all(normalizer: AudioNormalizer, paths):
+    results = await asyncio.gather(*(normalizer.normalize(path) for path in paths))
+    for result in results:
+        os.unlink(result.path)
+    return results
+
+
+async def run(paths, workers: int):
+    normalizer = AudioNormalizer(workers)
+    # Warm the pool so process start-up is not counted
+    await normalize_all(normalizer, paths[:workers])
+
+    started = time.perf_counter()
+    results = await normalize_all(normalizer, paths)
+    elapsed = time.perf_counter() - started
+    normalizer.shutdown()
+
+    bytes_in = sum(r.original_size for r in results)
+    bytes_out = sum(r.size for r in results)
+    audio_seconds = sum(r.duration for r in results)
+    print(
+        f"   workers={workers:<3} {len(paths) / elapsed:7.1f} files/s   "
+        f"{bytes_in / elapsed / 1e6:7.1f} MB/s in   "
+        f"{audio_seconds / elapsed:8.1f}x realtime   "
+        f"{bytes_in / 1e6:.1f} MB -> {bytes_out / 1e6:.1f} MB ({bytes_in / bytes_out:.1f}x smaller)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10, help="length of each recording")
+    parser.add_argument("--rate", type=int, default=44100, help="input sample rate")
+    parser.add_argument("--channels", type=int, default=2, help="input channels")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    codec = AUDIO_NORMALIZE_CODEC if ffmpeg_available() else "wav (numpy, ffmpeg not found)"
+    print("=" * 60)
+    print(f"Normalizing {args.files} x {args.seconds}s {args.rate}Hz {args.channels}ch WAV")
+    print(f"-> mono {AUDIO_NORMALIZE_SAMPLE_RATE}Hz {codec}")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(tmp, f"clip{i}.wav")
+            make_wav(path, args.seconds, args.rate, args.channels, seed=i)
+            paths.append(path)
+        for workers in sorted(set(args.workers)):
+            asyncio.run(run(paths, workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Auth path load test
+Compares session renewal by password login (bcrypt) against renewal with a
+refresh token, reporting throughput and, when the server PID is given, the
+server CPU time spent per renewal (Linux, read from /proc).
+
+    python bench_auth.py --server-pid $(pgrep -f "uvicorn main:app")
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import httpx
+
+# Configuration
+BASE_URL = "http://localhost:8000"
+TEST_EMAIL = "bench-auth@example.com"
+TEST_PASSWORD = "bench123"
+TEST_NAME = "Bench Auth User"
+
+
+def cpu_seconds(pid):
+    """User + system CPU seconds consumed by a process, or None"""
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+async def login(client: httpx.AsyncClient) -> dict:
+    response = await client.post("/auth/login", json={"email": TEST_EMAIL, "password": TEST_PASSWORD})
+    response.raise_for_status()
+    return response.json()
+
+
+async def run(name: str, renew, total: int, concurrency: int, pid):
+    """Run `total` renewals with bounded concurrency and print the cost"""
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            try:
+                await renew()
+            except httpx.HTTPError:
+                errors += 1
+
+    cpu_before = cpu_seconds(pid)
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    cpu_after = cpu_seconds(pid)
+
+    line = f"   {name:<14} {total / elapsed:8.1f} renewals/s   errors={errors}"
+    if cpu_before is not None and cpu_after is not None:
+        line += f"   server CPU={(cpu_after - cpu_before) / total * 1000:7.2f} ms/renewal"
+    print(line)
+
+
+async def main(base_url: str, total: int, concurrency: int, pid):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        await client.post("/auth/register", json={
+            "email": TEST_EMAIL,
+            "password": TEST_PASSWORD,
+            "full_name": TEST_NAME
+        })
+
+        # Each concurrent client keeps rotating its own refresh token
+        chains: asyncio.Queue = asyncio.Queue()
+        for _ in range(concurrency):
+            chains.put_nowait((await login(client))["refresh_token"])
+
+        async def renew_with_refresh():
+            token = await chains.get()
+            response = await client.post("/auth/refresh", json={"refresh_token": token})
+            response.raise_for_status()
+            chains.put_nowait(response.json()["refresh_token"])
+
+        print("=" * 60)
+        print(f"Auth renewal load test against {base_url} ({total} renewals, c={concurrency})")
+        print("=" * 60)
+        await run("password login", lambda: login(client), total, concurrency, pid)
+        await run("refresh token", renew_with_refresh, total, concurrency, pid)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--server-pid", type=int, default=None, help="measure this process's CPU time")
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.requests, args.concurrency, args.server_pid))
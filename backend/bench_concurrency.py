@@ -0,0 +1,94 @@
+"""
+Concurrency benchmark for the API
+Measures throughput and latency of authenticated read endpoints at several
+concurrency levels against a running backend.
+
+Run it once on the old synchronous data layer and once on the async one:
+
+    python bench_concurrency.py --base-url http://localhost:8000
+    python bench_concurrency.py --levels 50 200 1000 --requests 2000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+# Configuration
+BASE_URL = "http://localhost:8000"
+TEST_EMAIL = "bench@example.com"
+TEST_PASSWORD = "bench123"
+TEST_NAME = "Bench User"
+DEFAULT_LEVELS = [50, 200, 1000]
+DEFAULT_PATHS = ["/audio-predictions/", "/predictions/", "/audio-predictions/stats/summary"]
+
+
+async def get_token(client: httpx.AsyncClient) -> str:
+    """Register (if needed) and log in the benchmark user"""
+    await client.post("/auth/register", json={
+        "email": TEST_EMAIL,
+        "password": TEST_PASSWORD,
+        "full_name": TEST_NAME
+    })
+    response = await client.post("/auth/login", json={
+        "email": TEST_EMAIL,
+        "password": TEST_PASSWORD
+    })
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_level(client: httpx.AsyncClient, path: str, headers: dict, concurrency: int, total: int):
+    """Fire `total` requests at `path` with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one_request():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(
+        f"   {path:<36} c={concurrency:<5} "
+        f"{total / elapsed:8.1f} req/s   p50={p50:7.1f}ms   p99={p99:7.1f}ms   errors={errors}"
+    )
+
+
+async def main(base_url: str, levels, total: int, paths):
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120.0) as client:
+        token = await get_token(client)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        print("=" * 60)
+        print(f"Concurrency benchmark against {base_url} ({total} requests per level)")
+        print("=" * 60)
+        for path in paths:
+            for concurrency in levels:
+                await run_level(client, path, headers, concurrency, max(total, concurrency))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--levels", type=int, nargs="+", default=DEFAULT_LEVELS)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.levels, args.requests, args.paths))
@@ -0,0 +1,120 @@
+"""
+In-process inference benchmark
+Generates synthetic recordings (16-bit WAV) and a random linear model, then
+reports per-clip latency of the decode -> features -> model pipeline (p50,
+p99, and how the time splits between stages) and throughput through the
+inference process pool as clips/sec and clips/sec per core, one clip per
+worker call or in batches (one stacked feature pass per batch).
+
+    python bench_inference.py
+    python bench_inference.py --clips 200 --seconds 5 --workers 1 2 4
+    python bench_inference.py --batch-sizes 1 4 16      # batched feature extraction
+    python bench_inference.py --model models/cry_classifier.onnx
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import numpy as np
+from audio_normalize import decode_audio
+from bench_audio_normalize import make_wav
+from features import FEATURE_N_MFCC, FEATURE_SAMPLE_RATE, extract_features
+from inference import INFERENCE_LABELS, InferenceEngine, classify_file, init_worker
+
+
+def make_linear_model(path: str):
+    """Random softmax regression over the mfcc_stats vector"""
+    rng = np.random.default_rng(0)
+    np.savez(
+        path,
+        weights=rng.standard_normal((2 * FEATURE_N_MFCC, len(INFERENCE_LABELS))).astype(np.float32),
+        bias=np.zeros(len(INFERENCE_LABELS), dtype=np.float32),
+        labels=np.array(INFERENCE_LABELS)
+    )
+
+
+def percentile_ms(values, q: float) -> float:
+    return float(np.percentile(values, q)) * 1000
+
+
+def bench_latency(model: str, paths):
+    """Single-process latency per clip, split by stage"""
+    init_worker(model)
+    classify_file(paths[0])  # warm caches (filterbank, DCT, window)
+    decode, featurize, total = [], [], []
+    for path in paths:
+        started = time.perf_counter()
+        samples = decode_audio(path, FEATURE_SAMPLE_RATE)
+        decoded = time.perf_counter()
+        extract_features(samples)
+        featurized = time.perf_counter()
+        decode.append(decoded - started)
+        featurize.append(featurized - decoded)
+
+        started = time.perf_counter()
+        classify_file(path)
+        total.append(time.perf_counter() - started)
+
+    print(
+        f"   latency   p50 {percentile_ms(total, 50):6.2f} ms   p99 {percentile_ms(total, 99):6.2f} ms   "
+        f"(decode p50 {percentile_ms(decode, 50):.2f} ms, features p50 {percentile_ms(featurize, 50):.2f} ms)"
+    )
+
+
+async def bench_throughput(model: str, paths, workers: int, batch_size: int):
+    engine = InferenceEngine(model, workers)
+    await engine.start()
+    started = time.perf_counter()
+    if batch_size > 1:
+        batches = [paths[i:i + batch_size] for i in range(0, len(paths), batch_size)]
+        await asyncio.gather(*(engine.classify_batch(batch) for batch in batches))
+    else:
+        await asyncio.gather(*(engine.classify(path) for path in paths))
+    elapsed = time.perf_counter() - started
+    engine.shutdown()
+    clips_per_second = len(paths) / elapsed
+    cores = min(workers, os.cpu_count() or 1)
+    print(
+        f"   workers={workers:<3} batch={batch_size:<3} {clips_per_second:8.1f} clips/s   "
+        f"{clips_per_second / cores:8.1f} clips/s per core   "
+        f"{engine.stats()['avg_latency_ms']:7.2f} ms avg call latency under load"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=5, help="length of each recording")
+    parser.add_argument("--rate", type=int, default=FEATURE_SAMPLE_RATE, help="input sample rate")
+    parser.add_argument("--model", help="model file (.onnx or .npz); default: a random linear model")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8], help="clips per worker call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model = args.model
+        if model is None:
+            model = os.path.join(tmp, "linear.npz")
+            make_linear_model(model)
+
+        print("=" * 60)
+        print(f"Classifying {args.clips} x {args.seconds}s {args.rate}Hz WAV with {os.path.basename(model)}")
+        print(f"Cores available: {os.cpu_count()}")
+        print("=" * 60)
+
+        paths = []
+        for i in range(args.clips):
+            path = os.path.join(tmp, f"clip{i}.wav")
+            make_wav(path, args.seconds, args.rate, 1, seed=i)
+            paths.append(path)
+
+        bench_latency(model, paths)
+        for workers in sorted(set(args.workers)):
+            for batch_size in sorted(set(args.batch_sizes)):
+                asyncio.run(bench_throughput(model, paths, workers, batch_size))
+
+
+if __name__ == "__main__":
+    main()
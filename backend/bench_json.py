@@ -0,0 +1,143 @@
+"""
+Response serialization microbenchmark for history lists
+Times turning 20/100/1000 database documents into response bytes, the way
+GET /audio-predictions/ and GET /predictions/ do it, with FastAPI's own
+response_model handling (no server, no database):
+
+    models      build Pydantic models, response_model validation, json.dumps (before fast_json.py)
+    dicts       plain dicts, response_model validation, json.dumps (FAST_JSON_ENABLED off)
+    orjson      plain dicts, response_model validation, orjson (other routes with FAST_JSON_ENABLED)
+    trusted     plain dicts straight to orjson (history lists with FAST_JSON_ENABLED)
+
+    python bench_json.py
+    python bench_json.py --sizes 20 100 1000 --repeat 200
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from models import AudioPredictionListResponse, PredictionResponse
+from fast_json import FastJSONResponse, orjson
+
+LABELS = ["Hungry", "Tired/Sleepy", "Discomfort", "Belly Pain", "Burping"]
+
+
+def audio_documents(count: int):
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "audio_filename": f"cry_{i}.wav",
+        "audio_url": f"https://res.cloudinary.com/demo/video/upload/audio_predictions/{i}.wav",
+        "predicted_label": random.choice(LABELS),
+        "confidence": round(random.uniform(40, 99), 2),
+        "status": "stored",
+        "created_at": now - timedelta(minutes=i),
+    } for i in range(count)]
+
+
+def prediction_documents(count: int):
+    now = datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "user_id": "6ad2ea239783775bcd157430",
+        "input_data": {"age_weeks": random.randint(1, 52), "duration": random.uniform(1, 10)},
+        "prediction_result": {
+            "prediction_value": random.random(),
+            "predicted_label": random.choice(LABELS),
+            "confidence": round(random.uniform(40, 99), 2),
+            "processing_time": random.uniform(0.05, 0.4),
+            "timestamp": now.isoformat(),
+        },
+        "created_at": now - timedelta(minutes=i),
+    } for i in range(count)]
+
+
+def audio_item(doc):
+    return {
+        "id": str(doc["_id"]),
+        "audio_filename": doc["audio_filename"],
+        "audio_url": doc["audio_url"],
+        "predicted_label": doc["predicted_label"],
+        "confidence": doc["confidence"],
+        "status": doc["status"],
+        "created_at": doc["created_at"],
+    }
+
+
+def prediction_item(doc):
+    return {
+        "id": str(doc["_id"]),
+        "user_id": doc["user_id"],
+        "input_data": doc["input_data"],
+        "prediction_result": doc["prediction_result"],
+        "created_at": doc["created_at"],
+    }
+
+
+async def through_response_model(field, content, response_class) -> bytes:
+    """What FastAPI does with a route's return value: validate, serialize, render"""
+    value = await serialize_response(field=field, response_content=content)
+    return response_class(value).body
+
+
+async def timed(render, repeat: int) -> float:
+    """Median microseconds per response"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await render()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+async def run(sizes, repeat: int):
+    shapes = [
+        ("GET /audio-predictions/", AudioPredictionListResponse, audio_documents, audio_item),
+        ("GET /predictions/", PredictionResponse, prediction_documents, prediction_item),
+    ]
+    for name, model, make_documents, to_item in shapes:
+        field = create_response_field(name="Response", type_=List[model], mode="serialization")
+        print(f"\n{name} (median µs per response)")
+        print(f"   {'items':>6} {'models':>10} {'dicts':>10} {'orjson':>10} {'trusted':>10}   speedup")
+        for size in sizes:
+            docs = make_documents(size)
+
+            async def models():
+                return await through_response_model(field, [model(**to_item(doc)) for doc in docs], JSONResponse)
+
+            async def dicts():
+                return await through_response_model(field, [to_item(doc) for doc in docs], JSONResponse)
+
+            async def fast():
+                return await through_response_model(field, [to_item(doc) for doc in docs], FastJSONResponse)
+
+            async def trusted():
+                return FastJSONResponse([to_item(doc) for doc in docs]).body
+
+            results = [await timed(render, repeat) for render in (models, dicts, fast, trusted)]
+            print(
+                f"   {size:>6} " + " ".join(f"{us:10.0f}" for us in results)
+                + f"   {results[0] / results[-1]:6.1f}x"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 1000], help="items per list")
+    parser.add_argument("--repeat", type=int, default=100, help="timed runs per size (median)")
+    args = parser.parse_args()
+    if orjson is None:
+        raise SystemExit("orjson is not installed (pip install orjson)")
+    asyncio.run(run(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
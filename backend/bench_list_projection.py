@@ -0,0 +1,116 @@
+"""
+History list benchmark: whole documents vs the list projection
+Seeds a scratch collection with --records audio predictions for one user,
+each carrying a prediction_result of about --result-bytes (probabilities,
+model metadata and raw model output, as returned by the prediction API),
+then loads history pages the old way (whole documents) and the way
+GET /audio-predictions/ does now (only the listed fields). Reports the BSON
+bytes MongoDB sends per page and the median latency. Uses MONGODB_URI /
+DB_NAME from .env and drops the scratch collection at the end.
+
+    python bench_list_projection.py
+    python bench_list_projection.py --records 20000 --result-bytes 8000 --limits 20 100
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+import bson
+from database import connect_to_mongo, close_mongo_connection, get_database
+from repositories import AudioPredictionRepository
+from audio_ingest import label_fields
+from routes_audio_predictions import _LIST_PROJECTION
+
+USER_ID = "bench-user"
+LABELS = ["Hungry", "Tired/Sleepy", "Discomfort", "Belly Pain", "Burping"]
+
+
+def prediction_result(result_bytes: int):
+    probabilities = {label: random.random() for label in LABELS}
+    label = max(probabilities, key=probabilities.get)
+    return {
+        "predicted_label": label,
+        "confidence": round(probabilities[label] * 100, 2),
+        "probabilities": probabilities,
+        "model_version": "cry_classifier_v2",
+        "processing_time": random.uniform(0.05, 0.4),
+        # About 10 bytes of BSON per float
+        "raw_output": [random.random() for _ in range(max(0, result_bytes // 10))],
+    }
+
+
+async def seed(collection, records: int, result_bytes: int):
+    started = datetime.utcnow()
+    batch = []
+    for i in range(records):
+        result = prediction_result(result_bytes)
+        batch.append({
+            "user_id": USER_ID,
+            "audio_filename": f"cry_{i}.wav",
+            "storage_backend": "local",
+            "storage_key": f"audio/{i}.wav",
+            "audio_url": f"/audio-predictions/files/audio/{i}.wav",
+            "audio_size": 320044,
+            "audio_duration": 10.0,
+            "prediction_result": result,
+            **label_fields(result),
+            "status": "stored",
+            "created_at": started - timedelta(seconds=i)
+        })
+        if len(batch) == 2000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+    await collection.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+
+
+async def measure(repository, limit: int, projection, repeat: int):
+    """Median ms and BSON bytes of one page"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page = await repository.list_for_user(USER_ID, 0, limit, projection=projection)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), sum(len(bson.encode(doc)) for doc in page)
+
+
+async def run(records: int, result_bytes: int, limits, repeat: int):
+    await connect_to_mongo()
+    db = get_database()
+    repository = AudioPredictionRepository(db)
+    repository.collection = db[f"bench_list_projection_{os.getpid()}"]
+    try:
+        print(f"Seeding {records} recordings with ~{result_bytes} byte prediction results...")
+        await seed(repository.collection, records, result_bytes)
+
+        print("\nPage size        whole documents              projection")
+        for limit in limits:
+            full_ms, full_bytes = await measure(repository, limit, None, repeat)
+            lean_ms, lean_bytes = await measure(repository, limit, _LIST_PROJECTION, repeat)
+            print(
+                f"   {limit:>6}     {full_bytes / 1024:9.1f} KiB {full_ms:8.2f} ms"
+                f"     {lean_bytes / 1024:7.1f} KiB {lean_ms:8.2f} ms"
+                f"   ({full_bytes / max(lean_bytes, 1):.0f}x fewer bytes)"
+            )
+    finally:
+        await repository.collection.drop()
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--result-bytes", type=int, default=4000, help="approximate size of each prediction_result")
+    parser.add_argument("--limits", type=int, nargs="+", default=[20, 100], help="page sizes")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per page size (median)")
+    args = parser.parse_args()
+    asyncio.run(run(args.records, args.result_bytes, args.limits, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+History pagination benchmark: skip/limit vs keyset cursor
+Seeds a scratch collection with --records predictions for one user (100k by
+default), creates the (user_id, created_at, _id) index and times loading one
+page at increasing depths with ?skip= and with ?cursor=, through the same
+repository query the routes use. MongoDB's explain output shows why: skip
+walks every skipped index key, a cursor seeks straight to the page.
+Uses MONGODB_URI / DB_NAME from .env and drops the scratch collection at
+the end.
+
+    python bench_pagination.py
+    python bench_pagination.py --records 100000 --limit 20 --repeat 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from database import connect_to_mongo, close_mongo_connection, get_database
+from repositories import PredictionRepository
+from pagination import HISTORY_SORT, decode_cursor, encode_cursor
+
+USER_ID = "bench-user"
+
+
+async def seed(collection, records: int):
+    started = datetime.utcnow()
+    batch = []
+    for i in range(records):
+        batch.append({
+            "user_id": USER_ID,
+            "input_data": {"i": i},
+            "prediction_result": {"predicted_label": "Hungry", "confidence": 90.0},
+            # A few documents share each timestamp so the _id tie-break matters
+            "created_at": started - timedelta(milliseconds=i // 3)
+        })
+        if len(batch) == 5000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+    await collection.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+
+
+async def timed(fetch, repeat: int) -> float:
+    """Median ms of `repeat` runs"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fetch()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def examined(collection, query, skip: int, limit: int):
+    plan = await collection.find(query).sort(HISTORY_SORT).skip(skip).limit(limit).explain()
+    stats = plan.get("executionStats", {})
+    return stats.get("totalKeysExamined", "?"), stats.get("totalDocsExamined", "?")
+
+
+async def run(records: int, limit: int, repeat: int):
+    await connect_to_mongo()
+    db = get_database()
+    name = f"bench_pagination_{os.getpid()}"
+    collection = db[name]
+    repository = PredictionRepository(db)
+    repository.collection = collection
+    try:
+        print(f"Seeding {records} predictions for one user...")
+        await seed(collection, records)
+        depths = sorted({d for d in (0, 1000, 10000, records // 2, records - limit) if 0 <= d <= records - limit})
+
+        print(f"\nPage of {limit} at depth      skip/limit            cursor")
+        for depth in depths:
+            # Build the cursor from the document just before the page (not timed)
+            after = None
+            if depth:
+                previous = await collection.find({"user_id": USER_ID}).sort(HISTORY_SORT).skip(depth - 1).limit(1).to_list(1)
+                after = decode_cursor(encode_cursor(previous[0]))
+
+            skip_ms = await timed(lambda: repository.list_for_user(USER_ID, depth, limit), repeat)
+            cursor_ms = await timed(lambda: repository.list_for_user(USER_ID, 0, limit, after), repeat)
+            skip_keys, _ = await examined(collection, {"user_id": USER_ID}, depth, limit)
+            cursor_keys, _ = await examined(collection, {"user_id": USER_ID, **(after or {})}, 0, limit)
+            print(
+                f"   {depth:>8}            {skip_ms:8.2f} ms ({skip_keys:>7} keys)   "
+                f"{cursor_ms:8.2f} ms ({cursor_keys:>5} keys)"
+            )
+    finally:
+        await collection.drop()
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=20, help="page size")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per depth (median)")
+    args = parser.parse_args()
+    asyncio.run(run(args.records, args.limit, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
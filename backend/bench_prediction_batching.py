@@ -0,0 +1,135 @@
+"""
+Micro-batching benchmark
+Starts a local stub model server with limited capacity (a fixed number of
+inference slots, one batch costs little more than one item) and compares
+upstream calls/sec and p50/p99 latency with batching off and on.
+
+    python bench_prediction_batching.py
+    python bench_prediction_batching.py --requests 2000 --concurrency 200 --window-ms 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+from functools import partial
+
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8799
+os.environ.setdefault("PREDICTION_API_URL", f"http://{STUB_HOST}:{STUB_PORT}/predict")
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from prediction_batcher import PredictionBatcher
+from prediction_client import request_prediction, request_prediction_batch
+
+# Stub model cost: fixed overhead per call plus a small per-item cost
+STUB_SLOTS = 4
+STUB_CALL_MS = 20.0
+STUB_ITEM_MS = 0.5
+
+
+def build_stub_model() -> FastAPI:
+    """Stub prediction API with /predict and /predict/batch"""
+    stub = FastAPI()
+    stub.state.calls = 0
+    slots = None
+
+    async def infer(items: int):
+        nonlocal slots
+        if slots is None:
+            slots = asyncio.Semaphore(STUB_SLOTS)
+        async with slots:
+            await asyncio.sleep((STUB_CALL_MS + STUB_ITEM_MS * items) / 1000)
+
+    @stub.post("/predict")
+    async def predict(request: Request):
+        payload = await request.json()
+        stub.state.calls += 1
+        await infer(1)
+        return {"predicted_label": "hungry", "confidence": 0.9, "echo": payload}
+
+    @stub.post("/predict/batch")
+    async def predict_batch(request: Request):
+        instances = (await request.json())["instances"]
+        stub.state.calls += 1
+        await infer(len(instances))
+        return [{"predicted_label": "hungry", "confidence": 0.9, "echo": item} for item in instances]
+
+    return stub
+
+
+def start_stub_server(stub: FastAPI) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(stub, host=STUB_HOST, port=STUB_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def run_mode(name: str, predict, stub: FastAPI, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await predict({"request": i})
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    calls_before = stub.state.calls
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    upstream_calls = stub.state.calls - calls_before
+
+    latencies.sort()
+    print(
+        f"   {name:<13} {total / elapsed:8.1f} req/s   upstream calls={upstream_calls:<6} "
+        f"({upstream_calls / elapsed:7.1f}/s)   p50={statistics.median(latencies) * 1000:7.1f}ms   "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:7.1f}ms   errors={errors}"
+    )
+
+
+async def main(total: int, concurrency: int, window_ms: float, max_size: int):
+    stub = build_stub_model()
+    server = start_stub_server(stub)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        batcher = PredictionBatcher(
+            partial(request_prediction_batch, client),
+            window_ms=window_ms,
+            max_size=max_size,
+            deadline_ms=60000
+        )
+
+        print("=" * 60)
+        print(
+            f"Batching benchmark: {total} requests, c={concurrency}, "
+            f"window={window_ms}ms, max batch={max_size}"
+        )
+        print("=" * 60)
+        await run_mode("batching off", partial(request_prediction, client), stub, total, concurrency)
+        await run_mode("batching on", batcher.submit, stub, total, concurrency)
+        print(f"   batcher: {batcher.stats()}")
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--window-ms", type=float, default=10.0)
+    parser.add_argument("--max-size", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.window_ms, args.max_size))
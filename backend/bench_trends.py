@@ -0,0 +1,123 @@
+"""
+Trend analytics benchmark: aggregating raw recordings vs hourly rollups
+Seeds scratch collections with --records recordings for one user spread
+over --days days, builds the hourly rollups with rebuild_prediction_stats,
+then times a per-day trend over the last 30 days and over the whole history
+two ways: a $group aggregation over the raw recordings (what an endpoint
+without rollups would run) and the rollup read behind
+/audio-predictions/stats/trends. Uses MONGODB_URI / DB_NAME from .env and
+drops the scratch collections at the end.
+
+    python bench_trends.py
+    python bench_trends.py --records 200000 --days 730 --repeat 5
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from database import connect_to_mongo, close_mongo_connection, get_database
+from repositories import AudioPredictionRepository, PredictionStatsRepository
+from prediction_stats import rebuild_prediction_stats, trend_buckets, trend_range
+
+USER_ID = "bench-user"
+LABELS = ["Hungry", "Tired/Sleepy", "Discomfort", "Belly Pain", "Burping"]
+
+
+async def seed(collection, records: int, days: int):
+    now = datetime.utcnow()
+    batch = []
+    for _ in range(records):
+        batch.append({
+            "user_id": USER_ID,
+            "prediction_result": {"predicted_label": random.choice(LABELS), "confidence": random.uniform(40, 99)},
+            "created_at": now - timedelta(seconds=random.uniform(0, days * 86400))
+        })
+        if len(batch) == 5000:
+            await collection.insert_many(batch)
+            batch = []
+    if batch:
+        await collection.insert_many(batch)
+    await collection.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+
+
+def raw_pipeline(start: datetime, end: datetime):
+    """Per-day label counts and mean confidence straight from the recordings (UTC days)"""
+    return [
+        {"$match": {"user_id": USER_ID, "created_at": {"$gte": start, "$lt": end}}},
+        {"$group": {
+            "_id": {
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                "label": "$prediction_result.predicted_label"
+            },
+            "count": {"$sum": 1},
+            "avg_confidence": {"$avg": "$prediction_result.confidence"}
+        }},
+        {"$sort": {"_id.day": 1}}
+    ]
+
+
+async def timed(fetch, repeat: int) -> float:
+    """Median ms of `repeat` runs"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fetch()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+async def run(records: int, days: int, repeat: int):
+    await connect_to_mongo()
+    db = get_database()
+    suffix = os.getpid()
+    audio_predictions = AudioPredictionRepository(db)
+    audio_predictions.collection = db[f"bench_trends_recordings_{suffix}"]
+    prediction_stats = PredictionStatsRepository(db)
+    prediction_stats.collection = db[f"bench_trends_stats_{suffix}"]
+    prediction_stats.rollups = db[f"bench_trends_rollups_{suffix}"]
+    try:
+        print(f"Seeding {records} recordings over {days} days...")
+        await seed(audio_predictions.collection, records, days)
+        await prediction_stats.rollups.create_index([("user_id", 1), ("hour", 1)], unique=True)
+        start = time.perf_counter()
+        await rebuild_prediction_stats(audio_predictions, prediction_stats, USER_ID)
+        rollups = await prediction_stats.rollups.count_documents({})
+        print(f"Built {rollups} hourly rollups in {time.perf_counter() - start:.2f}s")
+
+        print("\nPer-day trend            raw aggregation      rollups")
+        end = datetime.now(timezone.utc)
+        for name, span in (("last 30 days", 30), (f"all {days} days", days)):
+            range_start, range_end, keys = trend_range("day", timezone.utc, end - timedelta(days=span), end)
+
+            async def raw():
+                await audio_predictions.aggregate(raw_pipeline(range_start, range_end))
+
+            async def from_rollups():
+                hours = await prediction_stats.list_rollups(USER_ID, range_start, range_end)
+                trend_buckets(hours, "day", timezone.utc, keys)
+
+            raw_ms = await timed(raw, repeat)
+            rollup_ms = await timed(from_rollups, repeat)
+            print(f"   {name:<18} {raw_ms:10.1f} ms      {rollup_ms:8.1f} ms")
+    finally:
+        await audio_predictions.collection.drop()
+        await prediction_stats.collection.drop()
+        await prediction_stats.rollups.drop()
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=365, help="history length the records are spread over")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query (median)")
+    args = parser.parse_args()
+    asyncio.run(run(args.records, args.days, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Upload memory benchmark
+Compares peak RSS of the old buffered upload path (`await file.read()` then
+upload the bytes) with the streaming path (chunked BoundedUploadReader) for
+many concurrent uploads. Each mode runs in its own subprocess because peak
+RSS never goes down.
+
+    python bench_upload_memory.py
+    python bench_upload_memory.py --uploads 100 --size-mb 10 --chunk-mb 6
+"""
+
+import argparse
+import asyncio
+import resource
+import subprocess
+import sys
+import time
+from tempfile import SpooledTemporaryFile
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from upload_stream import BoundedUploadReader
+
+# Starlette spools multipart parts larger than this to disk
+SPOOL_MAX_SIZE = 1024 * 1024
+# Simulated network time per uploaded MB
+UPLOAD_SECONDS_PER_MB = 0.01
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_upload(size: int) -> UploadFile:
+    """An UploadFile spooled the same way Starlette's multipart parser does it"""
+    spool = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    block = b"\0" * SPOOL_MAX_SIZE
+    remaining = size
+    while remaining > 0:
+        spool.write(block[:min(remaining, len(block))])
+        remaining -= len(block)
+    spool.seek(0)
+    return UploadFile(spool, size=size, filename="bench.wav")
+
+
+def upload_bytes(content: bytes):
+    time.sleep(len(content) / (1024 * 1024) * UPLOAD_SECONDS_PER_MB)
+
+
+def upload_stream(reader: BoundedUploadReader):
+    for chunk in reader:
+        time.sleep(len(chunk) / (1024 * 1024) * UPLOAD_SECONDS_PER_MB)
+
+
+async def run_mode(mode: str, uploads: int, size: int, chunk_size: int):
+    files = [make_upload(size) for _ in range(uploads)]
+    baseline = peak_rss_mb()
+
+    async def one(upload: UploadFile):
+        if mode == "buffered":
+            content = await upload.read()
+            await run_in_threadpool(upload_bytes, content)
+        else:
+            reader = BoundedUploadReader(upload.file, max_bytes=size, chunk_size=chunk_size)
+            await run_in_threadpool(upload_stream, reader)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(upload) for upload in files))
+    elapsed = time.perf_counter() - started
+    print(
+        f"   {mode:<10} peak RSS={peak_rss_mb():8.1f} MB   "
+        f"(+{peak_rss_mb() - baseline:7.1f} MB over baseline)   {elapsed:6.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=100)
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--chunk-mb", type=float, default=6)
+    parser.add_argument("--mode", choices=["buffered", "streaming"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    chunk_size = int(args.chunk_mb * 1024 * 1024)
+
+    if args.mode:
+        asyncio.run(run_mode(args.mode, args.uploads, size, chunk_size))
+        return
+
+    print("=" * 60)
+    print(f"Upload memory benchmark: {args.uploads} concurrent uploads of {args.size_mb} MB")
+    print("=" * 60)
+    for mode in ("buffered", "streaming"):
+        subprocess.run([sys.executable, __file__, "--mode", mode] + sys.argv[1:], check=True)
+
+
+if __name__ == "__main__":
+    main()
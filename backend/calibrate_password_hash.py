@@ -0,0 +1,79 @@
+"""
+Password hash cost calibration
+Measures hash time on this host for increasing cost factors and picks the
+highest cost whose median hash time fits the target latency budget.
+
+    python calibrate_password_hash.py --target-ms 250
+    python calibrate_password_hash.py --scheme argon2 --target-ms 300
+
+Put the suggested value in .env; existing users are rehashed with the new
+cost the next time they log in.
+"""
+
+import argparse
+import statistics
+import time
+from auth import build_password_context, ARGON2_MEMORY_COST, ARGON2_PARALLELISM
+
+BCRYPT_COSTS = range(8, 17)
+ARGON2_COSTS = range(1, 11)
+SAMPLE_PASSWORD = "calibration-password"
+
+
+def measure(context, samples: int) -> float:
+    """Median time in ms to hash the sample password"""
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash(SAMPLE_PASSWORD)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(scheme: str, target_ms: float, samples: int):
+    """Return (cost, ms) for the highest cost within the budget"""
+    if scheme == "bcrypt":
+        costs = BCRYPT_COSTS
+        make_context = lambda cost: build_password_context(["bcrypt"], bcrypt_rounds=cost)
+    else:
+        costs = ARGON2_COSTS
+        make_context = lambda cost: build_password_context(
+            ["argon2"],
+            argon2_time_cost=cost,
+            argon2_memory_cost=ARGON2_MEMORY_COST,
+            argon2_parallelism=ARGON2_PARALLELISM
+        )
+
+    chosen = None
+    for cost in costs:
+        elapsed = measure(make_context(cost), samples)
+        fits = elapsed <= target_ms
+        print(f"   cost={cost:<3} {elapsed:9.1f} ms  {'✓' if fits else '✗'}")
+        if not fits:
+            break
+        chosen = (cost, elapsed)
+    return chosen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default="bcrypt")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="hash time budget per login")
+    parser.add_argument("--samples", type=int, default=3, help="hashes measured per cost")
+    args = parser.parse_args()
+
+    print(f"Calibrating {args.scheme} for a {args.target_ms:.0f} ms budget...")
+    chosen = calibrate(args.scheme, args.target_ms, args.samples)
+
+    if chosen is None:
+        print("\n✗ Even the lowest cost exceeds the budget on this host")
+        return
+
+    cost, elapsed = chosen
+    env_name = "BCRYPT_ROUNDS" if args.scheme == "bcrypt" else "ARGON2_TIME_COST"
+    print(f"\n✓ Recommended: {env_name}={cost} (~{elapsed:.0f} ms per hash)")
+    print("   Login p99 is roughly hash time plus password pool queue wait (see /metrics)")
+
+
+if __name__ == "__main__":
+    main()
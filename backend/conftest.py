@@ -0,0 +1,26 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from database import get_database
+
+# test_api.py is a script run against a live server (python test_api.py), not a unit test module
+collect_ignore = ["test_api.py"]
+
+
+@pytest.fixture
+def db():
+    """In-memory stand-in for the Motor database"""
+    return AsyncMongoMockClient()["unit_tests"]
+
+
+@pytest.fixture
+def api(db):
+    """Build a TestClient for some routers, with get_database returning the `db` fixture"""
+    def build(*routers) -> TestClient:
+        app = FastAPI()
+        for router in routers:
+            app.include_router(router)
+        app.dependency_overrides[get_database] = lambda: db
+        return TestClient(app)
+    return build
@@ -1,4 +1,5 @@
-from pymongo import MongoClient
+from typing import Optional
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo.errors import ServerSelectionTimeoutError
 import os
 from dotenv import load_dotenv
@@ -8,45 +9,140 @@ load_dotenv()
 MONGODB_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME")
 
+# Connection pool settings for the shared client
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+MONGODB_MAX_IDLE_TIME_MS = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000"))
+MONGODB_HEARTBEAT_FREQUENCY_MS = int(os.getenv("MONGODB_HEARTBEAT_FREQUENCY_MS", "10000"))
 
-def get_database():
-    """Get MongoDB database connection"""
+# Process-wide async client, created on app startup and closed on shutdown
+_client: Optional[AsyncIOMotorClient] = None
+
+
+def _create_client() -> AsyncIOMotorClient:
+    """Build the shared Motor client with the configured pool settings"""
+    global _client
+    _client = AsyncIOMotorClient(
+        MONGODB_URI,
+        serverSelectionTimeoutMS=5000,
+        tls=True,
+        tlsAllowInvalidCertificates=True,
+        maxPoolSize=MONGODB_MAX_POOL_SIZE,
+        minPoolSize=MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGODB_MAX_IDLE_TIME_MS,
+        heartbeatFrequencyMS=MONGODB_HEARTBEAT_FREQUENCY_MS
+    )
+    return _client
+
+
+async def connect_to_mongo() -> AsyncIOMotorClient:
+    """Create the shared MongoDB client (no-op if it already exists)"""
+    if _client is not None:
+        return _client
+
+    client = _create_client()
     try:
-        client = MongoClient(
-            MONGODB_URI,
-            serverSelectionTimeoutMS=5000,
-            tls=True,
-            tlsAllowInvalidCertificates=True
-        )
-        # Test connection
-        client.server_info()
-        db = client[DB_NAME]
-        return db
+        # Test connection once, not on every request
+        await client.server_info()
     except ServerSelectionTimeoutError as e:
         print(f"Error connecting to MongoDB: {e}")
         raise
 
+    return client
+
+
+def close_mongo_connection():
+    """Close the shared MongoDB client and release its pooled connections"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    """Get MongoDB database from the shared client (FastAPI dependency)"""
+    client = _client or _create_client()
+    return client[DB_NAME]
+
 
-def init_database():
+async def init_database(db: Optional[AsyncIOMotorDatabase] = None):
     """Initialize database collections and indexes"""
-    db = get_database()
+    if db is None:
+        db = get_database()
+    
+    collection_names = await db.list_collection_names()
     
     # Create collections if they don't exist
-    if "users" not in db.list_collection_names():
-        db.create_collection("users")
+    if "users" not in collection_names:
+        await db.create_collection("users")
         # Create unique index on email
-        db.users.create_index("email", unique=True)
+        await db.users.create_index("email", unique=True)
     
-    if "predictions" not in db.list_collection_names():
-        db.create_collection("predictions")
+    if "predictions" not in collection_names:
+        await db.create_collection("predictions")
         # Create index on user_id for faster queries
-        db.predictions.create_index("user_id")
+        await db.predictions.create_index("user_id")
     
-    if "audio_predictions" not in db.list_collection_names():
-        db.create_collection("audio_predictions")
+    if "audio_predictions" not in collection_names:
+        await db.create_collection("audio_predictions")
         # Create index on user_id for faster queries
-        db.audio_predictions.create_index("user_id")
+        await db.audio_predictions.create_index("user_id")
         # Create index on created_at for sorting
-        db.audio_predictions.create_index([("created_at", -1)])
+        await db.audio_predictions.create_index([("created_at", -1)])
+    
+    # Indexes added after the first release; create_index is a no-op when they exist
+    # Serving local audio files looks documents up by storage key
+    await db.audio_predictions.create_index("storage_key", sparse=True)
+    await db.audio_predictions.create_index("status", sparse=True)
+    # Keyset pagination of history lists (see pagination.py)
+    await db.predictions.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+    await db.audio_predictions.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+    # History filtered by the top-level predicted_label
+    await db.audio_predictions.create_index([("user_id", 1), ("predicted_label", 1), ("created_at", -1), ("_id", -1)])
+    
+    if "refresh_tokens" not in collection_names:
+        await db.create_collection("refresh_tokens")
+        # Look up refresh tokens by hash only
+        await db.refresh_tokens.create_index("token_hash", unique=True)
+        # Rotation reuse detection revokes the whole family
+        await db.refresh_tokens.create_index("family_id")
+        # Let MongoDB drop expired refresh tokens
+        await db.refresh_tokens.create_index("expires_at", expireAfterSeconds=0)
+    
+    if "revoked_tokens" not in collection_names:
+        await db.create_collection("revoked_tokens")
+        # Revocations are only needed until the token would have expired anyway
+        await db.revoked_tokens.create_index("expires_at", expireAfterSeconds=0)
+    
+    if "prediction_cache" not in collection_names:
+        await db.create_collection("prediction_cache")
+        # Let MongoDB drop expired cached prediction results
+        await db.prediction_cache.create_index("expires_at", expireAfterSeconds=0)
+    
+    if "audio_blobs" not in collection_names:
+        await db.create_collection("audio_blobs")
+        # One stored object per content hash and backend
+        await db.audio_blobs.create_index([("sha256", 1), ("storage_backend", 1)], unique=True)
+    
+    if "upload_sessions" not in collection_names:
+        await db.create_collection("upload_sessions")
+        await db.upload_sessions.create_index("user_id")
+        # Let MongoDB drop abandoned resumable upload sessions
+        await db.upload_sessions.create_index("expires_at", expireAfterSeconds=0)
+    
+    if "rescore_jobs" not in collection_names:
+        await db.create_collection("rescore_jobs")
+        await db.rescore_jobs.create_index([("user_id", 1), ("created_at", -1)])
+        # Runners pick the oldest queued job (or one whose lease expired)
+        await db.rescore_jobs.create_index([("status", 1), ("created_at", 1)])
+    
+    if "prediction_stats" not in collection_names:
+        # Keyed by user id, so no other index is needed
+        await db.create_collection("prediction_stats")
+    
+    if "prediction_rollups" not in collection_names:
+        await db.create_collection("prediction_rollups")
+        # One rollup per user and hour; trends read a user's hours in a range
+        await db.prediction_rollups.create_index([("user_id", 1), ("hour", 1)], unique=True)
     
     return db
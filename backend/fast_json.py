@@ -0,0 +1,74 @@
+"""
+Optional orjson rendering of API responses.
+
+With FAST_JSON_ENABLED the app renders every response through
+FastJSONResponse (orjson, which writes datetimes natively; ObjectId becomes
+its string) instead of the standard library encoder. Output matches the
+standard encoder for finite values only: NaN and Infinity (not valid JSON)
+make the standard JSONResponse raise, so the request fails with a 500,
+while orjson writes them as null.
+
+Routes still validate their return value against response_model before it
+is rendered. History lists build plain dicts from database documents in
+exactly the response model's shape, so they return trusted_response()
+instead, which skips that second pass (model validation and
+jsonable_encoder) when fast JSON is on. With it off they return the dicts
+and FastAPI validates them as before.
+"""
+
+import os
+from typing import Any
+from bson import ObjectId
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FAST_JSON_ENABLED = os.getenv("FAST_JSON_ENABLED", "False").lower() == "true"
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if FAST_JSON_ENABLED and orjson is None:
+    print("Warning: FAST_JSON_ENABLED needs orjson (pip install orjson); using the standard JSON encoder")
+    FAST_JSON_ENABLED = False
+
+
+def _default(value: Any) -> Any:
+    """Types orjson does not know"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def default_response_class():
+    """Response class for the app (FastAPI(default_response_class=...))"""
+    return FastJSONResponse if FAST_JSON_ENABLED else JSONResponse
+
+
+def trusted_response(content: Any, response: Response) -> Any:
+    """
+    Return already-shaped response data without re-validating it (FAST_JSON_ENABLED)
+
+    `response` is the route's injected Response; its status code and headers
+    (e.g. X-Next-Cursor) are carried over. With fast JSON off the content is
+    returned as is and goes through response_model like any other route.
+    """
+    if not FAST_JSON_ENABLED:
+        return content
+    fast = FastJSONResponse(content, status_code=response.status_code or 200)
+    fast.raw_headers.extend(
+        (name, value) for name, value in response.raw_headers
+        if name not in (b"content-length", b"content-type")
+    )
+    return fast
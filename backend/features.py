@@ -0,0 +1,163 @@
+"""
+Vectorized spectral features for cry classification (numpy only).
+
+A clip is framed with stride tricks, windowed and transformed with one rfft
+over all frames; the power spectrum goes through a cached mel filterbank and
+a cached DCT-II matrix, so there is no Python loop per frame. The mel bank
+follows the HTK mel scale, matching the usual librosa-style front ends.
+"""
+
+import os
+from functools import lru_cache
+from typing import Dict, List
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+FEATURE_SAMPLE_RATE = int(os.getenv("FEATURE_SAMPLE_RATE", os.getenv("AUDIO_NORMALIZE_SAMPLE_RATE", "16000")))
+FEATURE_N_FFT = int(os.getenv("FEATURE_N_FFT", "512"))
+FEATURE_WIN_LENGTH = int(os.getenv("FEATURE_WIN_LENGTH", "400"))  # 25ms at 16kHz
+FEATURE_HOP_LENGTH = int(os.getenv("FEATURE_HOP_LENGTH", "160"))  # 10ms at 16kHz
+FEATURE_N_MELS = int(os.getenv("FEATURE_N_MELS", "64"))
+FEATURE_N_MFCC = int(os.getenv("FEATURE_N_MFCC", "13"))
+FEATURE_FMIN = float(os.getenv("FEATURE_FMIN", "0"))
+FEATURE_FMAX = float(os.getenv("FEATURE_FMAX", "8000"))
+
+# Floor for log(), so silence does not produce -inf
+LOG_EPSILON = 1e-10
+
+
+def _hz_to_mel(hz):
+    return 2595.0 * np.log10(1.0 + np.asarray(hz) / 700.0)
+
+
+def _mel_to_hz(mel):
+    return 700.0 * (10.0 ** (np.asarray(mel) / 2595.0) - 1.0)
+
+
+@lru_cache(maxsize=8)
+def mel_filterbank(sample_rate: int, n_fft: int, n_mels: int, fmin: float, fmax: float) -> np.ndarray:
+    """Triangular mel filters, shape (n_mels, n_fft // 2 + 1)"""
+    fmax = min(fmax, sample_rate / 2)
+    mel_points = np.linspace(_hz_to_mel(fmin), _hz_to_mel(fmax), n_mels + 2)
+    hz_points = _mel_to_hz(mel_points)
+    fft_freqs = np.linspace(0, sample_rate / 2, n_fft // 2 + 1)
+
+    lower = hz_points[:-2, None]
+    center = hz_points[1:-1, None]
+    upper = hz_points[2:, None]
+    rising = (fft_freqs[None, :] - lower) / np.maximum(center - lower, 1e-9)
+    falling = (upper - fft_freqs[None, :]) / np.maximum(upper - center, 1e-9)
+    filters = np.maximum(0.0, np.minimum(rising, falling))
+    filters.setflags(write=False)
+    return filters.astype(np.float32)
+
+
+@lru_cache(maxsize=8)
+def dct_matrix(n_mfcc: int, n_mels: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, shape (n_mfcc, n_mels)"""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    basis = np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    basis.setflags(write=False)
+    return basis.astype(np.float32)
+
+
+@lru_cache(maxsize=8)
+def _window(win_length: int, n_fft: int) -> np.ndarray:
+    """Periodic Hann window centered in an n_fft frame"""
+    window = np.zeros(n_fft, dtype=np.float32)
+    offset = (n_fft - win_length) // 2
+    window[offset:offset + win_length] = np.hanning(win_length + 1)[:-1]
+    window.setflags(write=False)
+    return window
+
+
+def frame_signal(samples: np.ndarray, n_fft: int = FEATURE_N_FFT, hop_length: int = FEATURE_HOP_LENGTH) -> np.ndarray:
+    """Overlapping frames as a strided view, shape (..., frames, n_fft); short clips are padded"""
+    samples = np.asarray(samples, dtype=np.float32)
+    if samples.shape[-1] < n_fft:
+        padding = [(0, 0)] * (samples.ndim - 1) + [(0, n_fft - samples.shape[-1])]
+        samples = np.pad(samples, padding)
+    n_frames = 1 + (samples.shape[-1] - n_fft) // hop_length
+    return np.lib.stride_tricks.sliding_window_view(samples, n_fft, axis=-1)[..., ::hop_length, :][..., :n_frames, :]
+
+
+def n_frames(n_samples: int, n_fft: int = FEATURE_N_FFT, hop_length: int = FEATURE_HOP_LENGTH) -> int:
+    """Number of frames frame_signal produces for a clip of n_samples"""
+    return 1 + (max(n_samples, n_fft) - n_fft) // hop_length
+
+
+def power_spectrogram(
+    samples: np.ndarray,
+    n_fft: int = FEATURE_N_FFT,
+    win_length: int = FEATURE_WIN_LENGTH,
+    hop_length: int = FEATURE_HOP_LENGTH
+) -> np.ndarray:
+    """|STFT|^2 of a clip or a (clips, samples) batch, shape (..., frames, n_fft // 2 + 1)"""
+    frames = frame_signal(samples, n_fft, hop_length) * _window(win_length, n_fft)
+    spectrum = np.fft.rfft(frames, n=n_fft, axis=-1)
+    return (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+
+
+def log_mel_from_power(power: np.ndarray, sample_rate: int = FEATURE_SAMPLE_RATE) -> np.ndarray:
+    """Log mel energies from a power spectrogram (any leading batch dims), last axis n_mels"""
+    n_fft = (power.shape[-1] - 1) * 2
+    filters = mel_filterbank(sample_rate, n_fft, FEATURE_N_MELS, FEATURE_FMIN, FEATURE_FMAX)
+    return np.log(np.maximum(power @ filters.T, LOG_EPSILON))
+
+
+def mfcc_from_log_mel(log_mel: np.ndarray, n_mfcc: int = FEATURE_N_MFCC) -> np.ndarray:
+    """MFCCs from log mel energies (any leading batch dims), last axis n_mfcc"""
+    return log_mel @ dct_matrix(n_mfcc, log_mel.shape[-1]).T
+
+
+def summary_vector(mfcc: np.ndarray) -> np.ndarray:
+    """Fixed-length clip descriptor: per-coefficient mean and std over time"""
+    return np.concatenate([mfcc.mean(axis=-2), mfcc.std(axis=-2)], axis=-1).astype(np.float32)
+
+
+def extract_features(samples: np.ndarray, sample_rate: int = FEATURE_SAMPLE_RATE) -> Dict[str, np.ndarray]:
+    """
+    All features of one clip
+
+    log_mel (frames, n_mels), mfcc (frames, n_mfcc) and mfcc_stats (2 * n_mfcc,).
+    """
+    log_mel = log_mel_from_power(power_spectrogram(samples), sample_rate)
+    mfcc = mfcc_from_log_mel(log_mel)
+    return {
+        "log_mel": log_mel.astype(np.float32),
+        "mfcc": mfcc.astype(np.float32),
+        "mfcc_stats": summary_vector(mfcc),
+    }
+
+
+def extract_features_batch(clips: List[np.ndarray], sample_rate: int = FEATURE_SAMPLE_RATE) -> List[Dict[str, np.ndarray]]:
+    """
+    Features of many clips in one vectorized pass
+
+    The clips are zero-padded to the longest one and stacked, so framing, the
+    FFT and the mel/DCT matrix products each run once for the whole batch.
+    Every result is then trimmed to the clip's own frames, which makes it
+    identical to extract_features() on that clip alone.
+    """
+    if not clips:
+        return []
+    longest = max(len(clip) for clip in clips)
+    batch = np.zeros((len(clips), longest), dtype=np.float32)
+    for row, clip in zip(batch, clips):
+        row[:len(clip)] = clip
+
+    log_mel = log_mel_from_power(power_spectrogram(batch), sample_rate).astype(np.float32)
+    mfcc = mfcc_from_log_mel(log_mel).astype(np.float32)
+    results = []
+    for i, clip in enumerate(clips):
+        frames = n_frames(len(clip))
+        results.append({
+            "log_mel": log_mel[i, :frames],
+            "mfcc": mfcc[i, :frames],
+            "mfcc_stats": summary_vector(mfcc[i, :frames]),
+        })
+    return results
@@ -0,0 +1,353 @@
+"""
+In-process cry classification.
+
+With INFERENCE_ENABLED the API can classify recordings itself instead of
+calling the remote model at PREDICTION_API_URL. A clip is decoded to mono at
+FEATURE_SAMPLE_RATE, turned into spectral features (features.py) and fed to
+a pluggable model runner:
+
+- "*.onnx": ONNX Runtime on CPU (needs `pip install onnxruntime`)
+- "*.npz": a linear softmax classifier (arrays `weights` (n_features,
+  n_labels), `bias`, optional `labels`, `mean`, `scale`), useful for small
+  models and for development without ONNX Runtime
+
+Decoding, feature extraction and the model are CPU bound, so they run in a
+process pool; every worker process loads the model once, when the pool is
+started on app startup. Results use the same fields as the remote API
+(prediction_value, predicted_label, confidence in percent, processing_time,
+timestamp), so clients can display either.
+"""
+
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INFERENCE_ENABLED = os.getenv("INFERENCE_ENABLED", "False").lower() == "true"
+INFERENCE_MODEL_PATH = os.getenv("INFERENCE_MODEL_PATH", "models/cry_classifier.onnx")
+INFERENCE_MODEL_VERSION = os.getenv("INFERENCE_MODEL_VERSION") or Path(INFERENCE_MODEL_PATH).stem
+# Which feature the model takes: "mfcc_stats" (vector), "log_mel" or "mfcc" (frames x bins)
+INFERENCE_INPUT_FEATURE = os.getenv("INFERENCE_INPUT_FEATURE", "mfcc_stats")
+INFERENCE_LABELS = [
+    label.strip()
+    for label in os.getenv("INFERENCE_LABELS", "Hungry,Tired/Sleepy,Uncomfortable,Pain,Needs Attention").split(",")
+    if label.strip()
+]
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+# Longer recordings are truncated before feature extraction
+INFERENCE_MAX_SECONDS = float(os.getenv("INFERENCE_MAX_SECONDS", "30"))
+
+
+class ModelRunner(ABC):
+    """Interface for model backends: a batch of features in, class probabilities out"""
+
+    labels: List[str] = []
+
+    @abstractmethod
+    def predict(self, batch):
+        """Probabilities, shape (batch, len(labels))"""
+
+
+def _softmax(logits):
+    import numpy as np
+
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class LinearRunner(ModelRunner):
+    """Softmax regression stored as a .npz file"""
+
+    def __init__(self, path: str):
+        import numpy as np
+
+        with np.load(path, allow_pickle=False) as model:
+            self.weights = model["weights"].astype(np.float32)
+            self.bias = model["bias"].astype(np.float32) if "bias" in model else 0.0
+            self.mean = model["mean"].astype(np.float32) if "mean" in model else 0.0
+            self.scale = model["scale"].astype(np.float32) if "scale" in model else 1.0
+            self.labels = [str(label) for label in model["labels"]] if "labels" in model else INFERENCE_LABELS
+        if self.weights.shape[1] != len(self.labels):
+            raise ValueError(f"Model has {self.weights.shape[1]} outputs but {len(self.labels)} labels")
+
+    def predict(self, batch):
+        batch = batch.reshape(batch.shape[0], -1)
+        return _softmax((batch - self.mean) / self.scale @ self.weights + self.bias)
+
+
+class OnnxRunner(ModelRunner):
+    """ONNX Runtime CPU session (one intra-op thread: the process pool provides the parallelism)"""
+
+    def __init__(self, path: str):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.labels = metadata["labels"].split(",") if "labels" in metadata else INFERENCE_LABELS
+
+    def predict(self, batch):
+        import numpy as np
+
+        outputs = self.session.run(None, {self.input_name: batch.astype(np.float32)})[0]
+        # Models exported without a softmax layer return logits
+        if not np.allclose(outputs.sum(axis=-1), 1.0, atol=1e-3) or (outputs < 0).any():
+            outputs = _softmax(outputs)
+        return outputs
+
+
+def load_runner(path: str) -> ModelRunner:
+    """Model runner for a model file, picked by extension"""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".onnx":
+        return OnnxRunner(path)
+    if suffix == ".npz":
+        return LinearRunner(path)
+    raise ValueError(f"Unsupported model format: {path}")
+
+
+# Per worker process: the model is loaded once by the pool initializer
+_runner: Optional[ModelRunner] = None
+
+
+def init_worker(model_path: str):
+    global _runner
+    _runner = load_runner(model_path)
+
+
+def _worker_ready() -> int:
+    # Keeps each warm-up task busy briefly so every worker process gets spawned
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def format_result(probabilities, labels: List[str], processing_time: float, audio_duration: float) -> Dict[str, Any]:
+    """Prediction result in the same shape as the remote prediction API"""
+    best = int(probabilities.argmax())
+    return {
+        "prediction_value": float(best),
+        "predicted_label": labels[best],
+        "confidence": round(float(probabilities[best]) * 100, 2),
+        "probabilities": {label: round(float(p), 4) for label, p in zip(labels, probabilities)},
+        "processing_time": round(processing_time, 5),
+        "timestamp": datetime.utcnow().isoformat(),
+        "model_version": INFERENCE_MODEL_VERSION,
+        "audio_duration": round(audio_duration, 3),
+        "source": "in-process",
+    }
+
+
+def _decode_clip(path: str):
+    from audio_normalize import decode_audio
+    from features import FEATURE_SAMPLE_RATE
+
+    samples = decode_audio(path, FEATURE_SAMPLE_RATE)
+    audio_duration = len(samples) / FEATURE_SAMPLE_RATE
+    return samples[:int(INFERENCE_MAX_SECONDS * FEATURE_SAMPLE_RATE)], audio_duration
+
+
+def classify_file(path: str) -> Dict[str, Any]:
+    """Decode, featurize and classify one recording (runs in a worker process)"""
+    from features import extract_features
+
+    started = time.perf_counter()
+    samples, audio_duration = _decode_clip(path)
+    features = extract_features(samples)[INFERENCE_INPUT_FEATURE]
+    probabilities = _runner.predict(features[None])[0]
+    return format_result(probabilities, _runner.labels, time.perf_counter() - started, audio_duration)
+
+
+def classify_samples(samples, sample_rate: int) -> Dict[str, Any]:
+    """Classify raw mono float32 samples, e.g. a streaming window (runs in a worker process)"""
+    from audio_normalize import resample
+    from features import FEATURE_SAMPLE_RATE, extract_features
+
+    started = time.perf_counter()
+    samples = resample(samples, sample_rate, FEATURE_SAMPLE_RATE)
+    features = extract_features(samples)[INFERENCE_INPUT_FEATURE]
+    probabilities = _runner.predict(features[None])[0]
+    return format_result(
+        probabilities, _runner.labels, time.perf_counter() - started, len(samples) / FEATURE_SAMPLE_RATE
+    )
+
+
+def _featurize_batch(paths: List[str]):
+    """Decode every clip, then featurize the decodable ones in one batch; errors are per clip"""
+    from features import extract_features_batch
+
+    clips, durations, errors = [], [], []
+    for path in paths:
+        try:
+            samples, audio_duration = _decode_clip(path)
+            error = None
+        except Exception as e:
+            samples, audio_duration, error = None, 0.0, str(e)
+        clips.append(samples)
+        durations.append(audio_duration)
+        errors.append(error)
+    decoded = [clip for clip in clips if clip is not None]
+    features = iter(extract_features_batch(decoded))
+    return [(None if clip is None else next(features)) for clip in clips], durations, errors
+
+
+def featurize_files(paths: List[str], feature: str) -> List[Dict[str, Any]]:
+    """One feature for a batch of recordings (runs in a worker process; no model needed)"""
+    features, durations, errors = _featurize_batch(paths)
+    results = []
+    for clip_features, audio_duration, error in zip(features, durations, errors):
+        if error is not None:
+            results.append({"error": error})
+        else:
+            results.append({
+                "audio_duration": round(audio_duration, 3),
+                "frames": int(clip_features["mfcc"].shape[0]),
+                feature: clip_features[feature],
+            })
+    return results
+
+
+def classify_files(paths: List[str]) -> List[Dict[str, Any]]:
+    """Classify recordings with batched features and one model call (in a worker process)"""
+    import numpy as np
+
+    started = time.perf_counter()
+    features, durations, errors = _featurize_batch(paths)
+    inputs = [clip[INFERENCE_INPUT_FEATURE] for clip in features if clip is not None]
+    if inputs and all(item.shape == inputs[0].shape for item in inputs):
+        probabilities = iter(_runner.predict(np.stack(inputs)))
+    else:
+        # Frame-level inputs of different lengths cannot be stacked
+        probabilities = iter([_runner.predict(item[None])[0] for item in inputs])
+    per_clip = (time.perf_counter() - started) / max(1, len(paths))
+
+    results = []
+    for clip, audio_duration, error in zip(features, durations, errors):
+        if error is not None:
+            results.append({"error": error})
+        else:
+            results.append(format_result(next(probabilities), _runner.labels, per_clip, audio_duration))
+    return results
+
+
+class InferenceEngine:
+    """Process pool of model workers, with latency counters"""
+
+    def __init__(self, model_path: str, workers: int):
+        self.model_path = model_path
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._model_loaded = False
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._calls = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        """True once the model is loaded in the workers"""
+        return self._model_loaded
+
+    async def start(self):
+        """Start the worker processes and load the model in each (called on app startup)"""
+        if self._model_loaded:
+            return
+        # A pool started for feature extraction only has no model in its workers
+        self.shutdown()
+        # Fail fast on a missing or broken model instead of on the first request
+        load_runner(self.model_path)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=init_worker,
+            initargs=(self.model_path,)
+        )
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.gather(*(
+                loop.run_in_executor(self._executor, _worker_ready) for _ in range(self.workers)
+            ))
+        except Exception:
+            self.shutdown()
+            raise
+        self._model_loaded = True
+
+    async def _run(self, fn, *args, clips: int = 1):
+        started = time.perf_counter()
+        self._in_flight += clips
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, fn, *args)
+        except Exception:
+            self._failed += clips
+            raise
+        finally:
+            self._in_flight -= clips
+        latency = time.perf_counter() - started
+        self._completed += clips
+        self._calls += 1
+        self._latency_total += latency
+        self._latency_max = max(self._latency_max, latency)
+        return result
+
+    async def classify(self, path: str) -> Dict[str, Any]:
+        """Classify a recording on the pool"""
+        if not self._model_loaded:
+            raise RuntimeError("Inference engine is not running")
+        return await self._run(classify_file, path)
+
+    async def classify_samples(self, samples, sample_rate: int) -> Dict[str, Any]:
+        """Classify in-memory mono samples on the pool"""
+        if not self._model_loaded:
+            raise RuntimeError("Inference engine is not running")
+        return await self._run(classify_samples, samples, sample_rate)
+
+    async def classify_batch(self, paths: List[str]) -> List[Dict[str, Any]]:
+        """Classify several recordings in one worker call; failed clips give {"error": ...}"""
+        if not self._model_loaded:
+            raise RuntimeError("Inference engine is not running")
+        return await self._run(classify_files, paths, clips=len(paths))
+
+    async def featurize_batch(self, paths: List[str], feature: str) -> List[Dict[str, Any]]:
+        """Features for several recordings in one worker call (starts a pool without a model)"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return await self._run(featurize_files, paths, feature, clips=len(paths))
+
+    def stats(self) -> Dict[str, Any]:
+        """Engine counters for the /metrics endpoint"""
+        calls = self._calls or 1
+        return {
+            "enabled": INFERENCE_ENABLED,
+            "running": self.running,
+            "model": self.model_path,
+            "model_version": INFERENCE_MODEL_VERSION,
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            # Per worker call (a batch counts once)
+            "avg_latency_ms": round(self._latency_total / calls * 1000, 2),
+            "max_latency_ms": round(self._latency_max * 1000, 2),
+        }
+
+    def shutdown(self):
+        """Stop the worker processes (called on app shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._model_loaded = False
+
+
+inference_engine = InferenceEngine(INFERENCE_MODEL_PATH, INFERENCE_WORKERS)
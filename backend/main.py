@@ -1,9 +1,29 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import init_database
+from database import init_database, connect_to_mongo, close_mongo_connection
+from password_pool import password_pool
+from token_cache import token_cache
+from prediction_client import (
+    start_prediction_client,
+    close_prediction_client,
+    upstream_timings,
+    batching_stats,
+    prediction_flights
+)
+from prediction_cache import prediction_cache
+from upload_queue import upload_queue
+from audio_normalize import audio_normalizer
+from inference import INFERENCE_ENABLED, inference_engine
+from upload_sessions import start_session_gc, stop_session_gc
+from rescore_jobs import rescore_runner
+from audio_stream import stream_stats
+from fast_json import default_response_class
 from routes_auth import router as auth_router
 from routes_predictions import router as predictions_router
+from routes_audio_uploads import router as audio_uploads_router
+from routes_rescore_jobs import router as rescore_jobs_router
 from routes_audio_predictions import router as audio_predictions_router
+from routes_audio_stream import router as audio_stream_router
 import os
 from dotenv import load_dotenv
 
@@ -13,7 +33,9 @@ load_dotenv()
 app = FastAPI(
     title="Neoparental Prediction API",
     description="API for user authentication and audio cry predictions",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson rendering with FAST_JSON_ENABLED (see fast_json.py)
+    default_response_class=default_response_class()
 )
 
 # Configure CORS
@@ -23,22 +45,53 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let browser clients read the keyset pagination cursor
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Initialize database
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Create shared clients and initialize database on startup"""
+    start_prediction_client()
     try:
-        init_database()
+        await connect_to_mongo()
+        await init_database()
         print("✓ Database initialized successfully")
+        upload_queue.start()
+        start_session_gc()
     except Exception as e:
         print(f"✗ Error initializing database: {e}")
+    if INFERENCE_ENABLED:
+        try:
+            await inference_engine.start()
+            print(f"✓ Inference model loaded ({inference_engine.workers} workers)")
+            rescore_runner.start()
+        except Exception as e:
+            print(f"✗ Error loading inference model: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close shared clients and worker pools on shutdown"""
+    await upload_queue.stop()
+    await stop_session_gc()
+    await rescore_runner.stop()
+    close_mongo_connection()
+    await close_prediction_client()
+    password_pool.shutdown()
+    audio_normalizer.shutdown()
+    inference_engine.shutdown()
+    print("✓ Database connection closed")
 
 # Include routers
 app.include_router(auth_router)
 app.include_router(predictions_router)
+# Before the audio predictions router so /uploads and /rescore-jobs are not taken for a prediction ID
+app.include_router(audio_uploads_router)
+app.include_router(rescore_jobs_router)
 app.include_router(audio_predictions_router)
+app.include_router(audio_stream_router)
 
 
 @app.get("/")
@@ -62,6 +115,24 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime counters for capacity tuning"""
+    return {
+        "password_pool": password_pool.stats(),
+        "token_cache": token_cache.stats(),
+        "prediction_api": upstream_timings.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "prediction_batching": batching_stats(),
+        "prediction_coalescing": prediction_flights.stats(),
+        "upload_queue": upload_queue.stats(),
+        "audio_normalize": audio_normalizer.stats(),
+        "inference": inference_engine.stats(),
+        "rescore_jobs": rescore_runner.stats(),
+        "audio_stream": stream_stats.stats()
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     debug = os.getenv("DEBUG", "False").lower() == "true"
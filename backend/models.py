@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 from bson import ObjectId
 
@@ -45,6 +45,11 @@ class UserResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
 
 
 # Prediction Models (Legacy - keep for backward compatibility)
@@ -84,12 +89,39 @@ class AudioPredictionResponse(BaseModel):
     audio_size: Optional[int] = None
     audio_duration: Optional[float] = None
     prediction_result: Dict[str, Any]
+    # Size of the upload before normalization (None when stored as uploaded)
+    original_size: Optional[int] = None
+    # "pending" while a background upload runs, then "stored" or "failed"
+    status: str = "stored"
     created_at: datetime
 
     class Config:
         json_encoders = {ObjectId: str}
 
 
+class AudioPredictionStatusResponse(BaseModel):
+    """Model for polling the upload status of an audio prediction"""
+    id: str
+    status: str
+    audio_url: str
+    error: Optional[str] = None
+
+
+class AudioInferenceResponse(BaseModel):
+    """Model for an in-process prediction (optionally saved as an audio prediction)"""
+    prediction_result: Dict[str, Any]
+    # Set when the recording was saved with save=true
+    prediction_id: Optional[str] = None
+    status: Optional[str] = None
+
+
+class AudioFeatureBatchRequest(BaseModel):
+    """Model for requesting spectral features of several saved recordings"""
+    prediction_ids: List[str]
+    # "mfcc_stats" (vector), "mfcc" or "log_mel" (frames x bins)
+    feature: str = "mfcc_stats"
+
+
 class AudioPredictionListResponse(BaseModel):
     """Model for listing audio predictions"""
     id: str
@@ -97,7 +129,53 @@ class AudioPredictionListResponse(BaseModel):
     audio_url: str
     predicted_label: Optional[str] = None
     confidence: Optional[float] = None
+    status: str = "stored"
     created_at: datetime
 
     class Config:
         json_encoders = {ObjectId: str}
+
+
+class UploadSessionCreate(BaseModel):
+    """Model for starting a resumable audio upload"""
+    filename: str
+    total_size: Optional[int] = None
+
+
+class UploadSessionResponse(BaseModel):
+    """Model for the state of a resumable audio upload"""
+    id: str
+    filename: str
+    offset: int
+    total_size: Optional[int] = None
+    max_chunk_size: int
+    status: str
+    expires_at: datetime
+
+
+class UploadSessionFinalize(BaseModel):
+    """Model for finishing a resumable audio upload"""
+    prediction_result: Dict[str, Any]
+    audio_duration: Optional[float] = None
+    # Optional SHA-256 (hex) of the whole file, checked before storing
+    sha256: Optional[str] = None
+
+
+class RescoreJobResponse(BaseModel):
+    """Model for the progress of a re-scoring job"""
+    id: str
+    status: str
+    model_version: str
+    processed: int
+    rescored: int
+    failed: int
+    clips_per_second: float
+    elapsed_seconds: float
+    last_error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        # "model_version" is a field here, not a pydantic attribute
+        protected_namespaces = ()
@@ -0,0 +1,52 @@
+"""
+Opaque cursors for keyset pagination of history lists.
+
+skip/limit makes MongoDB walk and discard every skipped document, so deep
+pages get linearly slower. A cursor instead encodes the sort key of the
+last item returned, (created_at, _id), and the next page starts right after
+it on the (user_id, created_at, _id) index, so every page costs the same.
+Cursors are url-safe base64 JSON; clients pass back the X-Next-Cursor value
+they received and should not build them.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Response, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Newest first, _id breaks ties between documents created in the same millisecond
+HISTORY_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def encode_cursor(document: Dict[str, Any]) -> str:
+    payload = json.dumps({"t": document["created_at"].isoformat(), "id": str(document["_id"])})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Query filter selecting the documents after a cursor in HISTORY_SORT order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(payload["t"])
+        last_id = ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": last_id}},
+    ]}
+
+
+def set_next_cursor(response: Response, documents: List[Dict[str, Any]], limit: int):
+    """Send the cursor for the next page when this page is full (there may be more)"""
+    if limit > 0 and len(documents) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(documents[-1])
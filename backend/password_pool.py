@@ -0,0 +1,113 @@
+"""
+Bounded worker pool for password hashing.
+
+bcrypt is deliberately slow (~200ms per call). Running it inline in an async
+handler pins the event loop, so hashing and verification are dispatched to a
+dedicated thread pool (bcrypt releases the GIL). The number of calls waiting
+for a worker is capped; once the pool is saturated callers get a 503 instead
+of piling up behind a login storm.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from fastapi import HTTPException, status
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_POOL_MAX_QUEUE = int(os.getenv("PASSWORD_POOL_MAX_QUEUE", "64"))
+PASSWORD_POOL_RETRY_AFTER = os.getenv("PASSWORD_POOL_RETRY_AFTER", "1")
+
+
+class PasswordPool:
+    """Thread pool with a queue-depth limit and wait/hash time metrics"""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Only touched from the event loop thread, so no lock needed
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._hash_time_total = 0.0
+        self._hash_time_max = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a free worker"""
+        return max(0, self._in_flight - self.workers)
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Run a password function on the pool, rejecting with 503 when saturated"""
+        if self._in_flight >= self.workers + self.max_queue:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry",
+                headers={"Retry-After": PASSWORD_POOL_RETRY_AFTER}
+            )
+
+        def timed_call():
+            started = time.perf_counter()
+            result = func(*args)
+            return result, started, time.perf_counter()
+
+        self._in_flight += 1
+        self._submitted += 1
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, finished = await loop.run_in_executor(self._get_executor(), timed_call)
+        finally:
+            self._in_flight -= 1
+
+        queue_wait = started - submitted
+        hash_time = finished - started
+        self._completed += 1
+        self._queue_wait_total += queue_wait
+        self._queue_wait_max = max(self._queue_wait_max, queue_wait)
+        self._hash_time_total += hash_time
+        self._hash_time_max = max(self._hash_time_max, hash_time)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool counters for the /metrics endpoint"""
+        completed = self._completed or 1
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_queue_wait_ms": round(self._queue_wait_total / completed * 1000, 2),
+            "max_queue_wait_ms": round(self._queue_wait_max * 1000, 2),
+            "avg_hash_time_ms": round(self._hash_time_total / completed * 1000, 2),
+            "max_hash_time_ms": round(self._hash_time_max * 1000, 2),
+        }
+
+    def shutdown(self):
+        """Stop the worker threads (called on app shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_pool = PasswordPool(PASSWORD_POOL_WORKERS, PASSWORD_POOL_MAX_QUEUE)
@@ -0,0 +1,112 @@
+"""
+Micro-batching in front of the prediction API.
+
+Concurrent prediction requests are collected for up to a short window (or
+until the batch is full) and sent upstream as one batch request; results are
+fanned back to the awaiting handlers. Every request keeps its own deadline,
+and requests whose deadline expired before the flush are dropped from the
+batch instead of being sent.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import httpx
+
+BatchSender = Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]
+
+
+class PredictionBatcher:
+    """Collects concurrent predictions into upstream batch calls"""
+
+    def __init__(self, send_batch: BatchSender, window_ms: float, max_size: int, deadline_ms: float):
+        self.send_batch = send_batch
+        self.window = window_ms / 1000
+        self.max_size = max_size
+        self.deadline = deadline_ms / 1000
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # In-flight sends; the loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self._batches = 0
+        self._items = 0
+        self._size_flushes = 0
+        self._window_flushes = 0
+        self._expired = 0
+        self._errors = 0
+
+    async def submit(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue one prediction and wait for its slot in a batch response"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((input_data, future))
+
+        if len(self._pending) >= self.max_size:
+            self._size_flushes += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_on_window)
+
+        try:
+            # wait_for cancels the future on timeout, so the flush skips it
+            return await asyncio.wait_for(future, self.deadline)
+        except asyncio.TimeoutError:
+            self._expired += 1
+            raise httpx.TimeoutException("Prediction batch deadline exceeded")
+
+    def _flush_on_window(self):
+        self._window_flushes += 1
+        self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        batch = [(input_data, future) for input_data, future in batch if not future.done()]
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        """Send what is queued and wait for in-flight batches (before closing the client)"""
+        if self._pending:
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _send(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        self._batches += 1
+        self._items += len(batch)
+        try:
+            results = await self.send_batch([input_data for input_data, _ in batch])
+            if len(results) != len(batch):
+                raise httpx.DecodingError(
+                    f"Batch response has {len(results)} results for {len(batch)} inputs"
+                )
+        except Exception as e:
+            self._errors += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching counters for the /metrics endpoint"""
+        return {
+            "window_ms": self.window * 1000,
+            "max_size": self.max_size,
+            "deadline_ms": self.deadline * 1000,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0,
+            "size_flushes": self._size_flushes,
+            "window_flushes": self._window_flushes,
+            "deadline_expired": self._expired,
+            "errors": self._errors,
+            "pending": len(self._pending),
+        }
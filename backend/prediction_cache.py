@@ -0,0 +1,122 @@
+"""
+Content-addressed cache of prediction API results.
+
+Results are keyed by a SHA-256 of the canonical JSON of `input_data` plus the
+model version tag, so identical payloads (retries, re-submits, updates with
+unchanged input) skip the upstream call. The first tier is an in-process LRU;
+an optional MongoDB tier with a TTL index shares results across workers.
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PREDICTION_MODEL_VERSION = os.getenv("PREDICTION_MODEL_VERSION", "v1")
+PREDICTION_CACHE_MAX_SIZE = int(os.getenv("PREDICTION_CACHE_MAX_SIZE", "1000"))
+PREDICTION_CACHE_TTL_SECONDS = int(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "3600"))
+PREDICTION_CACHE_MONGO_ENABLED = os.getenv("PREDICTION_CACHE_MONGO_ENABLED", "False").lower() == "true"
+
+# Values for the X-Prediction-Cache response header
+CACHE_HIT_MEMORY = "hit-memory"
+CACHE_HIT_MONGO = "hit-mongo"
+CACHE_MISS = "miss"
+# Miss that shared an identical in-flight upstream call
+CACHE_COALESCED = "coalesced"
+
+
+def prediction_cache_key(input_data: Dict[str, Any], model_version: str = PREDICTION_MODEL_VERSION) -> str:
+    """Canonical hash of the input payload and model version"""
+    canonical = json.dumps(input_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    digest = hashlib.sha256()
+    digest.update(model_version.encode())
+    digest.update(b"\0")
+    digest.update(canonical.encode())
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """Two-tier (memory LRU + optional Mongo) prediction result cache"""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # Only used from the event loop, so no lock needed
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_hits = 0
+        self._mongo_hits = 0
+        self._misses = 0
+
+    def _get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _put_memory(self, key: str, result: Dict[str, Any]):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = (time.time() + self.ttl_seconds, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str, store=None) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Look up a result; returns (result or None, cache status)"""
+        result = self._get_memory(key)
+        if result is not None:
+            self._memory_hits += 1
+            return result, CACHE_HIT_MEMORY
+
+        if store is not None:
+            result = await store.get(key, datetime.utcnow())
+            if result is not None:
+                self._mongo_hits += 1
+                self._put_memory(key, result)
+                return result, CACHE_HIT_MONGO
+
+        self._misses += 1
+        return None, CACHE_MISS
+
+    async def put(self, key: str, result: Dict[str, Any], store=None):
+        """Store a fresh upstream result in every enabled tier"""
+        self._put_memory(key, result)
+        if store is not None:
+            now = datetime.utcnow()
+            await store.put(key, {
+                "result": result,
+                "model_version": PREDICTION_MODEL_VERSION,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds)
+            })
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for the /metrics endpoint"""
+        hits = self._memory_hits + self._mongo_hits
+        lookups = hits + self._misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "model_version": PREDICTION_MODEL_VERSION,
+            "mongo_tier": PREDICTION_CACHE_MONGO_ENABLED,
+            "memory_hits": self._memory_hits,
+            "mongo_hits": self._mongo_hits,
+            "misses": self._misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0,
+            # Every hit is one upstream call avoided
+            "upstream_calls_saved": hits,
+        }
+
+
+prediction_cache = PredictionCache(PREDICTION_CACHE_MAX_SIZE, PREDICTION_CACHE_TTL_SECONDS)
@@ -0,0 +1,246 @@
+"""
+Shared HTTP client for the external prediction API.
+
+One long-lived httpx.AsyncClient is created on app startup so upstream calls
+reuse pooled keep-alive (HTTP/2 when available) connections instead of paying
+DNS + TLS handshakes per request. Each call is traced to split its time into
+connect, wait (time to first response byte) and transfer phases.
+"""
+
+import os
+import time
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from dotenv import load_dotenv
+from prediction_cache import prediction_cache, prediction_cache_key, CACHE_COALESCED
+from prediction_batcher import PredictionBatcher
+from single_flight import SingleFlight
+
+load_dotenv()
+
+PREDICTION_API_URL = os.getenv("PREDICTION_API_URL")
+
+# Connection pool and per-phase timeouts for the upstream model
+PREDICTION_API_HTTP2 = os.getenv("PREDICTION_API_HTTP2", "True").lower() == "true"
+PREDICTION_API_MAX_CONNECTIONS = int(os.getenv("PREDICTION_API_MAX_CONNECTIONS", "100"))
+PREDICTION_API_MAX_KEEPALIVE = int(os.getenv("PREDICTION_API_MAX_KEEPALIVE", "20"))
+PREDICTION_API_KEEPALIVE_EXPIRY = float(os.getenv("PREDICTION_API_KEEPALIVE_EXPIRY", "30"))
+PREDICTION_API_CONNECT_TIMEOUT = float(os.getenv("PREDICTION_API_CONNECT_TIMEOUT", "5"))
+PREDICTION_API_READ_TIMEOUT = float(os.getenv("PREDICTION_API_READ_TIMEOUT", "30"))
+PREDICTION_API_WRITE_TIMEOUT = float(os.getenv("PREDICTION_API_WRITE_TIMEOUT", "10"))
+PREDICTION_API_POOL_TIMEOUT = float(os.getenv("PREDICTION_API_POOL_TIMEOUT", "5"))
+
+# Optional micro-batching: the batch endpoint takes {"instances": [...]} and
+# returns one result per instance
+PREDICTION_BATCHING_ENABLED = os.getenv("PREDICTION_BATCHING_ENABLED", "False").lower() == "true"
+PREDICTION_BATCH_API_URL = os.getenv(
+    "PREDICTION_BATCH_API_URL",
+    f"{PREDICTION_API_URL.rstrip('/')}/batch" if PREDICTION_API_URL else None
+)
+PREDICTION_BATCH_WINDOW_MS = float(os.getenv("PREDICTION_BATCH_WINDOW_MS", "10"))
+PREDICTION_BATCH_MAX_SIZE = int(os.getenv("PREDICTION_BATCH_MAX_SIZE", "32"))
+PREDICTION_BATCH_DEADLINE_MS = float(os.getenv("PREDICTION_BATCH_DEADLINE_MS", "30000"))
+
+_client: Optional[httpx.AsyncClient] = None
+_batcher: Optional[PredictionBatcher] = None
+
+# Identical concurrent cache misses share one upstream call
+prediction_flights = SingleFlight()
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def start_prediction_client() -> httpx.AsyncClient:
+    """Create the shared upstream client (no-op if it already exists)"""
+    global _client, _batcher
+    if _client is not None:
+        return _client
+
+    http2 = PREDICTION_API_HTTP2 and _http2_available()
+    if PREDICTION_API_HTTP2 and not http2:
+        print("Warning: h2 is not installed, prediction API client falls back to HTTP/1.1")
+
+    _client = httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=PREDICTION_API_MAX_CONNECTIONS,
+            max_keepalive_connections=PREDICTION_API_MAX_KEEPALIVE,
+            keepalive_expiry=PREDICTION_API_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            connect=PREDICTION_API_CONNECT_TIMEOUT,
+            read=PREDICTION_API_READ_TIMEOUT,
+            write=PREDICTION_API_WRITE_TIMEOUT,
+            pool=PREDICTION_API_POOL_TIMEOUT
+        )
+    )
+    if PREDICTION_BATCHING_ENABLED:
+        _batcher = PredictionBatcher(
+            partial(request_prediction_batch, _client),
+            window_ms=PREDICTION_BATCH_WINDOW_MS,
+            max_size=PREDICTION_BATCH_MAX_SIZE,
+            deadline_ms=PREDICTION_BATCH_DEADLINE_MS
+        )
+    return _client
+
+
+async def close_prediction_client():
+    """Close the shared upstream client and its pooled connections"""
+    global _client, _batcher
+    if _batcher is not None:
+        await _batcher.close()
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _batcher = None
+
+
+def get_prediction_client() -> httpx.AsyncClient:
+    """Get the shared upstream client (FastAPI dependency)"""
+    return _client or start_prediction_client()
+
+
+class UpstreamTimings:
+    """Aggregated connect / wait / transfer time of upstream calls"""
+
+    PHASES = ("connect", "wait", "transfer", "total")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.new_connections = 0
+        self._sum = {phase: 0.0 for phase in self.PHASES}
+        self._max = {phase: 0.0 for phase in self.PHASES}
+
+    def record(self, phases: Dict[str, float], new_connection: bool):
+        self.calls += 1
+        if new_connection:
+            self.new_connections += 1
+        for phase in self.PHASES:
+            value = phases.get(phase, 0.0)
+            self._sum[phase] += value
+            self._max[phase] = max(self._max[phase], value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Upstream call counters for the /metrics endpoint"""
+        calls = self.calls or 1
+        result = {
+            "calls": self.calls,
+            "errors": self.errors,
+            "new_connections": self.new_connections,
+        }
+        for phase in self.PHASES:
+            result[f"avg_{phase}_ms"] = round(self._sum[phase] / calls * 1000, 2)
+            result[f"max_{phase}_ms"] = round(self._max[phase] * 1000, 2)
+        return result
+
+
+upstream_timings = UpstreamTimings()
+
+
+class _CallTrace:
+    """httpcore trace hook collecting phase timestamps for one request"""
+
+    def __init__(self):
+        self.marks: Dict[str, float] = {}
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]):
+        # e.g. "http11.receive_response_headers.complete" -> "receive_response_headers.complete"
+        _, _, event = event_name.partition(".")
+        self.marks.setdefault(event, time.perf_counter())
+
+    def phases(self, started: float, finished: float) -> Dict[str, float]:
+        marks = self.marks
+
+        def span(start_event: str, end_event: str) -> float:
+            if start_event in marks and end_event in marks:
+                return max(0.0, marks[end_event] - marks[start_event])
+            return 0.0
+
+        connect_end = "start_tls.complete" if "start_tls.complete" in marks else "connect_tcp.complete"
+        return {
+            "connect": span("connect_tcp.started", connect_end),
+            "wait": span("send_request_body.complete", "receive_response_headers.complete"),
+            "transfer": span("receive_response_body.started", "receive_response_body.complete"),
+            "total": finished - started,
+        }
+
+    @property
+    def new_connection(self) -> bool:
+        return "connect_tcp.started" in self.marks
+
+
+async def _post_upstream(client: httpx.AsyncClient, url: str, payload: Any) -> Any:
+    """POST JSON upstream with phase tracing; raises httpx.HTTPError on failure"""
+    trace = _CallTrace()
+    started = time.perf_counter()
+    try:
+        response = await client.post(
+            url,
+            json=payload,
+            extensions={"trace": trace}
+        )
+        response.raise_for_status()
+        result = response.json()
+    except httpx.HTTPError:
+        upstream_timings.errors += 1
+        raise
+
+    upstream_timings.record(trace.phases(started, time.perf_counter()), trace.new_connection)
+    return result
+
+
+async def request_prediction(client: httpx.AsyncClient, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Call the external prediction API; raises httpx.HTTPError on failure"""
+    return await _post_upstream(client, PREDICTION_API_URL, input_data)
+
+
+async def request_prediction_batch(
+    client: httpx.AsyncClient,
+    inputs: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Call the batch prediction endpoint with several inputs at once"""
+    result = await _post_upstream(client, PREDICTION_BATCH_API_URL, {"instances": inputs})
+    if isinstance(result, dict):
+        result = result.get("predictions", [])
+    return result
+
+
+def batching_stats() -> Optional[Dict[str, Any]]:
+    """Micro-batching counters, or None when batching is disabled"""
+    return _batcher.stats() if _batcher is not None else None
+
+
+async def fetch_prediction(
+    client: httpx.AsyncClient,
+    input_data: Dict[str, Any],
+    cache_store=None
+) -> Tuple[Dict[str, Any], str]:
+    """Get a prediction, serving identical inputs from the result cache
+
+    Concurrent identical misses are coalesced into a single upstream call.
+    Returns (prediction result, cache status for the X-Prediction-Cache header).
+    """
+    key = prediction_cache_key(input_data)
+    result, cache_status = await prediction_cache.get(key, cache_store)
+    if result is not None:
+        return result, cache_status
+
+    async def call_upstream() -> Dict[str, Any]:
+        if _batcher is not None:
+            upstream_result = await _batcher.submit(input_data)
+        else:
+            upstream_result = await request_prediction(client, input_data)
+        await prediction_cache.put(key, upstream_result, cache_store)
+        return upstream_result
+
+    result, shared = await prediction_flights.do(key, call_upstream)
+    return result, CACHE_COALESCED if shared else cache_status
@@ -0,0 +1,276 @@
+"""
+Per-user audio prediction statistics, maintained incrementally.
+
+Instead of counting and aggregating every recording a user owns on each
+/audio-predictions/stats/summary call, one prediction_stats document per
+user (_id is the user id) holds the totals:
+
+    {"total": 42, "labels": {"Hungry": 30, "Tired": 12},
+     "confidence_sum": 3610.5, "confidence_count": 42, "complete": true}
+
+The same counters are kept per user and UTC hour in prediction_rollups
+({"user_id", "hour", "total", "labels", ...}), which the trends endpoint
+groups into hour, day or week buckets in the caller's time zone; a range
+reads at most one small document per active hour, however long the history.
+
+Recordings are counted under prediction_label(), the same label the
+history list filters on (audio_ingest.label_fields).
+
+Saving a recording applies a $inc of +1 to both, deleting one a $inc of -1,
+and re-scoring moves the count from the old label to the new one, so both
+endpoints are plain reads. Documents are first built with one aggregation
+over the user's recordings (rebuild_prediction_stats); until then
+"complete" is missing and the first read rebuilds that user, so existing
+deployments need no migration. That first rebuild is not atomic with
+concurrent saves, so a recording saved while it runs can be miscounted;
+`python rebuild_prediction_stats.py` repairs this and any other drift.
+"""
+
+import os
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from repositories import AudioPredictionRepository, PredictionStatsRepository
+
+load_dotenv()
+
+# Most buckets one trends request may return
+TRENDS_MAX_BUCKETS = int(os.getenv("TRENDS_MAX_BUCKETS", "1000"))
+
+TREND_GRANULARITIES = ("hour", "day", "week")
+# Range used when the request has no start
+TREND_DEFAULT_SPANS = {"hour": timedelta(days=1), "day": timedelta(days=30), "week": timedelta(weeks=12)}
+
+# Label keys are stored as field names: escape what MongoDB does not allow there
+# (an empty field name too); "%" is always escaped, so these cannot clash
+_NO_LABEL_KEY = "%00"
+_EMPTY_LABEL_KEY = "%01"
+
+
+def label_key(label: Any) -> str:
+    if label is None:
+        return _NO_LABEL_KEY
+    if label == "":
+        return _EMPTY_LABEL_KEY
+    return str(label).replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def label_from_key(key: str) -> Optional[str]:
+    if key == _NO_LABEL_KEY:
+        return None
+    if key == _EMPTY_LABEL_KEY:
+        return ""
+    return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+
+def prediction_label(prediction_result: Optional[Dict[str, Any]]) -> Any:
+    """The label a result is counted and filtered by: predicted_label, else the raw model output"""
+    prediction_result = prediction_result or {}
+    label = prediction_result.get("predicted_label")
+    return label if label is not None else prediction_result.get("output")
+
+
+# prediction_label as an aggregation expression (for rebuild_prediction_stats)
+PREDICTION_LABEL_EXPRESSION = {"$ifNull": ["$prediction_result.predicted_label", "$prediction_result.output"]}
+
+
+def bucket_hour(created_at: Any) -> Optional[datetime]:
+    """Rollup key of a recording: its created_at truncated to the hour (naive UTC)"""
+    if not isinstance(created_at, datetime):
+        return None
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return created_at.replace(minute=0, second=0, microsecond=0)
+
+
+def _confidence(prediction_result: Optional[Dict[str, Any]]) -> Optional[float]:
+    confidence = (prediction_result or {}).get("confidence")
+    if isinstance(confidence, (int, float)) and not isinstance(confidence, bool):
+        return float(confidence)
+    return None
+
+
+def stats_increment(prediction_result: Optional[Dict[str, Any]], sign: int = 1) -> Dict[str, Any]:
+    """$inc fields for adding (sign=1) or removing (sign=-1) one recording with this result"""
+    increment: Dict[str, Any] = {"total": sign, f"labels.{label_key(prediction_label(prediction_result))}": sign}
+    confidence = _confidence(prediction_result)
+    if confidence is not None:
+        increment["confidence_sum"] = sign * confidence
+        increment["confidence_count"] = sign
+    return increment
+
+
+def merge_increments(target: Dict[str, Any], increment: Dict[str, Any]) -> Dict[str, Any]:
+    """Add one $inc document into another (for batching many changes per user)"""
+    for field, amount in increment.items():
+        target[field] = target.get(field, 0) + amount
+    return target
+
+
+def rescore_increment(old_result: Optional[Dict[str, Any]], new_result: Dict[str, Any]) -> Dict[str, Any]:
+    """$inc fields for replacing a recording's result; the total is unchanged"""
+    increment = merge_increments(stats_increment(old_result, -1), stats_increment(new_result))
+    return {field: amount for field, amount in increment.items() if amount != 0}
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {"total": 0, "labels": {}, "confidence_sum": 0.0, "confidence_count": 0}
+
+
+def _add_stats(target: Dict[str, Any], counts: Dict[str, Any]) -> Dict[str, Any]:
+    target["total"] += counts.get("total") or 0
+    for key, count in (counts.get("labels") or {}).items():
+        target["labels"][key] = target["labels"].get(key, 0) + count
+    target["confidence_sum"] += counts.get("confidence_sum") or 0
+    target["confidence_count"] += counts.get("confidence_count") or 0
+    return target
+
+
+def stats_summary(stats: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Response of GET /audio-predictions/stats/summary from a stats document"""
+    stats = stats or {}
+    labels = [
+        {"label": label_from_key(key), "count": count}
+        for key, count in (stats.get("labels") or {}).items()
+        if count > 0
+    ]
+    labels.sort(key=lambda item: (-item["count"], str(item["label"])))
+    confidence_count = stats.get("confidence_count") or 0
+    average = stats.get("confidence_sum", 0) / confidence_count if confidence_count > 0 else 0
+    return {
+        "total_predictions": max(stats.get("total") or 0, 0),
+        "predictions_by_label": labels,
+        "average_confidence": round(average, 2) if average else 0
+    }
+
+
+def _bucket_key(hour: datetime, granularity: str, tz: tzinfo):
+    """UTC hour for hourly buckets, else the local date the day or week (from Monday) starts on"""
+    if granularity == "hour":
+        return hour
+    day = hour.replace(tzinfo=timezone.utc).astimezone(tz).date()
+    return day if granularity == "day" else day - timedelta(days=day.weekday())
+
+
+def _bucket_start(key, tz: tzinfo) -> datetime:
+    if isinstance(key, datetime):
+        return key.replace(tzinfo=timezone.utc).astimezone(tz)
+    return datetime.combine(key, time(), tzinfo=tz)
+
+
+def _utc(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def trend_range(
+    granularity: str,
+    tz: tzinfo,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Tuple[datetime, datetime, List[Any]]:
+    """
+    UTC query range and bucket keys covering [start, end)
+
+    Naive start/end are local times in `tz`; start is rounded down to the
+    beginning of its bucket. Raises ValueError for empty or oversized ranges.
+    """
+    end = end.replace(tzinfo=tz) if end is not None and end.tzinfo is None else end
+    end = (end or datetime.now(tz)).astimezone(tz)
+    start = start.replace(tzinfo=tz) if start is not None and start.tzinfo is None else start
+    start = (start or end - TREND_DEFAULT_SPANS[granularity]).astimezone(tz)
+    if start >= end:
+        raise ValueError("start must be before end")
+    end_utc = _utc(end)
+
+    if granularity == "hour":
+        key = bucket_hour(_utc(start))
+        step = timedelta(hours=1)
+        too_many = (end_utc - key) / step > TRENDS_MAX_BUCKETS
+    else:
+        key = _bucket_key(bucket_hour(_utc(start)), granularity, tz)
+        step = timedelta(days=1 if granularity == "day" else 7)
+        too_many = (end.date() - key) / step > TRENDS_MAX_BUCKETS
+    if too_many:
+        raise ValueError(f"Range has more than {TRENDS_MAX_BUCKETS} {granularity} buckets")
+
+    keys = []
+    while _utc(_bucket_start(key, tz)) < end_utc:
+        keys.append(key)
+        key += step
+    return _utc(_bucket_start(keys[0], tz)), end_utc, keys
+
+
+def trend_buckets(rollups: List[Dict[str, Any]], granularity: str, tz: tzinfo, keys: List[Any]) -> List[Dict[str, Any]]:
+    """Hourly rollups summed into the requested buckets; empty buckets have zero counts"""
+    buckets = {key: _empty_stats() for key in keys}
+    for rollup in rollups:
+        bucket = buckets.get(_bucket_key(rollup["hour"], granularity, tz))
+        if bucket is not None:
+            _add_stats(bucket, rollup)
+    return [
+        {"start": _bucket_start(key, tz).isoformat(), **stats_summary(stats)}
+        for key, stats in buckets.items()
+    ]
+
+
+async def rebuild_prediction_stats(
+    audio_predictions: AudioPredictionRepository,
+    prediction_stats: PredictionStatsRepository,
+    user_id: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Recompute totals and hourly rollups from audio_predictions (one user, or all with user_id None)
+
+    Returns the rebuilt totals by user id. Documents the rebuild did not
+    produce (users or hours without recordings) are removed.
+    """
+    started = datetime.utcnow()
+    pipeline: List[Dict[str, Any]] = []
+    if user_id is not None:
+        pipeline.append({"$match": {"user_id": user_id}})
+    pipeline.append({"$group": {
+        "_id": {
+            "user_id": "$user_id",
+            # $dateTrunc needs MongoDB 5.0
+            "hour": {"$dateFromParts": {
+                "year": {"$year": "$created_at"},
+                "month": {"$month": "$created_at"},
+                "day": {"$dayOfMonth": "$created_at"},
+                "hour": {"$hour": "$created_at"}
+            }},
+            "label": PREDICTION_LABEL_EXPRESSION
+        },
+        "count": {"$sum": 1},
+        "confidence_sum": {"$sum": {"$cond": [
+            {"$isNumber": "$prediction_result.confidence"}, "$prediction_result.confidence", 0
+        ]}},
+        "confidence_count": {"$sum": {"$cond": [
+            {"$isNumber": "$prediction_result.confidence"}, 1, 0
+        ]}}
+    }})
+
+    rebuilt: Dict[str, Dict[str, Any]] = {}
+    rollups: Dict[str, Dict[datetime, Dict[str, Any]]] = {}
+    if user_id is not None:
+        rebuilt[user_id] = _empty_stats()
+    for row in await audio_predictions.aggregate(pipeline):
+        owner, hour = row["_id"]["user_id"], row["_id"].get("hour")
+        counts = {
+            "total": row["count"],
+            "labels": {label_key(row["_id"].get("label")): row["count"]},
+            "confidence_sum": row["confidence_sum"],
+            "confidence_count": row["confidence_count"],
+        }
+        _add_stats(rebuilt.setdefault(owner, _empty_stats()), counts)
+        if hour is not None:
+            _add_stats(rollups.setdefault(owner, {}).setdefault(hour, _empty_stats()), counts)
+
+    for owner, stats in rebuilt.items():
+        now = datetime.utcnow()
+        stats.update({"complete": True, "rebuilt_at": started, "updated_at": now})
+        await prediction_stats.replace(owner, stats, [
+            {"user_id": owner, "hour": hour, **counts, "updated_at": now}
+            for hour, counts in rollups.get(owner, {}).items()
+        ])
+    await prediction_stats.delete_stale(started, user_id)
+    return rebuilt
@@ -0,0 +1,47 @@
+"""
+Rebuild per-user prediction stats from the audio_predictions collection
+The totals behind /audio-predictions/stats/summary and the hourly rollups
+behind /audio-predictions/stats/trends are kept up to date with $inc on
+every save, delete and re-score (see prediction_stats.py). Run this
+to repair drift, e.g. after editing recordings directly in the database or
+after a failed stats update was logged.
+
+    python rebuild_prediction_stats.py
+    python rebuild_prediction_stats.py --user <user_id>
+"""
+
+import argparse
+import asyncio
+import time
+from database import connect_to_mongo, close_mongo_connection, get_database, init_database
+from repositories import AudioPredictionRepository, PredictionStatsRepository
+from prediction_stats import rebuild_prediction_stats
+
+
+async def run(user_id):
+    await connect_to_mongo()
+    await init_database()
+    db = get_database()
+    try:
+        start = time.perf_counter()
+        rebuilt = await rebuild_prediction_stats(
+            AudioPredictionRepository(db), PredictionStatsRepository(db), user_id
+        )
+        recordings = sum(stats["total"] for stats in rebuilt.values())
+        print(
+            f"✓ Rebuilt stats for {len(rebuilt)} users ({recordings} recordings) "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+    finally:
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", help="only this user's stats")
+    args = parser.parse_args()
+    asyncio.run(run(args.user))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,567 @@
+"""
+Async repositories for the MongoDB collections.
+
+Routers depend on these instead of touching Motor collections directly, so
+every database call is awaited and never blocks the event loop.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import Depends
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+from database import get_database
+from prediction_cache import PREDICTION_CACHE_MONGO_ENABLED
+from pagination import HISTORY_SORT
+
+
+class UserRepository:
+    """Data access for the users collection"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.users
+
+    async def find_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"email": email})
+
+    async def find_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"_id": ObjectId(user_id)})
+
+    async def insert(self, user_doc: Dict[str, Any]) -> str:
+        result = await self.collection.insert_one(user_doc)
+        return str(result.inserted_id)
+
+    async def update_password_hash(self, user_id: str, hashed_password: str):
+        await self.collection.update_one(
+            {"_id": ObjectId(user_id)},
+            {"$set": {"hashed_password": hashed_password}}
+        )
+
+
+class PredictionRepository:
+    """Data access for the predictions collection"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.predictions
+
+    async def insert(self, prediction_doc: Dict[str, Any]) -> str:
+        result = await self.collection.insert_one(prediction_doc)
+        return str(result.inserted_id)
+
+    async def list_for_user(
+        self,
+        user_id: str,
+        skip: int,
+        limit: int,
+        after: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Newest first; `after` is a keyset filter from pagination.decode_cursor (replaces skip)"""
+        query: Dict[str, Any] = {"user_id": user_id}
+        if after:
+            query.update(after)
+            skip = 0
+        cursor = self.collection.find(query).sort(HISTORY_SORT).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def get_for_user(self, prediction_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({
+            "_id": ObjectId(prediction_id),
+            "user_id": user_id
+        })
+
+    async def update(self, prediction_id: str, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one_and_update(
+            {"_id": ObjectId(prediction_id)},
+            {"$set": fields},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def delete_for_user(self, prediction_id: str, user_id: str) -> bool:
+        result = await self.collection.delete_one({
+            "_id": ObjectId(prediction_id),
+            "user_id": user_id
+        })
+        return result.deleted_count > 0
+
+
+class AudioPredictionRepository:
+    """Data access for the audio_predictions collection"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.audio_predictions
+
+    async def insert(self, audio_prediction_doc: Dict[str, Any]) -> str:
+        result = await self.collection.insert_one(audio_prediction_doc)
+        return str(result.inserted_id)
+
+    async def list_for_user(
+        self,
+        user_id: str,
+        skip: int,
+        limit: int,
+        after: Optional[Dict[str, Any]] = None,
+        label: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Newest first; `after` is a keyset filter from pagination.decode_cursor (replaces skip)
+
+        `projection` limits the fields MongoDB sends back; `label` filters on
+        the top-level predicted_label, or on prediction_result for documents
+        the backfill (backfill_label_fields.py) has not reached yet.
+        """
+        query: Dict[str, Any] = {"user_id": user_id}
+        if label is not None:
+            # Same rule as prediction_stats.prediction_label; $and because a cursor brings its own $or
+            not_backfilled = {"predicted_label": {"$exists": False}}
+            query["$and"] = [{"$or": [
+                {"predicted_label": label},
+                {**not_backfilled, "prediction_result.predicted_label": label},
+                {**not_backfilled, "prediction_result.predicted_label": None, "prediction_result.output": label},
+            ]}]
+        if after:
+            query.update(after)
+            skip = 0
+        cursor = self.collection.find(query, projection).sort(HISTORY_SORT).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def get_for_user(self, prediction_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({
+            "_id": ObjectId(prediction_id),
+            "user_id": user_id
+        })
+
+    async def list_without_label_fields(self, after_id: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        """Next page (by _id) of documents without the top-level predicted_label/confidence"""
+        query: Dict[str, Any] = {"predicted_label": {"$exists": False}}
+        if after_id:
+            query["_id"] = {"$gt": ObjectId(after_id)}
+        cursor = self.collection.find(query, {"prediction_result": 1}).sort("_id", 1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def list_by_ids_for_user(self, prediction_ids: List[str], user_id: str) -> List[Dict[str, Any]]:
+        cursor = self.collection.find({
+            "_id": {"$in": [ObjectId(prediction_id) for prediction_id in prediction_ids]},
+            "user_id": user_id
+        })
+        return await cursor.to_list(length=len(prediction_ids))
+
+    async def find_by_storage_key(self, storage_key: str, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"storage_key": storage_key, "user_id": user_id})
+
+    async def find_by_id(self, prediction_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"_id": ObjectId(prediction_id)})
+
+    async def list_pending_ids(self) -> List[str]:
+        cursor = self.collection.find({"status": "pending"}, {"_id": 1}).sort("created_at", 1)
+        return [str(doc["_id"]) async for doc in cursor]
+
+    async def retry_failed_uploads(self, max_runs: int) -> int:
+        """Set failed background uploads that still have their spool file back to pending"""
+        result = await self.collection.update_many(
+            {"status": "failed", "spool_key": {"$exists": True}, "upload_failures": {"$lt": max_runs}},
+            {"$set": {"status": "pending"}}
+        )
+        return result.modified_count
+
+    async def finish_upload(
+        self,
+        prediction_id: str,
+        fields: Dict[str, Any],
+        unset: Optional[List[str]] = None
+    ) -> bool:
+        """Record a background upload's outcome; False if the document is gone or not pending"""
+        update: Dict[str, Any] = {"$set": fields}
+        if unset:
+            update["$unset"] = {field: "" for field in unset}
+        result = await self.collection.update_one(
+            {"_id": ObjectId(prediction_id), "status": "pending"},
+            update
+        )
+        return result.modified_count > 0
+
+    async def delete(self, prediction_id: str) -> bool:
+        result = await self.collection.delete_one({"_id": ObjectId(prediction_id)})
+        return result.deleted_count > 0
+
+    async def list_for_rescore(
+        self,
+        after_id: Optional[str],
+        model_version: str,
+        user_id: Optional[str],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Next page (by _id) of stored recordings not yet scored by model_version"""
+        query: Dict[str, Any] = {
+            "status": {"$nin": ["pending", "failed"]},
+            "prediction_result.model_version": {"$ne": model_version}
+        }
+        if after_id:
+            query["_id"] = {"$gt": ObjectId(after_id)}
+        if user_id:
+            query["user_id"] = user_id
+        cursor = self.collection.find(query).sort("_id", 1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def rescored_ids(self, prediction_ids: List[Any], job_id: str, model_version: str) -> List[Any]:
+        """Which of these recordings now carry a model_version result written by job_id"""
+        if not prediction_ids:
+            return []
+        cursor = self.collection.find({
+            "_id": {"$in": prediction_ids},
+            "rescore_job_id": job_id,
+            "prediction_result.model_version": model_version
+        }, {"_id": 1})
+        return [doc["_id"] async for doc in cursor]
+
+    async def bulk_update(self, operations: List[Any]) -> int:
+        """Apply a list of pymongo write operations unordered; returns how many documents changed"""
+        if not operations:
+            return 0
+        result = await self.collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    async def count_for_user(self, user_id: str) -> int:
+        return await self.collection.count_documents({"user_id": user_id})
+
+    async def aggregate(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self.collection.aggregate(pipeline).to_list(length=None)
+
+
+class PredictionStatsRepository:
+    """
+    Data access for prediction_stats (one document per user) and
+    prediction_rollups (one per user and hour), see prediction_stats.py
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.prediction_stats
+        self.rollups = db.prediction_rollups
+
+    async def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"_id": user_id})
+
+    async def increment(self, user_id: str, hour: Optional[datetime], increment: Dict[str, Any]):
+        """Apply a $inc to the user's totals and to the rollup of `hour` (UTC, truncated)"""
+        update = {"$inc": increment, "$set": {"updated_at": datetime.utcnow()}}
+        await self.collection.update_one({"_id": user_id}, update, upsert=True)
+        if hour is not None:
+            await self.rollups.update_one({"user_id": user_id, "hour": hour}, update, upsert=True)
+
+    async def increment_many(self, increments: Dict[Tuple[str, Optional[datetime]], Dict[str, Any]]):
+        """Apply $inc documents keyed by (user_id, hour), one unordered bulk write per collection"""
+        now = datetime.utcnow()
+        totals: Dict[str, Dict[str, Any]] = {}
+        rollup_operations = []
+        for (user_id, hour), increment in increments.items():
+            if not increment:
+                continue
+            user_total = totals.setdefault(user_id, {})
+            for field, amount in increment.items():
+                user_total[field] = user_total.get(field, 0) + amount
+            if hour is not None:
+                rollup_operations.append(UpdateOne(
+                    {"user_id": user_id, "hour": hour},
+                    {"$inc": increment, "$set": {"updated_at": now}},
+                    upsert=True
+                ))
+        if totals:
+            await self.collection.bulk_write([
+                UpdateOne({"_id": user_id}, {"$inc": increment, "$set": {"updated_at": now}}, upsert=True)
+                for user_id, increment in totals.items()
+            ], ordered=False)
+        if rollup_operations:
+            await self.rollups.bulk_write(rollup_operations, ordered=False)
+
+    async def list_rollups(self, user_id: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Hourly rollups with start <= hour < end (UTC)"""
+        cursor = self.rollups.find(
+            {"user_id": user_id, "hour": {"$gte": start, "$lt": end}},
+            {"_id": 0, "user_id": 0, "updated_at": 0}
+        ).sort("hour", 1)
+        return await cursor.to_list(length=None)
+
+    async def replace(self, user_id: str, stats_doc: Dict[str, Any], rollup_docs: List[Dict[str, Any]]):
+        """Overwrite a user's totals and the given hourly rollups"""
+        await self.collection.replace_one({"_id": user_id}, stats_doc, upsert=True)
+        if rollup_docs:
+            await self.rollups.bulk_write([
+                ReplaceOne({"user_id": user_id, "hour": rollup["hour"]}, rollup, upsert=True)
+                for rollup in rollup_docs
+            ], ordered=False)
+
+    async def delete_stale(self, before: datetime, user_id: Optional[str] = None):
+        """Drop documents not written since `before`, not produced by a rebuild started then"""
+        query: Dict[str, Any] = {"updated_at": {"$not": {"$gte": before}}}
+        if user_id is not None:
+            await self.rollups.delete_many({**query, "user_id": user_id})
+            return
+        await self.collection.delete_many(query)
+        await self.rollups.delete_many(query)
+
+
+class RefreshTokenRepository:
+    """Data access for the refresh_tokens collection"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.refresh_tokens
+
+    async def insert(self, token_doc: Dict[str, Any]) -> str:
+        result = await self.collection.insert_one(token_doc)
+        return str(result.inserted_id)
+
+    async def consume(self, token_hash: str, now: datetime) -> Optional[Dict[str, Any]]:
+        """Atomically mark an active token as used; None if missing, used or expired"""
+        return await self.collection.find_one_and_update(
+            {"token_hash": token_hash, "revoked": False, "expires_at": {"$gt": now}},
+            {"$set": {"revoked": True, "used_at": now}}
+        )
+
+    async def find_by_hash(self, token_hash: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"token_hash": token_hash})
+
+    async def revoke_family(self, family_id: str):
+        await self.collection.update_many(
+            {"family_id": family_id, "revoked": False},
+            {"$set": {"revoked": True}}
+        )
+
+
+class RevokedTokenRepository:
+    """Data access for the revoked_tokens collection (jti of revoked, unexpired access tokens)"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.revoked_tokens
+
+    async def add(self, jti: str, expires_at: datetime):
+        await self.collection.update_one({"_id": jti}, {"$set": {"expires_at": expires_at}}, upsert=True)
+
+    async def is_revoked(self, jti: str) -> bool:
+        return await self.collection.find_one({"_id": jti}, {"_id": 1}) is not None
+
+
+class PredictionCacheRepository:
+    """Data access for the prediction_cache collection (shared cache tier)"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.prediction_cache
+
+    async def get(self, key: str, now: datetime) -> Optional[Dict[str, Any]]:
+        # The TTL monitor only runs once a minute, so check expiry here too
+        doc = await self.collection.find_one({"_id": key, "expires_at": {"$gt": now}})
+        return doc["result"] if doc else None
+
+    async def put(self, key: str, entry: Dict[str, Any]):
+        await self.collection.replace_one({"_id": key}, entry, upsert=True)
+
+
+class AudioBlobRepository:
+    """Data access for the audio_blobs collection (content hash -> stored object, with refcounts)"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.audio_blobs
+
+    async def acquire(self, sha256: str, storage_backend: str) -> Optional[Dict[str, Any]]:
+        """Take a reference on an already stored blob; None if the content is new"""
+        return await self.collection.find_one_and_update(
+            {"sha256": sha256, "storage_backend": storage_backend, "refcount": {"$gt": 0}},
+            {"$inc": {"refcount": 1}, "$set": {"last_used_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def add_reference(self, sha256: str, storage_backend: str, blob: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a freshly stored blob, or take a reference if a concurrent upload won"""
+        now = datetime.utcnow()
+        update = {
+            "$inc": {"refcount": 1},
+            "$set": {"last_used_at": now},
+            "$setOnInsert": {**blob, "created_at": now}
+        }
+        query = {"sha256": sha256, "storage_backend": storage_backend}
+        try:
+            return await self.collection.find_one_and_update(
+                query, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Two upserts raced on the unique index; the retry matches the winner
+            return await self.collection.find_one_and_update(
+                query, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+
+    async def release(self, sha256: str, storage_backend: str) -> Optional[Dict[str, Any]]:
+        """Drop a reference; returns the blob when this was the last one and it was removed"""
+        blob = await self.collection.find_one_and_update(
+            {"sha256": sha256, "storage_backend": storage_backend},
+            {"$inc": {"refcount": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if blob is None or blob["refcount"] > 0:
+            return None
+        # Only remove it if nobody took a new reference in between
+        result = await self.collection.delete_one({"_id": blob["_id"], "refcount": {"$lte": 0}})
+        return blob if result.deleted_count else None
+
+
+class UploadSessionRepository:
+    """Data access for the upload_sessions collection (resumable uploads)"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.upload_sessions
+
+    async def insert(self, session_doc: Dict[str, Any]) -> str:
+        result = await self.collection.insert_one(session_doc)
+        return str(result.inserted_id)
+
+    async def get_for_user(self, session_id: str, user_id: str, now: datetime) -> Optional[Dict[str, Any]]:
+        # The TTL monitor only runs once a minute, so check expiry here too
+        return await self.collection.find_one({
+            "_id": ObjectId(session_id),
+            "user_id": user_id,
+            "expires_at": {"$gt": now}
+        })
+
+    async def advance(self, session_id: str, offset: int, new_offset: int, expires_at: datetime) -> bool:
+        """Move the committed offset forward; False if another chunk got there first"""
+        result = await self.collection.update_one(
+            {"_id": ObjectId(session_id), "offset": offset, "status": "open"},
+            {"$set": {"offset": new_offset, "expires_at": expires_at, "updated_at": datetime.utcnow()}}
+        )
+        return result.modified_count > 0
+
+    async def set_status(self, session_id: str, from_status: str, to_status: str) -> bool:
+        result = await self.collection.update_one(
+            {"_id": ObjectId(session_id), "status": from_status},
+            {"$set": {"status": to_status, "updated_at": datetime.utcnow()}}
+        )
+        return result.modified_count > 0
+
+    async def delete(self, session_id: str) -> bool:
+        result = await self.collection.delete_one({"_id": ObjectId(session_id)})
+        return result.deleted_count > 0
+
+
+class RescoreJobRepository:
+    """Data access for the rescore_jobs collection"""
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.collection = db.rescore_jobs
+
+    async def insert(self, job_doc: Dict[str, Any]) -> str:
+        result = await self.collection.insert_one(job_doc)
+        return str(result.inserted_id)
+
+    async def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        query: Dict[str, Any] = {"_id": ObjectId(job_id)}
+        if user_id is not None:
+            query["user_id"] = user_id
+        return await self.collection.find_one(query)
+
+    async def list_for_user(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        cursor = self.collection.find({"user_id": user_id}).sort("created_at", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def find_active(self, user_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"user_id": user_id, "status": {"$in": ["queued", "running"]}})
+
+    async def claim(
+        self,
+        statuses: List[str],
+        now: datetime,
+        lease_until: datetime,
+        owner: str,
+        job_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Take the oldest queued job, or a running one whose lease expired (its runner died)"""
+        query: Dict[str, Any] = {
+            "status": {"$in": statuses},
+            "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lt": now}}]
+        }
+        if job_id is not None:
+            query["_id"] = ObjectId(job_id)
+        return await self.collection.find_one_and_update(
+            query,
+            {"$set": {"status": "running", "owner": owner, "lease_expires_at": lease_until, "updated_at": now}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def checkpoint(
+        self,
+        job_id: str,
+        owner: str,
+        fields: Dict[str, Any],
+        increments: Dict[str, int]
+    ) -> Optional[Dict[str, Any]]:
+        """Record progress and renew the lease; None if another runner took the job over"""
+        update: Dict[str, Any] = {"$set": fields}
+        if increments:
+            update["$inc"] = increments
+        return await self.collection.find_one_and_update(
+            {"_id": ObjectId(job_id), "owner": owner},
+            update,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def request_cancel(self, job_id: str, user_id: str) -> bool:
+        result = await self.collection.update_one(
+            {"_id": ObjectId(job_id), "user_id": user_id, "status": {"$in": ["queued", "running"]}},
+            {"$set": {"cancel_requested": True, "updated_at": datetime.utcnow()}}
+        )
+        return result.matched_count > 0
+
+
+# FastAPI dependencies
+
+def get_user_repository(db: AsyncIOMotorDatabase = Depends(get_database)) -> UserRepository:
+    return UserRepository(db)
+
+
+def get_prediction_repository(db: AsyncIOMotorDatabase = Depends(get_database)) -> PredictionRepository:
+    return PredictionRepository(db)
+
+
+def get_audio_prediction_repository(
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> AudioPredictionRepository:
+    return AudioPredictionRepository(db)
+
+
+def get_prediction_stats_repository(
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> PredictionStatsRepository:
+    return PredictionStatsRepository(db)
+
+
+def get_refresh_token_repository(
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> RefreshTokenRepository:
+    return RefreshTokenRepository(db)
+
+
+def get_revoked_token_repository(
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> RevokedTokenRepository:
+    return RevokedTokenRepository(db)
+
+
+def get_audio_blob_repository(db: AsyncIOMotorDatabase = Depends(get_database)) -> AudioBlobRepository:
+    return AudioBlobRepository(db)
+
+
+def get_upload_session_repository(
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> UploadSessionRepository:
+    return UploadSessionRepository(db)
+
+
+def get_prediction_cache_repository(
+    db: AsyncIOMotorDatabase = Depends(get_database)
+) -> Optional[PredictionCacheRepository]:
+    """Mongo cache tier, or None when it is disabled"""
+    return PredictionCacheRepository(db) if PREDICTION_CACHE_MONGO_ENABLED else None
+
+
+def get_rescore_job_repository(db: AsyncIOMotorDatabase = Depends(get_database)) -> RescoreJobRepository:
+    return RescoreJobRepository(db)
@@ -0,0 +1,68 @@
+"""
+Re-score stored recordings from the command line
+Runs a rescore job (see rescore_jobs.py) in this process with the in-process
+model from INFERENCE_MODEL_PATH, printing progress and throughput at every
+checkpoint. By default it covers every user's recordings; an interrupted run
+(Ctrl-C or a crash) continues from its last checkpoint with --resume.
+
+    INFERENCE_MODEL_PATH=models/cry_classifier_v2.onnx python rescore_audio.py
+    python rescore_audio.py --user <user_id>
+    python rescore_audio.py --resume <job_id>
+"""
+
+import argparse
+import asyncio
+from database import connect_to_mongo, close_mongo_connection, get_database, init_database
+from repositories import RescoreJobRepository
+from inference import INFERENCE_MODEL_VERSION, inference_engine
+from rescore_jobs import job_progress, new_job, rescore_runner
+
+
+def print_progress(job):
+    progress = job_progress(job)
+    print(
+        f"   {progress['processed']:>8} processed   {progress['rescored']:>8} rescored   "
+        f"{progress['failed']:>6} failed   {progress['clips_per_second']:7.1f} clips/s"
+    )
+
+
+async def run(user_id, resume_id):
+    await connect_to_mongo()
+    await init_database()
+    await inference_engine.start()
+    jobs = RescoreJobRepository(get_database())
+    try:
+        if resume_id:
+            job = await rescore_runner.claim(jobs, resume_id)
+            if job is None:
+                print(f"✗ Job {resume_id} is finished, unknown, or held by a live runner")
+                return
+        else:
+            active = await jobs.find_active(user_id)
+            if active:
+                print(f"✗ Job {active['_id']} is already {active['status']}; use --resume {active['_id']}")
+                return
+            job_id = await jobs.insert(new_job(user_id, created_by="cli"))
+            job = await rescore_runner.claim(jobs, job_id)
+
+        print(f"Re-scoring with model {INFERENCE_MODEL_VERSION} (job {job['_id']}, {inference_engine.workers} workers)")
+        job = await rescore_runner.run(job, jobs, on_checkpoint=print_progress)
+        print(f"✓ Job {job['_id']} {job['status']}")
+    finally:
+        inference_engine.shutdown()
+        close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", help="only this user's recordings")
+    parser.add_argument("--resume", metavar="JOB_ID", help="continue an interrupted job")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.user, args.resume))
+    except KeyboardInterrupt:
+        print("\nInterrupted; progress was saved, continue with --resume")
+
+
+if __name__ == "__main__":
+    main()
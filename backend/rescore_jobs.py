@@ -0,0 +1,300 @@
+"""
+Background re-scoring of stored recordings.
+
+When the in-process model changes (see inference.py), saved audio
+predictions still carry results from the old one. A rescore job walks
+audio_predictions in _id order, skipping documents already scored by the
+current INFERENCE_MODEL_VERSION, re-classifies the recordings in batches
+(audio_batches.py: bounded-concurrency fetch, one process-pool call per
+batch) and writes the new results with one unordered bulk_write per
+RESCORE_CHECKPOINT_EVERY recordings, moving the users' label counts in
+prediction_stats and prediction_rollups along with them. Counts only move
+for updates that matched, so a recording deleted or re-scored elsewhere in
+the meantime is not counted twice. A delete that lands between the bulk
+write and that check can still skew the counts; rebuild_prediction_stats.py
+repairs them.
+
+After every bulk write the job document (rescore_jobs collection) records
+the last _id done, the counters and a lease. A runner that crashes stops
+renewing its lease, and once it expires the job is claimed again and
+continues after the checkpoint; documents finished after the last
+checkpoint are skipped by the model version filter. Jobs run one at a time
+per process, in creation order.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from database import get_database
+from repositories import AudioPredictionRepository, PredictionStatsRepository, RescoreJobRepository
+from inference import INFERENCE_MODEL_VERSION, inference_engine
+from audio_batches import iter_audio_batches
+from audio_ingest import label_fields
+from prediction_stats import bucket_hour, merge_increments, rescore_increment
+
+load_dotenv()
+
+# Recordings per bulk write and checkpoint
+RESCORE_CHECKPOINT_EVERY = int(os.getenv("RESCORE_CHECKPOINT_EVERY", "200"))
+# A running job whose lease is not renewed for this long is taken over
+RESCORE_LEASE_SECONDS = int(os.getenv("RESCORE_LEASE_SECONDS", "300"))
+# How often an idle runner looks for queued jobs and expired leases
+RESCORE_POLL_SECONDS = float(os.getenv("RESCORE_POLL_SECONDS", "30"))
+
+# Values of the rescore_jobs "status" field
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+
+def new_job(user_id: Optional[str], created_by: str) -> Dict[str, Any]:
+    """Job document for re-scoring one user's recordings (or everyone's with user_id None)"""
+    now = datetime.utcnow()
+    return {
+        "user_id": user_id,
+        "created_by": created_by,
+        "model_version": INFERENCE_MODEL_VERSION,
+        "status": JOB_QUEUED,
+        "cursor": None,
+        "processed": 0,
+        "rescored": 0,
+        "failed": 0,
+        "elapsed_seconds": 0.0,
+        "last_error": None,
+        "cancel_requested": False,
+        "owner": None,
+        "lease_expires_at": None,
+        "created_at": now,
+        "updated_at": now,
+        "finished_at": None,
+    }
+
+
+def job_progress(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job document"""
+    elapsed = job.get("elapsed_seconds") or 0.0
+    return {
+        "id": str(job["_id"]),
+        "status": job["status"],
+        "model_version": job["model_version"],
+        "processed": job["processed"],
+        "rescored": job["rescored"],
+        "failed": job["failed"],
+        "clips_per_second": round(job["processed"] / elapsed, 2) if elapsed else 0.0,
+        "elapsed_seconds": round(elapsed, 2),
+        "last_error": job.get("last_error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "finished_at": job.get("finished_at"),
+    }
+
+
+def _rescore_update(prediction: Dict[str, Any], result: Dict[str, Any], job_id: str, now: datetime) -> UpdateOne:
+    # Skips recordings deleted or re-scored by someone else since they were read
+    return UpdateOne(
+        {"_id": prediction["_id"], "prediction_result.model_version": {"$ne": INFERENCE_MODEL_VERSION}},
+        {"$set": {
+            "prediction_result": result,
+            **label_fields(result),
+            "previous_prediction_result": prediction.get("prediction_result"),
+            "rescored_at": now,
+            "rescore_job_id": job_id,
+        }}
+    )
+
+
+class RescoreJobRunner:
+    """Claims rescore jobs and runs them one at a time, checkpointing as it goes"""
+
+    def __init__(self, checkpoint_every: int, lease_seconds: int, poll_seconds: float):
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        # Identifies this process in the job's lease
+        self.owner = f"{os.uname().nodename}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._current: Optional[Dict[str, Any]] = None
+        self._jobs_finished = 0
+        self._clips = 0
+
+    def start(self):
+        """Start looking for jobs, resuming any whose runner died (called on app startup)"""
+        if self._task is not None:
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the runner; the current job resumes from its checkpoint once the lease expires"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def notify(self):
+        """Wake the runner when a job is queued"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _loop(self):
+        jobs = RescoreJobRepository(get_database())
+        while True:
+            try:
+                job = await self.claim(jobs) if inference_engine.running else None
+                if job is not None:
+                    await self.run(job, jobs)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warning: Rescore job failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def claim(self, jobs: RescoreJobRepository, job_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Take a queued job, or a running one whose lease expired"""
+        now = datetime.utcnow()
+        return await jobs.claim(
+            [JOB_QUEUED, JOB_RUNNING],
+            now,
+            now + timedelta(seconds=self.lease_seconds),
+            self.owner,
+            job_id
+        )
+
+    async def _documents(self, audio_predictions: AudioPredictionRepository, job: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Keyset pages of the job's remaining recordings, starting after the checkpoint"""
+        after_id = job.get("cursor")
+        while True:
+            page = await audio_predictions.list_for_rescore(
+                after_id, job["model_version"], job.get("user_id"), self.checkpoint_every
+            )
+            for prediction in page:
+                yield prediction
+            if len(page) < self.checkpoint_every:
+                return
+            after_id = str(page[-1]["_id"])
+
+    async def run(
+        self,
+        job: Dict[str, Any],
+        jobs: RescoreJobRepository,
+        on_checkpoint: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Run a claimed job until done, cancelled or taken over; returns the final job document"""
+        job_id = str(job["_id"])
+        audio_predictions = AudioPredictionRepository(get_database())
+        prediction_stats = PredictionStatsRepository(get_database())
+        if job["model_version"] != INFERENCE_MODEL_VERSION:
+            # Queued for a model that has since been replaced
+            return await jobs.checkpoint(job_id, self.owner, {
+                "status": JOB_FAILED,
+                "last_error": f"Model changed to {INFERENCE_MODEL_VERSION}, start a new job",
+                "finished_at": datetime.utcnow(),
+                "owner": None
+            }, {}) or job
+
+        if job.get("cancel_requested"):
+            return await jobs.checkpoint(job_id, self.owner, {
+                "status": JOB_CANCELLED,
+                "finished_at": datetime.utcnow(),
+                "owner": None
+            }, {}) or job
+
+        self._current = job
+        operations: List[UpdateOne] = []
+        # Per recording, applied only if its update matched
+        stats_changes: Dict[Any, Tuple[Tuple[str, Optional[datetime]], Dict[str, Any]]] = {}
+        counts = {"processed": 0, "rescored": 0, "failed": 0}
+        last_id = job.get("cursor")
+        last_error = None
+        started = time.perf_counter()
+
+        async def flush(final_fields: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+            nonlocal operations, stats_changes, counts, started
+            counts["rescored"] = await audio_predictions.bulk_update(operations)
+            rescored = await audio_predictions.rescored_ids(list(stats_changes), job_id, INFERENCE_MODEL_VERSION)
+            increments: Dict[Tuple[str, Optional[datetime]], Dict[str, Any]] = {}
+            for prediction_id in rescored:
+                stats_key, increment = stats_changes[prediction_id]
+                merge_increments(increments.setdefault(stats_key, {}), increment)
+            await prediction_stats.increment_many(increments)
+            now = datetime.utcnow()
+            fields = {
+                "cursor": last_id,
+                "updated_at": now,
+                "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+            }
+            if last_error:
+                fields["last_error"] = last_error
+            fields.update(final_fields or {})
+            elapsed = time.perf_counter() - started
+            updated = await jobs.checkpoint(
+                job_id, self.owner, fields, {**counts, "elapsed_seconds": elapsed}
+            )
+            self._clips += counts["processed"]
+            operations, stats_changes = [], {}
+            counts, started = {"processed": 0, "rescored": 0, "failed": 0}, time.perf_counter()
+            if updated is not None:
+                self._current = updated
+                if on_checkpoint is not None:
+                    on_checkpoint(updated)
+            return updated
+
+        try:
+            documents = self._documents(audio_predictions, job)
+            async for prediction, result in iter_audio_batches(documents, inference_engine.classify_batch):
+                last_id = str(prediction["_id"])
+                counts["processed"] += 1
+                if "error" in result:
+                    counts["failed"] += 1
+                    last_error = f"{last_id}: {result['error']}"
+                else:
+                    operations.append(_rescore_update(prediction, result, job_id, datetime.utcnow()))
+                    stats_changes[prediction["_id"]] = (
+                        (prediction["user_id"], bucket_hour(prediction.get("created_at"))),
+                        rescore_increment(prediction.get("prediction_result"), result)
+                    )
+                if counts["processed"] >= self.checkpoint_every:
+                    updated = await flush()
+                    if updated is None:
+                        print(f"Warning: Rescore job {job_id} was taken over by another runner")
+                        return job
+                    if updated.get("cancel_requested"):
+                        return await flush({"status": JOB_CANCELLED, "finished_at": datetime.utcnow(), "owner": None})
+            updated = await flush({"status": JOB_COMPLETED, "finished_at": datetime.utcnow(), "owner": None})
+            self._jobs_finished += 1
+            return updated or job
+        except asyncio.CancelledError:
+            # Shutdown: save progress and release the lease so the job resumes right away elsewhere
+            await asyncio.shield(flush({"owner": None, "lease_expires_at": None}))
+            raise
+        except Exception as e:
+            last_error = str(e)
+            await flush({"status": JOB_FAILED, "finished_at": datetime.utcnow(), "owner": None})
+            raise
+        finally:
+            self._current = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Runner counters for the /metrics endpoint"""
+        return {
+            "running": self._task is not None,
+            "current_job": job_progress(self._current) if self._current else None,
+            "jobs_finished": self._jobs_finished,
+            "clips": self._clips,
+        }
+
+
+rescore_runner = RescoreJobRunner(RESCORE_CHECKPOINT_EVERY, RESCORE_LEASE_SECONDS, RESCORE_POLL_SECONDS)
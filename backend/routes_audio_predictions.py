@@ -1,51 +1,151 @@
-from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form
-from typing import List, Optional
-from datetime import datetime
-import os
+from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python 3.8
+    from backports.zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import json
-from pathlib import Path
-import cloudinary
-import cloudinary.uploader
 from dotenv import load_dotenv
 from models import (
+    AudioFeatureBatchRequest,
+    AudioInferenceResponse,
     AudioPredictionCreate,
     AudioPredictionResponse,
+    AudioPredictionStatusResponse,
     AudioPredictionListResponse
 )
-from database import get_database
+from repositories import (
+    AudioBlobRepository,
+    AudioPredictionRepository,
+    PredictionStatsRepository,
+    get_audio_blob_repository,
+    get_audio_prediction_repository,
+    get_prediction_stats_repository
+)
 from auth import get_current_user
-from bson import ObjectId
+from pagination import decode_cursor, set_next_cursor
+from fast_json import trusted_response
+from prediction_stats import (
+    TREND_GRANULARITIES,
+    bucket_hour,
+    rebuild_prediction_stats,
+    stats_increment,
+    stats_summary,
+    trend_buckets,
+    trend_range
+)
+from upload_stream import UploadTooLarge, open_upload_reader, upload_too_large_error
+from storage import LocalStorage, get_storage_backend, guess_content_type, prediction_storage
+from upload_queue import AUDIO_STATUS_STORED, get_spool_storage
+from audio_ingest import check_ingest_capacity, ingest_audio, label_fields, new_spool_key
+from audio_normalize import NormalizeError
+from inference import INFERENCE_ENABLED, inference_engine
+from audio_batches import AUDIO_BATCH_MAX_ITEMS, iter_audio_batches
 
 # Load environment variables
 load_dotenv()
 
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET")
-)
-
 router = APIRouter(prefix="/audio-predictions", tags=["Audio Predictions"])
 
-# Create uploads directory for temporary files (optional, can be removed if not needed)
-UPLOAD_DIR = Path("uploads/audio")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+def _audio_url(prediction: Dict[str, Any]) -> str:
+    """Audio URL of a document (older documents only have cloudinary_url)"""
+    return prediction.get("audio_url") or prediction.get("cloudinary_url") or ""
+
+
+# Fields the history list needs; prediction_result.* covers documents from
+# before the backfill (backfill_label_fields.py)
+_LIST_PROJECTION = {
+    "audio_filename": 1,
+    "audio_url": 1,
+    "cloudinary_url": 1,
+    "predicted_label": 1,
+    "confidence": 1,
+    "prediction_result.predicted_label": 1,
+    "prediction_result.output": 1,
+    "prediction_result.confidence": 1,
+    "status": 1,
+    "created_at": 1,
+}
+
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single 'bytes=start-end' range; None if unsatisfiable"""
+    try:
+        unit, _, spec = range_header.partition("=")
+        start_text, _, end_text = spec.split(",")[0].strip().partition("-")
+        if unit.strip() != "bytes":
+            return None
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(end_text))
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        return None
+    return start, end
+
+
+async def _serve_local_audio(backend: LocalStorage, key: str, range_header: Optional[str]) -> Response:
+    """Serve a locally stored file, answering Range requests from a memory map"""
+    try:
+        size = await run_in_threadpool(backend.size, key)
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Audio file not found"
+        )
+    
+    content_type = guess_content_type(key)
+    if range_header:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+        start, end = byte_range
+        content = await run_in_threadpool(backend.read_range, key, start, end)
+        return Response(
+            content=content,
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=content_type,
+            headers={"Content-Range": f"bytes {start}-{end}/{size}", "Accept-Ranges": "bytes"}
+        )
+    
+    return StreamingResponse(
+        backend.get(key),
+        media_type=content_type,
+        headers={"Content-Length": str(size), "Accept-Ranges": "bytes"}
+    )
 
 
 @router.post("/", response_model=AudioPredictionResponse, status_code=status.HTTP_201_CREATED)
 async def save_audio_prediction(
+    response: Response,
     audio_file: UploadFile = File(...),
     prediction_result: str = Form(...),  # JSON string
     audio_size: Optional[int] = Form(None),
     audio_duration: Optional[float] = Form(None),
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository),
+    audio_blobs: AudioBlobRepository = Depends(get_audio_blob_repository),
+    prediction_stats: PredictionStatsRepository = Depends(get_prediction_stats_repository)
 ):
     """
-    Save audio file to Cloudinary and its prediction result to database
+    Save audio file to the configured storage backend and its prediction result to database
+
+    With AUDIO_INGEST_MODE=async the audio is spooled to disk, the record is
+    saved as "pending" and 202 is returned; poll /{id}/status for the upload.
     """
-    db = get_database()
-    
     try:
         # Parse prediction result JSON
         prediction_data = json.loads(prediction_result)
@@ -55,120 +155,190 @@ async def save_audio_prediction(
             detail="Invalid prediction_result JSON format"
         )
     
-    # Generate unique public_id for Cloudinary
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    file_extension = Path(audio_file.filename).suffix.replace(".", "")
-    public_id = f"audio_predictions/{user_id}_{timestamp}"
+    # Stream the spooled upload in chunks instead of reading it into memory
+    reader = open_upload_reader(audio_file)
+    result, background = await ingest_audio(
+        reader,
+        audio_file.filename,
+        user_id,
+        prediction_data,
+        audio_size,
+        audio_duration,
+        audio_predictions,
+        audio_blobs,
+        prediction_stats
+    )
+    if background:
+        response.status_code = status.HTTP_202_ACCEPTED
     
-    # Read audio file content
-    try:
-        content = await audio_file.read()
-        audio_size_bytes = audio_size or len(content)
-    except Exception as e:
+    return result
+
+
+@router.post("/infer", response_model=AudioInferenceResponse)
+async def infer_audio_prediction(
+    response: Response,
+    audio_file: UploadFile = File(...),
+    save: bool = Form(False),
+    user_id: str = Depends(get_current_user),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository),
+    audio_blobs: AudioBlobRepository = Depends(get_audio_blob_repository),
+    prediction_stats: PredictionStatsRepository = Depends(get_prediction_stats_repository)
+):
+    """
+    Classify a recording with the in-process model (INFERENCE_ENABLED)
+
+    With save=true the recording and its prediction are also saved, exactly
+    like POST /audio-predictions/ (201, or 202 in async ingest mode).
+    """
+    if not INFERENCE_ENABLED or not inference_engine.running:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to read audio file: {str(e)}"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="In-process inference is not enabled"
         )
+    if save:
+        # Fail before running the model rather than after
+        check_ingest_capacity()
     
-    # Upload to Cloudinary
+    # The decoder needs a real file, so spool the upload to disk first
+    spool = get_spool_storage()
+    file_extension = audio_file.filename.split('.')[-1] if '.' in audio_file.filename else 'wav'
     try:
-        # Upload audio file to Cloudinary
-        upload_result = cloudinary.uploader.upload(
-            content,
-            resource_type="video",  # Cloudinary uses 'video' resource type for audio files
-            public_id=public_id,
-            folder="audio_predictions",
-            format=file_extension,
-            tags=[user_id, "audio_prediction"]
+        spooled = await run_in_threadpool(
+            spool.put, new_spool_key(file_extension), open_upload_reader(audio_file)
         )
-        
-        cloudinary_url = upload_result.get("secure_url")
-        cloudinary_public_id = upload_result.get("public_id")
-        
-    except Exception as e:
+    except UploadTooLarge:
+        raise upload_too_large_error()
+    try:
+        prediction_data = await inference_engine.classify(str(spool.path(spooled.key)))
+    except NormalizeError as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to upload audio to Cloudinary: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not decode audio: {e}"
         )
+    finally:
+        spool.delete(spooled.key)
     
-    # Save to database
-    audio_prediction_doc = {
-        "user_id": user_id,
-        "audio_filename": audio_file.filename,
-        "cloudinary_url": cloudinary_url,
-        "cloudinary_public_id": cloudinary_public_id,
-        "audio_size": audio_size_bytes,
-        "audio_duration": audio_duration,
-        "prediction_result": prediction_data,
-        "created_at": datetime.utcnow()
-    }
-    
-    result = db.audio_predictions.insert_one(audio_prediction_doc)
+    if not save:
+        return AudioInferenceResponse(prediction_result=prediction_data)
     
-    return AudioPredictionResponse(
-        id=str(result.inserted_id),
-        user_id=user_id,
-        audio_filename=audio_file.filename,
-        audio_url=cloudinary_url,
-        audio_size=audio_size_bytes,
-        audio_duration=audio_duration,
+    result, background = await ingest_audio(
+        open_upload_reader(audio_file),
+        audio_file.filename,
+        user_id,
+        prediction_data,
+        spooled.size,
+        prediction_data.get("audio_duration"),
+        audio_predictions,
+        audio_blobs,
+        prediction_stats
+    )
+    response.status_code = status.HTTP_202_ACCEPTED if background else status.HTTP_201_CREATED
+    return AudioInferenceResponse(
         prediction_result=prediction_data,
-        created_at=audio_prediction_doc["created_at"]
+        prediction_id=result.id,
+        status=result.status
     )
 
 
+@router.post("/features")
+async def extract_audio_features(
+    request: AudioFeatureBatchRequest,
+    user_id: str = Depends(get_current_user),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository)
+):
+    """
+    Stream spectral features of several saved recordings as NDJSON
+
+    One line per recording: {"id", "audio_duration", "frames", "<feature>"},
+    or {"id", "error"}. Recordings are featurized in batches on the process
+    pool and each line is sent as soon as its batch is done.
+    """
+    if request.feature not in ("mfcc_stats", "mfcc", "log_mel"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="feature must be one of mfcc_stats, mfcc, log_mel"
+        )
+    if len(request.prediction_ids) > AUDIO_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {AUDIO_BATCH_MAX_ITEMS} predictions per request"
+        )
+    try:
+        found = await audio_predictions.list_by_ids_for_user(request.prediction_ids, user_id)
+    except:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid prediction ID"
+        )
+    by_id = {str(prediction["_id"]): prediction for prediction in found}
+    
+    async def featurize(paths):
+        return await inference_engine.featurize_batch(paths, request.feature)
+    
+    async def lines():
+        for prediction_id in request.prediction_ids:
+            if prediction_id not in by_id:
+                yield json.dumps({"id": prediction_id, "error": "Audio prediction not found"}) + "\n"
+        ordered = [by_id[prediction_id] for prediction_id in dict.fromkeys(request.prediction_ids) if prediction_id in by_id]
+        async for prediction, result in iter_audio_batches(ordered, featurize):
+            line = {"id": str(prediction["_id"])}
+            for key, value in result.items():
+                line[key] = value.round(5).tolist() if hasattr(value, "tolist") else value
+            yield json.dumps(line) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.get("/", response_model=List[AudioPredictionListResponse])
 async def get_audio_predictions(
+    response: Response,
     skip: int = 0,
     limit: int = 20,
-    user_id: str = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    label: Optional[str] = None,
+    user_id: str = Depends(get_current_user),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository)
 ):
     """
-    Get all audio predictions for the current user
+    Get all audio predictions for the current user (optionally only one ?label=)
+
+    Pass the X-Next-Cursor header of a page as ?cursor= to get the next one;
+    unlike skip, this stays fast however deep the page is. Only the listed
+    fields are loaded, not the whole prediction_result.
     """
-    db = get_database()
-    
-    predictions = db.audio_predictions.find(
-        {"user_id": user_id}
-    ).sort("created_at", -1).skip(skip).limit(limit)
+    after = decode_cursor(cursor) if cursor else None
+    predictions = await audio_predictions.list_for_user(user_id, skip, limit, after, label, _LIST_PROJECTION)
+    set_next_cursor(response, predictions, limit)
     
+    # Shaped like AudioPredictionListResponse; see fast_json.trusted_response
     result = []
     for pred in predictions:
-        # Extract predicted label and confidence from prediction result
-        pred_result = pred.get("prediction_result", {})
-        predicted_label = pred_result.get("predicted_label") or pred_result.get("output")
-        confidence = pred_result.get("confidence")
-        cloudinary_url = pred.get("cloudinary_url")
-        
-        result.append(
-            AudioPredictionListResponse(
-                id=str(pred["_id"]),
-                audio_filename=pred["audio_filename"],
-                audio_url=cloudinary_url or "",
-                predicted_label=predicted_label,
-                confidence=confidence,
-                created_at=pred["created_at"]
-            )
-        )
+        fields = pred if "predicted_label" in pred else label_fields(pred.get("prediction_result"))
+        confidence = fields.get("confidence")
+        result.append({
+            "id": str(pred["_id"]),
+            "audio_filename": pred["audio_filename"],
+            "audio_url": _audio_url(pred),
+            "predicted_label": fields["predicted_label"],
+            "confidence": float(confidence) if confidence is not None else None,
+            "status": pred.get("status", AUDIO_STATUS_STORED),
+            "created_at": pred["created_at"]
+        })
     
-    return result
+    return trusted_response(result, response)
 
 
 @router.get("/{prediction_id}", response_model=AudioPredictionResponse)
 async def get_audio_prediction(
     prediction_id: str,
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository)
 ):
     """
     Get a specific audio prediction by ID
     """
-    db = get_database()
-    
     try:
-        prediction = db.audio_predictions.find_one({
-            "_id": ObjectId(prediction_id),
-            "user_id": user_id
-        })
+        prediction = await audio_predictions.get_for_user(prediction_id, user_id)
     except:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -185,31 +355,79 @@ async def get_audio_prediction(
         id=str(prediction["_id"]),
         user_id=prediction["user_id"],
         audio_filename=prediction["audio_filename"],
-        audio_url=prediction.get("cloudinary_url"),
+        audio_url=_audio_url(prediction),
         audio_size=prediction.get("audio_size"),
         audio_duration=prediction.get("audio_duration"),
         prediction_result=prediction["prediction_result"],
+        original_size=prediction.get("original_size"),
+        status=prediction.get("status", AUDIO_STATUS_STORED),
         created_at=prediction["created_at"]
     )
 
 
-@router.get("/{prediction_id}/audio")
-async def get_audio_file(
+@router.get("/{prediction_id}/status", response_model=AudioPredictionStatusResponse)
+async def get_audio_prediction_status(
     prediction_id: str,
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository)
 ):
     """
-    Get the Cloudinary URL for the audio file
+    Get the upload status of an audio prediction (pending, stored or failed)
     """
-    from fastapi.responses import RedirectResponse
+    try:
+        prediction = await audio_predictions.get_for_user(prediction_id, user_id)
+    except:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid prediction ID"
+        )
     
-    db = get_database()
+    if not prediction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Audio prediction not found"
+        )
     
+    return AudioPredictionStatusResponse(
+        id=str(prediction["_id"]),
+        status=prediction.get("status", AUDIO_STATUS_STORED),
+        audio_url=_audio_url(prediction),
+        error=prediction.get("upload_error")
+    )
+
+
+@router.get("/files/{storage_key:path}")
+async def get_local_audio_file(
+    storage_key: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    user_id: str = Depends(get_current_user),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository)
+):
+    """
+    Serve a locally stored audio file (supports Range requests)
+    """
+    prediction = await audio_predictions.find_by_storage_key(storage_key, user_id)
+    if not prediction or prediction.get("storage_backend") != "local":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Audio file not found"
+        )
+    
+    return await _serve_local_audio(get_storage_backend("local"), storage_key, range_header)
+
+
+@router.get("/{prediction_id}/audio")
+async def get_audio_file(
+    prediction_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    user_id: str = Depends(get_current_user),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository)
+):
+    """
+    Get the audio file (served directly from local storage, otherwise a redirect to its URL)
+    """
     try:
-        prediction = db.audio_predictions.find_one({
-            "_id": ObjectId(prediction_id),
-            "user_id": user_id
-        })
+        prediction = await audio_predictions.get_for_user(prediction_id, user_id)
     except:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -222,33 +440,44 @@ async def get_audio_file(
             detail="Audio prediction not found"
         )
     
-    cloudinary_url = prediction.get("cloudinary_url")
+    if prediction.get("status", AUDIO_STATUS_STORED) != AUDIO_STATUS_STORED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Audio file is not available (upload {prediction['status']})"
+        )
+    
+    storage, storage_key = prediction_storage(prediction)
+    if isinstance(storage, LocalStorage) and storage_key:
+        return await _serve_local_audio(storage, storage_key, range_header)
+    
+    audio_url = _audio_url(prediction)
     
-    if not cloudinary_url:
+    if not audio_url:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Audio file URL not found"
         )
     
-    # Redirect to Cloudinary URL
-    return RedirectResponse(url=cloudinary_url)
+    # Redirect to the storage URL (Cloudinary)
+    return RedirectResponse(url=audio_url)
 
 
 @router.delete("/{prediction_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_audio_prediction(
     prediction_id: str,
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository),
+    audio_blobs: AudioBlobRepository = Depends(get_audio_blob_repository),
+    prediction_stats: PredictionStatsRepository = Depends(get_prediction_stats_repository)
 ):
     """
-    Delete a specific audio prediction from database and Cloudinary
+    Delete a specific audio prediction from database and its storage backend
+
+    Deduplicated audio is shared between predictions; the stored object is
+    only destroyed when the last prediction referencing it is deleted.
     """
-    db = get_database()
-    
     try:
-        prediction = db.audio_predictions.find_one({
-            "_id": ObjectId(prediction_id),
-            "user_id": user_id
-        })
+        prediction = await audio_predictions.get_for_user(prediction_id, user_id)
     except:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -261,64 +490,123 @@ async def delete_audio_prediction(
             detail="Audio prediction not found"
         )
     
-    # Delete from Cloudinary
-    cloudinary_public_id = prediction.get("cloudinary_public_id")
-    if cloudinary_public_id:
+    # Delete from database first so a concurrent delete cannot release the audio twice
+    if not await audio_predictions.delete(prediction_id):
+        return None
+    try:
+        await prediction_stats.increment(
+            user_id, bucket_hour(prediction.get("created_at")), stats_increment(prediction.get("prediction_result"), -1)
+        )
+    except Exception as e:
+        print(f"Warning: Could not update prediction stats: {e}")
+    
+    # Delete the spooled copy of a pending or failed background upload
+    if prediction.get("spool_key"):
+        await run_in_threadpool(get_spool_storage().delete, prediction["spool_key"])
+    
+    # Pending uploads are cleaned up by the upload worker once it finishes
+    if prediction.get("status", AUDIO_STATUS_STORED) != AUDIO_STATUS_STORED:
+        return None
+    
+    # Delete from storage
+    storage, storage_key = prediction_storage(prediction)
+    if prediction.get("content_sha256"):
+        released = await audio_blobs.release(prediction["content_sha256"], storage.name)
+        storage_key = released["storage_key"] if released else None
+    if storage_key:
         try:
-            cloudinary.uploader.destroy(
-                cloudinary_public_id,
-                resource_type="video"
-            )
+            await run_in_threadpool(storage.delete, storage_key)
         except Exception as e:
-            print(f"Warning: Could not delete audio file from Cloudinary: {e}")
-    
-    # Delete from database
-    db.audio_predictions.delete_one({"_id": ObjectId(prediction_id)})
+            print(f"Warning: Could not delete audio file from {storage.name} storage: {e}")
     
     return None
 
 
+async def _user_stats(
+    user_id: str,
+    audio_predictions: AudioPredictionRepository,
+    prediction_stats: PredictionStatsRepository
+) -> Dict[str, Any]:
+    """
+    The user's stats document, built from their recordings on first use
+
+    The first build is not atomic with saves and deletes: a recording whose
+    $inc lands while the aggregation runs can be counted twice (the $inc
+    hits the rebuilt document) or not at all (replace() overwrites it).
+    `python rebuild_prediction_stats.py --user <id>` repairs such drift.
+    """
+    stats = await prediction_stats.get(user_id)
+    if not stats or not stats.get("complete"):
+        rebuilt = await rebuild_prediction_stats(audio_predictions, prediction_stats, user_id)
+        stats = rebuilt[user_id]
+    return stats
+
+
 @router.get("/stats/summary")
 async def get_prediction_stats(
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository),
+    prediction_stats: PredictionStatsRepository = Depends(get_prediction_stats_repository)
 ):
     """
     Get statistics about user's audio predictions
+
+    Read from the user's prediction_stats document, which saves and deletes
+    keep up to date.
     """
-    db = get_database()
-    
-    # Count total predictions
-    total_count = db.audio_predictions.count_documents({"user_id": user_id})
-    
-    # Get predictions grouped by label
-    pipeline = [
-        {"$match": {"user_id": user_id}},
-        {"$group": {
-            "_id": "$prediction_result.predicted_label",
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"count": -1}}
-    ]
-    
-    label_counts = list(db.audio_predictions.aggregate(pipeline))
-    
-    # Calculate average confidence
-    pipeline_confidence = [
-        {"$match": {"user_id": user_id, "prediction_result.confidence": {"$exists": True}}},
-        {"$group": {
-            "_id": None,
-            "avg_confidence": {"$avg": "$prediction_result.confidence"}
-        }}
-    ]
-    
-    confidence_result = list(db.audio_predictions.aggregate(pipeline_confidence))
-    avg_confidence = confidence_result[0]["avg_confidence"] if confidence_result else 0
+    return stats_summary(await _user_stats(user_id, audio_predictions, prediction_stats))
+
+
+@router.get("/stats/trends")
+async def get_prediction_trends(
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    tz: str = "UTC",
+    user_id: str = Depends(get_current_user),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository),
+    prediction_stats: PredictionStatsRepository = Depends(get_prediction_stats_repository)
+):
+    """
+    Label counts and mean confidence per hour, day or week (Monday) in [start, end)
+
+    start/end without an offset are local times in `tz` (an IANA name such as
+    Europe/Paris); end defaults to now and start to 1 day, 30 days or 12
+    weeks before it. Buckets are summed from hourly rollups maintained on
+    write, and empty ones are included so charts need no gap filling.
+
+    Rollups are UTC hours, so in zones whose offset is not a whole number of
+    hours (Asia/Kolkata, Australia/Adelaide) day and week totals are
+    approximate: each hour counts toward the bucket its UTC hour starts in,
+    which moves up to 45 minutes of recordings across each bucket edge.
+    """
+    if granularity not in TREND_GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"granularity must be one of {', '.join(TREND_GRANULARITIES)}"
+        )
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown time zone"
+        )
+    try:
+        range_start, range_end, keys = trend_range(granularity, zone, start, end)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
+    await _user_stats(user_id, audio_predictions, prediction_stats)
+    rollups = await prediction_stats.list_rollups(user_id, range_start, range_end)
+    buckets = trend_buckets(rollups, granularity, zone, keys)
     return {
-        "total_predictions": total_count,
-        "predictions_by_label": [
-            {"label": item["_id"], "count": item["count"]}
-            for item in label_counts
-        ],
-        "average_confidence": round(avg_confidence, 2) if avg_confidence else 0
+        "granularity": granularity,
+        "timezone": tz,
+        "start": buckets[0]["start"],
+        "end": range_end.replace(tzinfo=timezone.utc).astimezone(zone).isoformat(),
+        "buckets": buckets
     }
@@ -0,0 +1,130 @@
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
+from typing import Any, Dict, Optional
+import asyncio
+import json
+import time
+from auth import get_websocket_user
+from repositories import RevokedTokenRepository, get_revoked_token_repository
+from inference import INFERENCE_ENABLED, inference_engine
+from audio_stream import STREAM_MAX_CONNECTIONS, AudioStream, StreamError, stream_stats
+
+router = APIRouter(prefix="/audio-predictions", tags=["Audio Predictions"])
+
+
+async def _predict_window(websocket: WebSocket, stream: AudioStream, window: Any, first_audio_at: float):
+    """Classify a window taken from the stream and push a partial result"""
+    cut_at = time.perf_counter()
+    result = await inference_engine.classify_samples(window, stream.sample_rate)
+    stream.add_result(result)
+    stream_stats.windows += 1
+    if stream.windows == 1:
+        stream_stats.first_results += 1
+        stream_stats.first_result_ms_total += (time.perf_counter() - first_audio_at) * 1000
+    await websocket.send_json({
+        "type": "partial",
+        "predicted_label": result["predicted_label"],
+        "confidence": result["confidence"],
+        "probabilities": result["probabilities"],
+        "audio_seconds": round(stream.received_seconds, 3),
+        "window_seconds": result["audio_duration"],
+        "latency_ms": round((time.perf_counter() - cut_at) * 1000, 1),
+    })
+
+
+@router.websocket("/stream")
+async def stream_audio_prediction(
+    websocket: WebSocket,
+    sample_rate: Optional[int] = None,
+    format: str = "s16le",
+    channels: int = 1,
+    revoked_tokens: RevokedTokenRepository = Depends(get_revoked_token_repository)
+):
+    """
+    Live predictions while recording (needs INFERENCE_ENABLED)
+
+    Connect with ?token=<access token> (or an Authorization header) and the
+    PCM layout (?sample_rate=16000&format=s16le&channels=1; the sample rate
+    defaults to FEATURE_SAMPLE_RATE), then send raw PCM as binary messages.
+    The server pushes {"type": "partial", ...} for sliding windows as audio
+    arrives; send {"type": "end"} to get
+    {"type": "final", ...} (probabilities averaged over all windows).
+    """
+    user_id = await get_websocket_user(websocket, revoked_tokens)
+    if user_id is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Could not validate credentials")
+        return
+    if not INFERENCE_ENABLED or not inference_engine.running:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="In-process inference is not enabled")
+        return
+    if stream_stats.active >= STREAM_MAX_CONNECTIONS:
+        stream_stats.rejected += 1
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too many live streams, please retry")
+        return
+    # numpy-backed, so only imported once inference is known to be enabled
+    from features import FEATURE_SAMPLE_RATE
+    try:
+        stream = AudioStream(sample_rate or FEATURE_SAMPLE_RATE, format, channels)
+    except StreamError as e:
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason=str(e))
+        return
+
+    await websocket.accept()
+    stream_stats.active += 1
+    stream_stats.connections += 1
+    pending: Optional[asyncio.Task] = None
+    first_audio_at: Optional[float] = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+            if message.get("bytes") is not None:
+                first_audio_at = first_audio_at or time.perf_counter()
+                stream.feed(message["bytes"])
+                if stream.window_due():
+                    if pending is None or pending.done():
+                        if pending is not None:
+                            pending.result()
+                        # Take the window now, so frames handled before the task runs see it as taken
+                        window = stream.take_window()
+                        pending = asyncio.create_task(_predict_window(websocket, stream, window, first_audio_at))
+                    else:
+                        # Still classifying the previous window: skip rather than fall behind
+                        stream.skip_window()
+                        stream_stats.skipped_hops += 1
+                continue
+
+            try:
+                command: Dict[str, Any] = json.loads(message.get("text") or "")
+            except json.JSONDecodeError:
+                command = {}
+            if not isinstance(command, dict):
+                command = {}
+            if command.get("type") != "end":
+                await websocket.send_json({"type": "error", "detail": 'Send PCM as binary messages, or {"type": "end"}'})
+                continue
+
+            if pending is not None:
+                await pending
+                pending = None
+            if stream.windows == 0 and stream.buffer.total:
+                # Shorter than STREAM_MIN_SECONDS: classify what there is
+                await _predict_window(websocket, stream, stream.take_window(), first_audio_at)
+            await websocket.send_json({"type": "final", **(stream.summary() or {"windows": 0})})
+            await websocket.close()
+            return
+    except StreamError as e:
+        if pending is not None:
+            pending.cancel()
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Warning: Live stream failed: {e}")
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason="Prediction failed")
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+        stream_stats.active -= 1
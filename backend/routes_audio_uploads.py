@@ -0,0 +1,300 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from typing import Any, Dict, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import hmac
+from models import (
+    AudioPredictionResponse,
+    UploadSessionCreate,
+    UploadSessionResponse,
+    UploadSessionFinalize
+)
+from repositories import (
+    AudioBlobRepository,
+    AudioPredictionRepository,
+    PredictionStatsRepository,
+    UploadSessionRepository,
+    get_audio_blob_repository,
+    get_audio_prediction_repository,
+    get_prediction_stats_repository,
+    get_upload_session_repository
+)
+from auth import get_current_user
+from audio_ingest import ingest_audio
+from upload_stream import MAX_AUDIO_UPLOAD_BYTES, BoundedUploadReader, UploadTooLarge, upload_too_large_error
+from upload_sessions import (
+    AUDIO_UPLOAD_MAX_CHUNK_BYTES,
+    AUDIO_UPLOAD_SESSION_TTL_SECONDS,
+    SESSION_FINALIZING,
+    SESSION_OPEN,
+    PartFileWriter,
+    delete_part,
+    file_sha256,
+    part_path
+)
+
+router = APIRouter(prefix="/audio-predictions/uploads", tags=["Audio Uploads"])
+
+# One chunk at a time per session within this process
+_session_locks: Dict[str, asyncio.Lock] = {}
+
+
+def _session_response(session: Dict[str, Any]) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        id=str(session["_id"]),
+        filename=session["filename"],
+        offset=session["offset"],
+        total_size=session.get("total_size"),
+        max_chunk_size=AUDIO_UPLOAD_MAX_CHUNK_BYTES,
+        status=session["status"],
+        expires_at=session["expires_at"]
+    )
+
+
+async def _get_session(
+    session_id: str,
+    user_id: str,
+    upload_sessions: UploadSessionRepository
+) -> Dict[str, Any]:
+    try:
+        session = await upload_sessions.get_for_user(session_id, user_id, datetime.utcnow())
+    except:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid upload session ID"
+        )
+
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found or expired"
+        )
+    return session
+
+
+def _offset_conflict(session: Dict[str, Any], detail: str) -> HTTPException:
+    # Upload-Offset tells the client where to resume
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=detail,
+        headers={"Upload-Offset": str(session["offset"])}
+    )
+
+
+async def _write_chunk(
+    session: Dict[str, Any],
+    offset: int,
+    request: Request,
+    chunk_sha256: str,
+    upload_sessions: UploadSessionRepository
+) -> Tuple[int, datetime]:
+    """Stream the request body into the part file and commit the new offset"""
+    session_id = str(session["_id"])
+    writer = await run_in_threadpool(PartFileWriter, part_path(session_id), offset)
+    try:
+        try:
+            # Write the body as it arrives instead of buffering the whole chunk
+            async for data in request.stream():
+                if data:
+                    await run_in_threadpool(writer.write, data)
+        except UploadTooLarge:
+            await run_in_threadpool(writer.rollback)
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=(
+                    f"Chunks are limited to {AUDIO_UPLOAD_MAX_CHUNK_BYTES} bytes "
+                    f"and uploads to {MAX_AUDIO_UPLOAD_BYTES} bytes"
+                )
+            )
+        except BaseException:
+            # Client disconnected mid-chunk: keep the committed offset
+            await run_in_threadpool(writer.rollback)
+            raise
+
+        if not hmac.compare_digest(writer.digest.hexdigest(), chunk_sha256.strip().lower()):
+            await run_in_threadpool(writer.rollback)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Chunk checksum mismatch, resend the chunk",
+                headers={"Upload-Offset": str(offset)}
+            )
+
+        new_offset = offset + writer.size
+        total_size = session.get("total_size")
+        if total_size is not None and new_offset > total_size:
+            await run_in_threadpool(writer.rollback)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Chunk goes past the declared total size of {total_size} bytes",
+                headers={"Upload-Offset": str(offset)}
+            )
+
+        expires_at = datetime.utcnow() + timedelta(seconds=AUDIO_UPLOAD_SESSION_TTL_SECONDS)
+        if not await upload_sessions.advance(session_id, offset, new_offset, expires_at):
+            # Another process committed this offset first
+            await run_in_threadpool(writer.rollback)
+            raise _offset_conflict(session, "Upload session changed, check the offset and retry")
+        return new_offset, expires_at
+    finally:
+        await run_in_threadpool(writer.close)
+
+
+@router.post("/", response_model=UploadSessionResponse, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+    upload: UploadSessionCreate,
+    user_id: str = Depends(get_current_user),
+    upload_sessions: UploadSessionRepository = Depends(get_upload_session_repository)
+):
+    """
+    Start a resumable audio upload
+    """
+    if upload.total_size is not None and upload.total_size > MAX_AUDIO_UPLOAD_BYTES:
+        raise upload_too_large_error()
+
+    now = datetime.utcnow()
+    session_doc = {
+        "user_id": user_id,
+        "filename": upload.filename,
+        "total_size": upload.total_size,
+        "offset": 0,
+        "status": SESSION_OPEN,
+        "created_at": now,
+        "updated_at": now,
+        "expires_at": now + timedelta(seconds=AUDIO_UPLOAD_SESSION_TTL_SECONDS)
+    }
+
+    session_doc["_id"] = await upload_sessions.insert(session_doc)
+    return _session_response(session_doc)
+
+
+@router.get("/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: str,
+    user_id: str = Depends(get_current_user),
+    upload_sessions: UploadSessionRepository = Depends(get_upload_session_repository)
+):
+    """
+    Get the committed offset of a resumable upload (where to resume after a failure)
+    """
+    session = await _get_session(session_id, user_id, upload_sessions)
+    return _session_response(session)
+
+
+@router.put("/{session_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    session_id: str,
+    offset: int,
+    request: Request,
+    chunk_sha256: str = Header(..., alias="X-Chunk-SHA256"),
+    user_id: str = Depends(get_current_user),
+    upload_sessions: UploadSessionRepository = Depends(get_upload_session_repository)
+):
+    """
+    Append the request body to a resumable upload at `offset`
+
+    The offset must equal the session's committed offset and the X-Chunk-SHA256
+    header must match the body; otherwise nothing is committed.
+    """
+    session = await _get_session(session_id, user_id, upload_sessions)
+    if session["status"] != SESSION_OPEN:
+        raise _offset_conflict(session, "Upload session is being finalized")
+    if offset != session["offset"]:
+        raise _offset_conflict(session, f"Expected offset {session['offset']}")
+
+    lock = _session_locks.setdefault(session_id, asyncio.Lock())
+    if lock.locked():
+        raise _offset_conflict(session, "Another chunk for this session is in progress")
+
+    try:
+        async with lock:
+            # Re-check under the lock: a chunk may have been committed meanwhile
+            session = await _get_session(session_id, user_id, upload_sessions)
+            if session["status"] != SESSION_OPEN or offset != session["offset"]:
+                raise _offset_conflict(session, f"Expected offset {session['offset']}")
+            new_offset, expires_at = await _write_chunk(session, offset, request, chunk_sha256, upload_sessions)
+    finally:
+        # Nobody can be waiting on the lock (busy sessions get a 409), so drop it
+        _session_locks.pop(session_id, None)
+
+    session.update({"offset": new_offset, "expires_at": expires_at})
+    return _session_response(session)
+
+
+@router.post("/{session_id}/finalize", response_model=AudioPredictionResponse, status_code=status.HTTP_201_CREATED)
+async def finalize_upload_session(
+    session_id: str,
+    finalize: UploadSessionFinalize,
+    response: Response,
+    user_id: str = Depends(get_current_user),
+    upload_sessions: UploadSessionRepository = Depends(get_upload_session_repository),
+    audio_predictions: AudioPredictionRepository = Depends(get_audio_prediction_repository),
+    audio_blobs: AudioBlobRepository = Depends(get_audio_blob_repository),
+    prediction_stats: PredictionStatsRepository = Depends(get_prediction_stats_repository)
+):
+    """
+    Finish a resumable upload: store the assembled audio and save its prediction
+    """
+    session = await _get_session(session_id, user_id, upload_sessions)
+    total_size = session.get("total_size")
+    if total_size is not None and session["offset"] != total_size:
+        raise _offset_conflict(session, f"Upload incomplete: {session['offset']} of {total_size} bytes received")
+    if session["offset"] == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No audio data uploaded"
+        )
+
+    # Claim the session so concurrent finalize calls store the audio only once
+    if not await upload_sessions.set_status(session_id, SESSION_OPEN, SESSION_FINALIZING):
+        raise _offset_conflict(session, "Upload session is already being finalized")
+
+    path = part_path(session_id)
+    try:
+        if finalize.sha256:
+            digest = await run_in_threadpool(file_sha256, path)
+            if not hmac.compare_digest(digest, finalize.sha256.strip().lower()):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="File checksum mismatch"
+                )
+
+        with open(path, "rb") as part:
+            result, background = await ingest_audio(
+                BoundedUploadReader(part, name=session["filename"]),
+                session["filename"],
+                user_id,
+                finalize.prediction_result,
+                session["offset"],
+                finalize.audio_duration,
+                audio_predictions,
+                audio_blobs,
+                prediction_stats
+            )
+    except BaseException:
+        # Let the client retry the finalize (or fix the upload) on failure
+        await upload_sessions.set_status(session_id, SESSION_FINALIZING, SESSION_OPEN)
+        raise
+
+    await upload_sessions.delete(session_id)
+    await run_in_threadpool(delete_part, session_id)
+
+    if background:
+        response.status_code = status.HTTP_202_ACCEPTED
+    return result
+
+
+@router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload_session(
+    session_id: str,
+    user_id: str = Depends(get_current_user),
+    upload_sessions: UploadSessionRepository = Depends(get_upload_session_repository)
+):
+    """
+    Abandon a resumable upload and delete its part file
+    """
+    await _get_session(session_id, user_id, upload_sessions)
+    await upload_sessions.delete(session_id)
+    await run_in_threadpool(delete_part, session_id)
+    return None
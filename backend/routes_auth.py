@@ -1,20 +1,62 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from datetime import datetime, timedelta
-from models import UserRegister, UserLogin, UserResponse, Token
-from database import get_database
-from auth import get_password_hash, verify_password, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from models import UserRegister, UserLogin, UserResponse, Token, TokenRefresh
+from repositories import (
+    UserRepository,
+    RefreshTokenRepository,
+    RevokedTokenRepository,
+    get_user_repository,
+    get_refresh_token_repository,
+    get_revoked_token_repository
+)
+from auth import (
+    get_password_hash_async,
+    verify_and_update_password_async,
+    create_access_token,
+    create_refresh_token,
+    hash_refresh_token,
+    get_token_claims,
+    revoke_token,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS
+)
+from typing import Any, Dict, Optional
 from bson import ObjectId
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+async def _issue_tokens(
+    user_id: str,
+    refresh_tokens: RefreshTokenRepository,
+    family_id: Optional[str] = None
+) -> Token:
+    """Create an access token plus a server-tracked refresh token"""
+    access_token = create_access_token(
+        data={"sub": user_id},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    
+    refresh_token, token_hash = create_refresh_token()
+    now = datetime.utcnow()
+    await refresh_tokens.insert({
+        "token_hash": token_hash,
+        "user_id": user_id,
+        # All tokens rotated from one login share a family
+        "family_id": family_id or str(ObjectId()),
+        "revoked": False,
+        "created_at": now,
+        "expires_at": now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    })
+    
+    return Token(access_token=access_token, token_type="bearer", refresh_token=refresh_token)
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user: UserRegister):
+async def register(user: UserRegister, users: UserRepository = Depends(get_user_repository)):
     """Register a new user"""
-    db = get_database()
-    
     # Check if user already exists
-    existing_user = db.users.find_one({"email": user.email})
+    existing_user = await users.find_by_email(user.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -22,7 +64,7 @@ async def register(user: UserRegister):
         )
     
     # Hash password
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     
     # Create user document
     user_doc = {
@@ -33,11 +75,11 @@ async def register(user: UserRegister):
     }
     
     # Insert user
-    result = db.users.insert_one(user_doc)
+    user_id = await users.insert(user_doc)
     
     # Return user response
     return UserResponse(
-        id=str(result.inserted_id),
+        id=user_id,
         email=user.email,
         full_name=user.full_name,
         created_at=user_doc["created_at"]
@@ -45,12 +87,14 @@ async def register(user: UserRegister):
 
 
 @router.post("/login", response_model=Token)
-async def login(user: UserLogin):
-    """Login user and return JWT token"""
-    db = get_database()
-    
+async def login(
+    user: UserLogin,
+    users: UserRepository = Depends(get_user_repository),
+    refresh_tokens: RefreshTokenRepository = Depends(get_refresh_token_repository)
+):
+    """Login user and return JWT access and refresh tokens"""
     # Find user
-    db_user = db.users.find_one({"email": user.email})
+    db_user = await users.find_by_email(user.email)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -58,30 +102,79 @@ async def login(user: UserLogin):
         )
     
     # Verify password
-    if not verify_password(user.password, db_user["hashed_password"]):
+    valid, new_hash = await verify_and_update_password_async(user.password, db_user["hashed_password"])
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
-    # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(db_user["_id"])},
-        expires_delta=access_token_expires
-    )
+    # Transparently upgrade hashes made with an old cost factor or scheme
+    if new_hash:
+        await users.update_password_hash(str(db_user["_id"]), new_hash)
+    
+    return await _issue_tokens(str(db_user["_id"]), refresh_tokens)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    body: TokenRefresh,
+    users: UserRepository = Depends(get_user_repository),
+    refresh_tokens: RefreshTokenRepository = Depends(get_refresh_token_repository)
+):
+    """Exchange a refresh token for new tokens (the old refresh token is rotated out)"""
+    token_hash = hash_refresh_token(body.refresh_token)
+    
+    stored = await refresh_tokens.consume(token_hash, datetime.utcnow())
+    if not stored:
+        # A rotated token being presented again means it leaked: kill the family
+        reused = await refresh_tokens.find_by_hash(token_hash)
+        if reused and reused.get("used_at"):
+            await refresh_tokens.revoke_family(reused["family_id"])
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+    
+    # The account may have been deleted since the token was issued
+    if not await users.find_by_id(stored["user_id"]):
+        await refresh_tokens.revoke_family(stored["family_id"])
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+    
+    return await _issue_tokens(stored["user_id"], refresh_tokens, stored["family_id"])
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: TokenRefresh,
+    claims: Dict[str, Any] = Depends(get_token_claims),
+    refresh_tokens: RefreshTokenRepository = Depends(get_refresh_token_repository),
+    revoked_tokens: RevokedTokenRepository = Depends(get_revoked_token_repository)
+):
+    """Revoke the current access token and the session's refresh tokens"""
+    await revoke_token(claims, revoked_tokens)
     
-    return Token(access_token=access_token, token_type="bearer")
+    # Only the token's owner can end its session; revoking the family
+    # includes the presented token itself
+    stored = await refresh_tokens.find_by_hash(hash_refresh_token(body.refresh_token))
+    if stored and stored["user_id"] == claims.get("sub"):
+        await refresh_tokens.revoke_family(stored["family_id"])
+    return None
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(user_id: str = Depends(lambda x: x)):
+async def get_current_user_info(
+    user_id: str = Depends(lambda x: x),
+    users: UserRepository = Depends(get_user_repository)
+):
     """Get current user information"""
     from auth import get_current_user
     user_id = Depends(get_current_user)
     
-    db = get_database()
-    user = db.users.find_one({"_id": ObjectId(user_id)})
+    user = await users.find_by_id(user_id)
     
     if not user:
         raise HTTPException(
@@ -1,17 +1,18 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Response
+from typing import List, Optional
 from datetime import datetime
 import httpx
-import os
-from dotenv import load_dotenv
 from models import PredictionCreate, PredictionResponse
-from database import get_database
+from repositories import (
+    PredictionRepository,
+    PredictionCacheRepository,
+    get_prediction_repository,
+    get_prediction_cache_repository
+)
 from auth import get_current_user
-from bson import ObjectId
-
-load_dotenv()
-
-PREDICTION_API_URL = os.getenv("PREDICTION_API_URL")
+from pagination import decode_cursor, set_next_cursor
+from fast_json import trusted_response
+from prediction_client import get_prediction_client, fetch_prediction
 
 router = APIRouter(prefix="/predictions", tags=["Predictions"])
 
@@ -19,22 +20,18 @@ router = APIRouter(prefix="/predictions", tags=["Predictions"])
 @router.post("/", response_model=PredictionResponse, status_code=status.HTTP_201_CREATED)
 async def create_prediction(
     prediction: PredictionCreate,
-    user_id: str = Depends(get_current_user)
+    response: Response,
+    user_id: str = Depends(get_current_user),
+    predictions: PredictionRepository = Depends(get_prediction_repository),
+    client: httpx.AsyncClient = Depends(get_prediction_client),
+    cache_store: Optional[PredictionCacheRepository] = Depends(get_prediction_cache_repository)
 ):
     """
     Create a new prediction by calling the external API and saving the result
     """
-    db = get_database()
-    
     try:
-        # Call external prediction API
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                PREDICTION_API_URL,
-                json=prediction.input_data
-            )
-            response.raise_for_status()
-            prediction_result = response.json()
+        # Call external prediction API (or reuse a cached result for identical input)
+        prediction_result, cache_status = await fetch_prediction(client, prediction.input_data, cache_store)
     
     except httpx.HTTPError as e:
         raise HTTPException(
@@ -42,6 +39,8 @@ async def create_prediction(
             detail=f"Failed to get prediction from API: {str(e)}"
         )
     
+    response.headers["X-Prediction-Cache"] = cache_status
+    
     # Save prediction to database
     prediction_doc = {
         "user_id": user_id,
@@ -50,10 +49,10 @@ async def create_prediction(
         "created_at": datetime.utcnow()
     }
     
-    result = db.predictions.insert_one(prediction_doc)
+    inserted_id = await predictions.insert(prediction_doc)
     
     return PredictionResponse(
-        id=str(result.inserted_id),
+        id=inserted_id,
         user_id=user_id,
         input_data=prediction.input_data,
         prediction_result=prediction_result,
@@ -63,46 +62,47 @@ async def create_prediction(
 
 @router.get("/", response_model=List[PredictionResponse])
 async def get_predictions(
+    response: Response,
     skip: int = 0,
     limit: int = 10,
-    user_id: str = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    user_id: str = Depends(get_current_user),
+    predictions: PredictionRepository = Depends(get_prediction_repository)
 ):
     """
     Get all predictions for the current user
+
+    Pass the X-Next-Cursor header of a page as ?cursor= to get the next one;
+    unlike skip, this stays fast however deep the page is.
     """
-    db = get_database()
-    
-    predictions = db.predictions.find(
-        {"user_id": user_id}
-    ).sort("created_at", -1).skip(skip).limit(limit)
-    
-    return [
-        PredictionResponse(
-            id=str(pred["_id"]),
-            user_id=pred["user_id"],
-            input_data=pred["input_data"],
-            prediction_result=pred["prediction_result"],
-            created_at=pred["created_at"]
-        )
-        for pred in predictions
-    ]
+    after = decode_cursor(cursor) if cursor else None
+    docs = await predictions.list_for_user(user_id, skip, limit, after)
+    set_next_cursor(response, docs, limit)
+    
+    # Shaped like PredictionResponse; see fast_json.trusted_response
+    return trusted_response([
+        {
+            "id": str(pred["_id"]),
+            "user_id": pred["user_id"],
+            "input_data": pred["input_data"],
+            "prediction_result": pred["prediction_result"],
+            "created_at": pred["created_at"]
+        }
+        for pred in docs
+    ], response)
 
 
 @router.get("/{prediction_id}", response_model=PredictionResponse)
 async def get_prediction(
     prediction_id: str,
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    predictions: PredictionRepository = Depends(get_prediction_repository)
 ):
     """
     Get a specific prediction by ID
     """
-    db = get_database()
-    
     try:
-        prediction = db.predictions.find_one({
-            "_id": ObjectId(prediction_id),
-            "user_id": user_id
-        })
+        prediction = await predictions.get_for_user(prediction_id, user_id)
     except:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -127,25 +127,21 @@ async def get_prediction(
 @router.delete("/{prediction_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_prediction(
     prediction_id: str,
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    predictions: PredictionRepository = Depends(get_prediction_repository)
 ):
     """
     Delete a specific prediction
     """
-    db = get_database()
-    
     try:
-        result = db.predictions.delete_one({
-            "_id": ObjectId(prediction_id),
-            "user_id": user_id
-        })
+        deleted = await predictions.delete_for_user(prediction_id, user_id)
     except:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid prediction ID"
         )
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Prediction not found"
@@ -158,19 +154,18 @@ async def delete_prediction(
 async def update_prediction(
     prediction_id: str,
     prediction: PredictionCreate,
-    user_id: str = Depends(get_current_user)
+    response: Response,
+    user_id: str = Depends(get_current_user),
+    predictions: PredictionRepository = Depends(get_prediction_repository),
+    client: httpx.AsyncClient = Depends(get_prediction_client),
+    cache_store: Optional[PredictionCacheRepository] = Depends(get_prediction_cache_repository)
 ):
     """
     Update a prediction (re-run with new input data)
     """
-    db = get_database()
-    
     # Check if prediction exists
     try:
-        existing = db.predictions.find_one({
-            "_id": ObjectId(prediction_id),
-            "user_id": user_id
-        })
+        existing = await predictions.get_for_user(prediction_id, user_id)
     except:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -185,13 +180,7 @@ async def update_prediction(
     
     # Call external prediction API with new data
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                PREDICTION_API_URL,
-                json=prediction.input_data
-            )
-            response.raise_for_status()
-            prediction_result = response.json()
+        prediction_result, cache_status = await fetch_prediction(client, prediction.input_data, cache_store)
     
     except httpx.HTTPError as e:
         raise HTTPException(
@@ -199,6 +188,8 @@ async def update_prediction(
             detail=f"Failed to get prediction from API: {str(e)}"
         )
     
+    response.headers["X-Prediction-Cache"] = cache_status
+    
     # Update prediction in database
     update_doc = {
         "input_data": prediction.input_data,
@@ -206,13 +197,8 @@ async def update_prediction(
         "updated_at": datetime.utcnow()
     }
     
-    db.predictions.update_one(
-        {"_id": ObjectId(prediction_id)},
-        {"$set": update_doc}
-    )
-    
-    # Fetch updated prediction
-    updated_prediction = db.predictions.find_one({"_id": ObjectId(prediction_id)})
+    # Update and fetch the prediction in one round trip
+    updated_prediction = await predictions.update(prediction_id, update_doc)
     
     return PredictionResponse(
         id=str(updated_prediction["_id"]),
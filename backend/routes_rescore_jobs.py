@@ -0,0 +1,100 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from typing import Any, Dict, List
+from models import RescoreJobResponse
+from repositories import RescoreJobRepository, get_rescore_job_repository
+from auth import get_current_user
+from inference import inference_engine
+from rescore_jobs import job_progress, new_job, rescore_runner
+
+router = APIRouter(prefix="/audio-predictions/rescore-jobs", tags=["Audio Rescoring"])
+
+
+async def _get_job(job_id: str, user_id: str, rescore_jobs: RescoreJobRepository) -> Dict[str, Any]:
+    try:
+        job = await rescore_jobs.get(job_id, user_id)
+    except:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid job ID"
+        )
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Rescore job not found"
+        )
+    return job
+
+
+@router.post("/", response_model=RescoreJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_rescore_job(
+    user_id: str = Depends(get_current_user),
+    rescore_jobs: RescoreJobRepository = Depends(get_rescore_job_repository)
+):
+    """
+    Re-score all of the current user's saved recordings with the in-process model
+
+    Runs in the background; poll GET /{id} for progress.
+    """
+    if not inference_engine.running:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="In-process inference is not enabled"
+        )
+
+    active = await rescore_jobs.find_active(user_id)
+    if active:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Rescore job {active['_id']} is already {active['status']}"
+        )
+
+    job = new_job(user_id, created_by=user_id)
+    job["_id"] = await rescore_jobs.insert(job)
+    rescore_runner.notify()
+    return RescoreJobResponse(**job_progress(job))
+
+
+@router.get("/", response_model=List[RescoreJobResponse])
+async def list_rescore_jobs(
+    limit: int = 20,
+    user_id: str = Depends(get_current_user),
+    rescore_jobs: RescoreJobRepository = Depends(get_rescore_job_repository)
+):
+    """
+    List the current user's rescore jobs, newest first
+    """
+    jobs = await rescore_jobs.list_for_user(user_id, limit)
+    return [RescoreJobResponse(**job_progress(job)) for job in jobs]
+
+
+@router.get("/{job_id}", response_model=RescoreJobResponse)
+async def get_rescore_job(
+    job_id: str,
+    user_id: str = Depends(get_current_user),
+    rescore_jobs: RescoreJobRepository = Depends(get_rescore_job_repository)
+):
+    """
+    Get the progress of a rescore job
+    """
+    job = await _get_job(job_id, user_id, rescore_jobs)
+    return RescoreJobResponse(**job_progress(job))
+
+
+@router.post("/{job_id}/cancel", response_model=RescoreJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def cancel_rescore_job(
+    job_id: str,
+    user_id: str = Depends(get_current_user),
+    rescore_jobs: RescoreJobRepository = Depends(get_rescore_job_repository)
+):
+    """
+    Cancel a rescore job; it stops at its next checkpoint (results so far are kept)
+    """
+    job = await _get_job(job_id, user_id, rescore_jobs)
+    if not await rescore_jobs.request_cancel(job_id, user_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Rescore job is already {job['status']}"
+        )
+    job = await _get_job(job_id, user_id, rescore_jobs)
+    return RescoreJobResponse(**job_progress(job))
@@ -0,0 +1,49 @@
+"""
+Single-flight request coalescing.
+
+Concurrent callers asking for the same key share one in-flight call instead
+of each starting their own. The call runs as its own task, so a caller that
+disconnects does not cancel the work other callers are waiting on.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls by key"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._started = 0
+        self._coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run func once per key at a time; returns (result, shared with another caller)"""
+        task = self._calls.get(key)
+        shared = task is not None
+
+        if shared:
+            self._coalesced += 1
+        else:
+            self._started += 1
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        return await asyncio.shield(task), shared
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Coalescing counters for the /metrics endpoint"""
+        return {
+            "in_flight": len(self._calls),
+            "calls_started": self._started,
+            "coalesced": self._coalesced,
+        }
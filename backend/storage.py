@@ -0,0 +1,255 @@
+"""
+Pluggable storage backends for uploaded audio.
+
+Every backend implements put / get / delete / url / read_range. The backend
+used for new uploads is picked with STORAGE_BACKEND; each document records
+which backend holds its audio so older recordings stay reachable after a
+switch.
+
+- "cloudinary": uploads to Cloudinary in chunks (the original behaviour)
+- "local": writes under LOCAL_STORAGE_DIR with sendfile (zero-copy) and
+  serves byte ranges from a memory map, so on-prem deployments and offline
+  development never leave the host
+"""
+
+import mmap
+import mimetypes
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+import cloudinary
+import cloudinary.uploader
+import cloudinary.utils
+import httpx
+from dotenv import load_dotenv
+from upload_stream import AUDIO_UPLOAD_CHUNK_SIZE, BoundedUploadReader, UploadTooLarge
+
+load_dotenv()
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "cloudinary")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "uploads/audio")
+# Prefix for local audio URLs, e.g. "http://192.168.1.10:8000" (empty = relative URLs)
+LOCAL_STORAGE_BASE_URL = os.getenv("LOCAL_STORAGE_BASE_URL", "").rstrip("/")
+
+# Configure Cloudinary
+cloudinary.config(
+    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+    api_key=os.getenv("CLOUDINARY_API_KEY"),
+    api_secret=os.getenv("CLOUDINARY_API_SECRET")
+)
+
+
+class StoredObject:
+    """Where a put() left the data"""
+
+    def __init__(self, key: str, url: str, size: int):
+        self.key = key
+        self.url = url
+        self.size = size
+
+
+class StorageBackend(ABC):
+    """Interface for audio storage backends (methods are blocking; call them in a threadpool)"""
+
+    name = ""
+
+    @abstractmethod
+    def put(self, key: str, reader, extension: str = "", tags: Optional[List[str]] = None) -> StoredObject:
+        """Store the data read from `reader` under `key` (the backend may add the extension)"""
+
+    def put_file(self, key: str, path, extension: str = "", tags: Optional[List[str]] = None) -> StoredObject:
+        """Store a file from local disk"""
+        with open(path, "rb") as f:
+            reader = BoundedUploadReader(f, max_bytes=os.fstat(f.fileno()).st_size, name=str(path))
+            return self.put(key, reader, extension, tags)
+
+    @abstractmethod
+    def get(self, key: str) -> Iterator[bytes]:
+        """Stream the stored data in chunks"""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove the stored data (a missing key is not an error)"""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Public URL clients can fetch the audio from"""
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """Stored size in bytes"""
+
+    @abstractmethod
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        """Read bytes [start, end] inclusive"""
+
+
+class CloudinaryStorage(StorageBackend):
+    """Audio stored as Cloudinary 'video' resources"""
+
+    name = "cloudinary"
+
+    def put(self, key: str, reader, extension: str = "", tags: Optional[List[str]] = None) -> StoredObject:
+        upload_result = cloudinary.uploader.upload_large(
+            reader,
+            resource_type="video",  # Cloudinary uses 'video' resource type for audio files
+            public_id=key,
+            folder="audio_predictions",
+            format=extension or None,
+            tags=tags or [],
+            chunk_size=getattr(reader, "chunk_size", AUDIO_UPLOAD_CHUNK_SIZE)
+        )
+        return StoredObject(
+            key=upload_result.get("public_id"),
+            url=upload_result.get("secure_url"),
+            size=upload_result.get("bytes") or getattr(reader, "bytes_read", 0)
+        )
+
+    def get(self, key: str) -> Iterator[bytes]:
+        with httpx.stream("GET", self.url(key), follow_redirects=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes(AUDIO_UPLOAD_CHUNK_SIZE):
+                yield chunk
+
+    def delete(self, key: str):
+        cloudinary.uploader.destroy(key, resource_type="video")
+
+    def url(self, key: str) -> str:
+        return cloudinary.utils.cloudinary_url(key, resource_type="video", secure=True)[0]
+
+    def size(self, key: str) -> int:
+        response = httpx.head(self.url(key), follow_redirects=True)
+        response.raise_for_status()
+        return int(response.headers.get("content-length", 0))
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        response = httpx.get(self.url(key), headers={"Range": f"bytes={start}-{end}"}, follow_redirects=True)
+        response.raise_for_status()
+        return response.content
+
+
+class LocalStorage(StorageBackend):
+    """Audio stored as files under a local directory"""
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def put(self, key: str, reader, extension: str = "", tags: Optional[List[str]] = None) -> StoredObject:
+        if extension and not key.endswith(f".{extension}"):
+            key = f"{key}.{extension}"
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temp file in the same directory, then rename into place
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                size = _copy_to_file(reader, out)
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        return StoredObject(key=key, url=self.url(key), size=size)
+
+    def get(self, key: str) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            while True:
+                chunk = f.read(AUDIO_UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    def delete(self, key: str):
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def url(self, key: str) -> str:
+        return f"{LOCAL_STORAGE_BASE_URL}/audio-predictions/files/{key}"
+
+    def path(self, key: str) -> Path:
+        """Filesystem path of a stored object"""
+        return self._path(key)
+
+    def size(self, key: str) -> int:
+        return self._path(key).stat().st_size
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        with open(self._path(key), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[start:end + 1]
+
+
+def _copy_to_file(reader, out: BinaryIO) -> int:
+    """Copy a reader into an open file, zero-copy when the reader is backed by a real file"""
+    try:
+        in_fd = reader.fileno()
+    except (AttributeError, OSError, ValueError):
+        in_fd = None
+
+    if in_fd is not None and hasattr(os, "sendfile"):
+        offset = reader.tell()
+        count = os.fstat(in_fd).st_size - offset
+        max_bytes = getattr(reader, "max_bytes", None)
+        if max_bytes is not None and count > max_bytes:
+            raise UploadTooLarge(count)
+        out.flush()
+        sent = 0
+        while sent < count:
+            written = os.sendfile(out.fileno(), in_fd, offset + sent, count - sent)
+            if written == 0:
+                break
+            sent += written
+        return sent
+
+    size = 0
+    while True:
+        chunk = reader.read(AUDIO_UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return size
+        out.write(chunk)
+        size += len(chunk)
+
+
+def guess_content_type(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+_backends: Dict[str, StorageBackend] = {}
+
+
+def get_storage_backend(name: Optional[str] = None) -> StorageBackend:
+    """Backend by name (defaults to STORAGE_BACKEND for new uploads)"""
+    name = name or STORAGE_BACKEND
+    if name not in _backends:
+        if name == "cloudinary":
+            _backends[name] = CloudinaryStorage()
+        elif name == "local":
+            _backends[name] = LocalStorage(LOCAL_STORAGE_DIR)
+        else:
+            raise ValueError(f"Unknown storage backend: {name}")
+    return _backends[name]
+
+
+def prediction_storage(prediction: Dict[str, Any]) -> Tuple[StorageBackend, Optional[str]]:
+    """
+    Backend and key holding an audio prediction's recording
+
+    Older documents only have cloudinary_public_id.
+    """
+    backend = get_storage_backend(prediction.get("storage_backend", "cloudinary"))
+    return backend, prediction.get("storage_key") or prediction.get("cloudinary_public_id")
@@ -0,0 +1,107 @@
+"""Tests for deduplicated audio storage (audio_blobs refcounts) and ingest_audio"""
+
+import asyncio
+import io
+import pytest
+import audio_ingest
+from audio_ingest import ingest_audio
+from repositories import AudioBlobRepository, AudioPredictionRepository, PredictionStatsRepository
+from storage import LocalStorage
+from upload_stream import BoundedUploadReader
+
+BLOB = {"storage_key": "audio_predictions/abc.wav", "audio_url": "/files/abc.wav", "size": 4, "media": {}}
+
+
+def test_refcounts_through_acquire_add_reference_and_release(db):
+    blobs = AudioBlobRepository(db)
+
+    async def scenario():
+        assert await blobs.acquire("abc", "local") is None
+        first = await blobs.add_reference("abc", "local", BLOB)
+        second = await blobs.acquire("abc", "local")
+        # A concurrent upload of the same content also just takes a reference
+        third = await blobs.add_reference("abc", "local", {**BLOB, "storage_key": "other"})
+        counts = [first["refcount"], second["refcount"], third["refcount"], third["storage_key"]]
+
+        released = [await blobs.release("abc", "local") for _ in range(3)]
+        return counts, released, await blobs.acquire("abc", "local")
+
+    counts, released, after = asyncio.run(scenario())
+    assert counts == [1, 2, 3, BLOB["storage_key"]]
+    # Only the last release hands back the blob so its object can be deleted
+    assert released[:2] == [None, None]
+    assert released[2]["storage_key"] == BLOB["storage_key"]
+    assert after is None
+
+
+def test_backends_are_counted_separately(db):
+    blobs = AudioBlobRepository(db)
+
+    async def scenario():
+        await blobs.add_reference("abc", "local", BLOB)
+        return await blobs.acquire("abc", "cloudinary")
+
+    assert asyncio.run(scenario()) is None
+
+
+class FailingInsert(AudioPredictionRepository):
+    async def insert(self, prediction_doc):
+        raise RuntimeError("database unavailable")
+
+
+def ingest(db, storage, repository_class=AudioPredictionRepository, data=b"RIFFdata"):
+    reader = BoundedUploadReader(io.BytesIO(data))
+    return asyncio.run(ingest_audio(
+        reader, "cry.wav", "user-1", {"predicted_label": "Hungry", "confidence": 90.0}, None, None,
+        repository_class(db), AudioBlobRepository(db), PredictionStatsRepository(db)
+    ))
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path / "storage"))
+    monkeypatch.setattr(audio_ingest, "get_storage_backend", lambda: storage)
+    monkeypatch.setattr(audio_ingest, "AUDIO_INGEST_MODE", "sync")
+    monkeypatch.setattr(audio_ingest, "AUDIO_NORMALIZE_ENABLED", False)
+    return storage
+
+
+def stored_files(storage):
+    return [path for path in storage.root.rglob("*") if path.is_file()]
+
+
+def test_identical_uploads_share_one_object(db, storage, monkeypatch):
+    monkeypatch.setattr(audio_ingest, "AUDIO_DEDUP_ENABLED", True)
+    first, _ = ingest(db, storage)
+    second, _ = ingest(db, storage)
+
+    assert first.audio_url == second.audio_url
+    assert len(stored_files(storage)) == 1
+    assert asyncio.run(db.audio_blobs.find_one({}))["refcount"] == 2
+
+
+def test_failed_insert_releases_a_new_blob(db, storage, monkeypatch):
+    monkeypatch.setattr(audio_ingest, "AUDIO_DEDUP_ENABLED", True)
+    with pytest.raises(RuntimeError):
+        ingest(db, storage, FailingInsert)
+
+    assert stored_files(storage) == []
+    assert asyncio.run(db.audio_blobs.count_documents({})) == 0
+
+
+def test_failed_insert_keeps_a_shared_blob(db, storage, monkeypatch):
+    monkeypatch.setattr(audio_ingest, "AUDIO_DEDUP_ENABLED", True)
+    ingest(db, storage)
+    with pytest.raises(RuntimeError):
+        ingest(db, storage, FailingInsert)
+
+    assert len(stored_files(storage)) == 1
+    assert asyncio.run(db.audio_blobs.find_one({}))["refcount"] == 1
+
+
+def test_failed_insert_deletes_an_undeduplicated_object(db, storage, monkeypatch):
+    monkeypatch.setattr(audio_ingest, "AUDIO_DEDUP_ENABLED", False)
+    with pytest.raises(RuntimeError):
+        ingest(db, storage, FailingInsert)
+
+    assert stored_files(storage) == []
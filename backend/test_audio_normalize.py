@@ -0,0 +1,104 @@
+"""Tests for audio normalization without ffmpeg (python -m pytest)"""
+
+import asyncio
+import io
+import wave
+import numpy as np
+import pytest
+import audio_ingest
+import audio_normalize
+import upload_queue as upload_queue_module
+from audio_ingest import ingest_audio
+from audio_normalize import AudioNormalizer, NormalizeError, normalize_file, resample
+from repositories import AudioBlobRepository, AudioPredictionRepository, PredictionStatsRepository
+from storage import LocalStorage
+from upload_stream import BoundedUploadReader
+
+
+@pytest.fixture(autouse=True)
+def no_ffmpeg(monkeypatch):
+    # The numpy WAV path; ffmpeg is optional and not installed everywhere
+    monkeypatch.setattr(audio_normalize, "FFMPEG_BINARY", "ffmpeg-not-installed")
+
+
+def wav_bytes(seconds: float = 0.5, rate: int = 44100, channels: int = 2, tone: float = 440.0) -> bytes:
+    t = np.arange(int(seconds * rate)) / rate
+    samples = (np.sin(2 * np.pi * tone * t) * 0.5 * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(np.repeat(samples, channels).tobytes())
+    return buffer.getvalue()
+
+
+def dominant_frequency(samples: np.ndarray, rate: int) -> float:
+    spectrum = np.abs(np.fft.rfft(samples))
+    return np.fft.rfftfreq(len(samples), 1 / rate)[spectrum.argmax()]
+
+
+def test_resample_keeps_the_duration_and_the_tone():
+    rate = 44100
+    samples = np.sin(2 * np.pi * 440 * np.arange(rate) / rate).astype(np.float32)
+
+    resampled = resample(samples, rate, 16000)
+    assert len(resampled) == 16000
+    assert dominant_frequency(resampled, 16000) == pytest.approx(440, abs=2)
+    assert resample(samples, rate, rate) is samples
+
+
+def test_stereo_wav_becomes_mono_16_bit_at_the_target_rate(tmp_path):
+    source = tmp_path / "cry.wav"
+    source.write_bytes(wav_bytes())
+
+    normalized = normalize_file(str(source), "opus", 16000)
+    # Without ffmpeg the codec falls back to WAV
+    assert (normalized.codec, normalized.extension, normalized.sample_rate) == ("wav", "wav", 16000)
+    assert normalized.duration == pytest.approx(0.5)
+    assert normalized.original_size == source.stat().st_size > normalized.size
+    with wave.open(normalized.path, "rb") as reader:
+        assert (reader.getnchannels(), reader.getsampwidth(), reader.getframerate()) == (1, 2, 16000)
+        pcm = np.frombuffer(reader.readframes(reader.getnframes()), dtype="<i2")
+    assert len(pcm) == 8000
+    assert dominant_frequency(pcm.astype(np.float32), 16000) == pytest.approx(440, abs=4)
+
+
+def test_undecodable_input_raises_and_leaves_no_output(tmp_path):
+    source = tmp_path / "cry.mp3"
+    source.write_bytes(b"ID3 not a wav file")
+
+    with pytest.raises(NormalizeError):
+        normalize_file(str(source))
+    assert [path.name for path in tmp_path.iterdir()] == ["cry.mp3"]
+
+
+def test_ingest_stores_the_normalized_recording(db, tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path / "storage"))
+    normalizer = AudioNormalizer(workers=1)
+    monkeypatch.setattr(audio_ingest, "get_storage_backend", lambda: storage)
+    monkeypatch.setattr(audio_ingest, "AUDIO_INGEST_MODE", "sync")
+    monkeypatch.setattr(audio_ingest, "AUDIO_DEDUP_ENABLED", False)
+    monkeypatch.setattr(audio_ingest, "AUDIO_NORMALIZE_ENABLED", True)
+    monkeypatch.setattr(audio_normalize, "AUDIO_NORMALIZE_ENABLED", True)
+    monkeypatch.setattr(audio_normalize, "audio_normalizer", normalizer)
+    monkeypatch.setattr(upload_queue_module, "_spool_storage", LocalStorage(str(tmp_path / "spool")))
+    upload = wav_bytes()
+
+    try:
+        result, _ = asyncio.run(ingest_audio(
+            BoundedUploadReader(io.BytesIO(upload)), "cry.wav", "user-1", {"predicted_label": "Hungry"}, None, 9.9,
+            AudioPredictionRepository(db), AudioBlobRepository(db), PredictionStatsRepository(db)
+        ))
+    finally:
+        normalizer.shutdown()
+
+    assert result.original_size == len(upload)
+    # The measured duration replaces the client's value
+    assert result.audio_duration == 0.5
+    doc = asyncio.run(db.audio_predictions.find_one({}))
+    assert (doc["audio_codec"], doc["sample_rate"]) == ("wav", 16000)
+    stored = storage.path(doc["storage_key"])
+    assert stored.suffix == ".wav" and stored.stat().st_size == result.audio_size
+    assert list((tmp_path / "spool").iterdir()) == []
+    assert normalizer.stats()["files"] == 1
@@ -0,0 +1,106 @@
+"""Unit tests for audio_stream.py (python -m pytest)"""
+
+import numpy as np
+import pytest
+from audio_stream import (
+    STREAM_HOP_SECONDS,
+    STREAM_MIN_SECONDS,
+    STREAM_WINDOW_SECONDS,
+    AudioStream,
+    RingBuffer,
+    StreamError,
+)
+
+
+def test_ring_buffer_before_it_fills():
+    buffer = RingBuffer(5)
+    buffer.write(np.array([1, 2, 3], dtype=np.float32))
+
+    assert len(buffer) == 3
+    assert buffer.snapshot().tolist() == [1, 2, 3]
+
+
+def test_ring_buffer_keeps_the_latest_samples_oldest_first():
+    buffer = RingBuffer(5)
+    buffer.write(np.array([1, 2, 3], dtype=np.float32))
+    buffer.write(np.array([4, 5, 6, 7], dtype=np.float32))
+
+    assert len(buffer) == 5
+    assert buffer.total == 7
+    assert buffer.snapshot().tolist() == [3, 4, 5, 6, 7]
+
+
+def test_ring_buffer_write_longer_than_capacity():
+    buffer = RingBuffer(4)
+    buffer.write(np.array([1], dtype=np.float32))
+    buffer.write(np.arange(2, 12, dtype=np.float32))
+
+    assert buffer.total == 11
+    assert buffer.snapshot().tolist() == [8, 9, 10, 11]
+
+
+def test_ring_buffer_snapshot_is_a_copy():
+    buffer = RingBuffer(3)
+    buffer.write(np.array([1, 2, 3], dtype=np.float32))
+    snapshot = buffer.snapshot()
+    buffer.write(np.array([4], dtype=np.float32))
+
+    assert snapshot.tolist() == [1, 2, 3]
+
+
+def test_sample_split_across_messages_is_carried_over():
+    stream = AudioStream(8000)
+    pcm = np.array([16384, -16384, 8192], dtype="<i2").tobytes()
+    stream.feed(pcm[:3])
+    stream.feed(pcm[3:])
+
+    assert stream.buffer.snapshot().tolist() == [0.5, -0.5, 0.25]
+
+
+def test_stereo_is_mixed_down():
+    stream = AudioStream(8000, sample_format="f32le", channels=2)
+    stream.feed(np.array([0.5, 0.25, -1.0, 0.0], dtype="<f4").tobytes())
+
+    assert stream.buffer.snapshot().tolist() == [0.375, -0.5]
+
+
+def test_windows_are_due_after_the_minimum_then_every_hop():
+    rate = 8000
+    stream = AudioStream(rate)
+    stream.feed(np.zeros(int(STREAM_MIN_SECONDS * rate) - 1, dtype="<i2").tobytes())
+    assert not stream.window_due()
+
+    stream.feed(np.zeros(1, dtype="<i2").tobytes())
+    assert stream.window_due()
+    window = stream.take_window()
+    assert len(window) == min(int(STREAM_MIN_SECONDS * rate), int(STREAM_WINDOW_SECONDS * rate))
+    assert not stream.window_due()
+
+    stream.feed(np.zeros(int(STREAM_HOP_SECONDS * rate), dtype="<i2").tobytes())
+    assert stream.window_due()
+    stream.skip_window()
+    assert not stream.window_due()
+
+
+def test_summary_averages_window_probabilities():
+    stream = AudioStream(8000)
+    assert stream.summary() is None
+
+    stream.add_result({"probabilities": {"Hungry": 0.8, "Tired": 0.2}})
+    stream.add_result({"probabilities": {"Hungry": 0.4, "Tired": 0.6}})
+    summary = stream.summary()
+
+    assert summary["predicted_label"] == "Hungry"
+    assert summary["probabilities"] == {"Hungry": 0.6, "Tired": 0.4}
+    assert summary["confidence"] == 60.0
+    assert summary["windows"] == 2
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"sample_rate": 4000},
+    {"sample_rate": 16000, "sample_format": "u8"},
+    {"sample_rate": 16000, "channels": 3},
+])
+def test_bad_stream_parameters_are_rejected(kwargs):
+    with pytest.raises(StreamError):
+        AudioStream(**kwargs)
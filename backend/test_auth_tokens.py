@@ -0,0 +1,70 @@
+"""Tests for refresh token rotation and logout (python -m pytest)"""
+
+import asyncio
+from bson import ObjectId
+from routes_auth import router
+
+USER = {"email": "parent@example.com", "password": "secret123", "full_name": "Test Parent"}
+
+
+def login(client):
+    client.post("/auth/register", json=USER)
+    response = client.post("/auth/login", json={"email": USER["email"], "password": USER["password"]})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_refresh_rotates_the_token(api):
+    client = api(router)
+    tokens = login(client)
+
+    renewed = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert renewed.status_code == 200
+    assert renewed.json()["refresh_token"] != tokens["refresh_token"]
+
+    # The old token was rotated out, and reusing it kills the whole family
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": renewed.json()["refresh_token"]}).status_code == 401
+
+
+def test_logout_revokes_the_refresh_token_family(api):
+    client = api(router)
+    tokens = login(client)
+    renewed = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+
+    response = client.post(
+        "/auth/logout",
+        json={"refresh_token": renewed["refresh_token"]},
+        headers={"Authorization": f"Bearer {renewed['access_token']}"}
+    )
+    assert response.status_code == 204
+    assert client.post("/auth/refresh", json={"refresh_token": renewed["refresh_token"]}).status_code == 401
+    assert client.post(
+        "/auth/logout",
+        json={"refresh_token": renewed["refresh_token"]},
+        headers={"Authorization": f"Bearer {renewed['access_token']}"}
+    ).status_code == 401
+
+
+def test_logout_leaves_other_users_tokens_alone(api, db):
+    client = api(router)
+    tokens = login(client)
+    other = {**USER, "email": "other@example.com"}
+    client.post("/auth/register", json=other)
+    other_tokens = client.post("/auth/login", json={"email": other["email"], "password": other["password"]}).json()
+
+    client.post(
+        "/auth/logout",
+        json={"refresh_token": tokens["refresh_token"]},
+        headers={"Authorization": f"Bearer {other_tokens['access_token']}"}
+    )
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 200
+
+
+def test_refresh_is_refused_for_a_deleted_user(api, db):
+    client = api(router)
+    tokens = login(client)
+    user = asyncio.run(db.users.find_one({"email": USER["email"]}))
+    asyncio.run(db.users.delete_one({"_id": ObjectId(user["_id"])}))
+
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
@@ -0,0 +1,71 @@
+"""Tests for orjson rendering and trusted_response (python -m pytest)"""
+
+import asyncio
+import json
+from datetime import datetime
+import pytest
+from bson import ObjectId
+import fast_json
+import routes_audio_predictions
+import routes_predictions
+from auth import get_current_user
+from fast_json import FastJSONResponse
+
+pytest.importorskip("orjson")
+
+
+def test_fast_response_renders_datetimes_and_object_ids():
+    object_id = ObjectId()
+    body = FastJSONResponse({"id": object_id, "at": datetime(2024, 5, 1, 12, 30, 15, 123000), 1: float("nan")}).body
+
+    assert json.loads(body) == {"id": str(object_id), "at": "2024-05-01T12:30:15.123000", "1": None}
+
+
+def seed(db):
+    async def insert():
+        created_at = datetime(2024, 5, 1, 12, 30, 15, 123000)
+        await db.audio_predictions.insert_many([
+            {
+                "user_id": "user-1", "audio_filename": "a.wav", "audio_url": "/files/a.wav",
+                "predicted_label": "Hungry", "confidence": 91, "status": "stored", "created_at": created_at,
+                "prediction_result": {"predicted_label": "Hungry", "confidence": 91, "raw": [1, 2, 3]},
+            },
+            {
+                # Saved before the label backfill, with only a Cloudinary URL
+                "user_id": "user-1", "audio_filename": "b.wav", "cloudinary_url": "https://cdn/b.wav",
+                "created_at": datetime(2024, 5, 1, 12), "prediction_result": {"output": "Tired"},
+            },
+            {
+                "user_id": "user-1", "audio_filename": "c.wav", "audio_url": "", "status": "pending",
+                "predicted_label": None, "confidence": None, "created_at": datetime(2024, 4, 30),
+            },
+        ])
+        await db.predictions.insert_many([
+            {
+                "user_id": "user-1", "input_data": {"cry": [0.1, 0.2]}, "created_at": created_at,
+                "prediction_result": {"predicted_label": "Hungry", "nested": {"ok": True}},
+            },
+            {"user_id": "user-1", "input_data": {}, "prediction_result": {}, "created_at": datetime(2024, 4, 30)},
+        ])
+    asyncio.run(insert())
+
+
+@pytest.mark.parametrize("router, url", [
+    (routes_audio_predictions.router, "/audio-predictions/"),
+    (routes_predictions.router, "/predictions/"),
+])
+def test_trusted_response_matches_the_validated_one(api, db, monkeypatch, router, url):
+    seed(db)
+    client = api(router)
+    client.app.dependency_overrides[get_current_user] = lambda: "user-1"
+
+    def fetch(fast: bool):
+        monkeypatch.setattr(fast_json, "FAST_JSON_ENABLED", fast)
+        response = client.get(url, params={"limit": 2})
+        assert response.status_code == 200
+        # Byte for byte: 91 vs 91.0 or a datetime format difference would show
+        return response.content, response.headers.get("X-Next-Cursor")
+
+    validated, trusted = fetch(False), fetch(True)
+    assert trusted == validated
+    assert validated[1] is not None
@@ -0,0 +1,116 @@
+"""Tests for in-process inference and its features (python -m pytest)"""
+
+import asyncio
+import wave
+import numpy as np
+import pytest
+import inference
+from features import FEATURE_N_MFCC, FEATURE_SAMPLE_RATE, extract_features, extract_features_batch
+from inference import InferenceEngine, LinearRunner, ModelRunner, classify_file, classify_files, load_runner
+
+LABELS = ["Hungry", "Tired"]
+
+
+def write_wav(path, seconds: float, tone: float = 440.0):
+    t = np.arange(int(seconds * FEATURE_SAMPLE_RATE)) / FEATURE_SAMPLE_RATE
+    with wave.open(str(path), "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(FEATURE_SAMPLE_RATE)
+        writer.writeframes((np.sin(2 * np.pi * tone * t) * 0.5 * 32767).astype("<i2").tobytes())
+    return str(path)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / "model.npz"
+    weights = np.random.default_rng(0).normal(size=(2 * FEATURE_N_MFCC, len(LABELS)))
+    np.savez(path, weights=weights, labels=np.array(LABELS), scale=np.full(2 * FEATURE_N_MFCC, 10.0))
+    return str(path)
+
+
+@pytest.fixture
+def runner(model_path, monkeypatch):
+    runner = LinearRunner(model_path)
+    monkeypatch.setattr(inference, "_runner", runner)
+    return runner
+
+
+def test_batched_features_match_single_clip_features():
+    rng = np.random.default_rng(1)
+    clips = [rng.normal(size=length).astype(np.float32) for length in (16000, 8000, 100)]
+
+    for single, batched in zip((extract_features(clip) for clip in clips), extract_features_batch(clips)):
+        assert single.keys() == batched.keys()
+        for name in single:
+            np.testing.assert_allclose(single[name], batched[name], rtol=1e-4, atol=1e-4)
+    assert extract_features(clips[0])["mfcc_stats"].shape == (2 * FEATURE_N_MFCC,)
+
+
+def test_linear_runner_outputs_probabilities(model_path, tmp_path):
+    runner = load_runner(model_path)
+    probabilities = runner.predict(np.ones((3, 2 * FEATURE_N_MFCC), dtype=np.float32))
+
+    assert runner.labels == LABELS
+    assert probabilities.shape == (3, 2)
+    np.testing.assert_allclose(probabilities.sum(axis=1), 1.0, rtol=1e-5)
+
+    mismatched = tmp_path / "mismatched.npz"
+    np.savez(mismatched, weights=np.zeros((2 * FEATURE_N_MFCC, 3)), labels=np.array(LABELS))
+    with pytest.raises(ValueError):
+        LinearRunner(str(mismatched))
+    with pytest.raises(ValueError):
+        load_runner(str(tmp_path / "model.pt"))
+
+
+def test_runners_must_implement_predict():
+    with pytest.raises(TypeError):
+        ModelRunner()
+
+
+def test_result_has_the_remote_api_fields(tmp_path, monkeypatch):
+    path = tmp_path / "bias.npz"
+    np.savez(path, weights=np.zeros((2 * FEATURE_N_MFCC, 2)), bias=np.array([0.0, 1.0]), labels=np.array(LABELS))
+    monkeypatch.setattr(inference, "_runner", LinearRunner(str(path)))
+
+    result = classify_file(write_wav(tmp_path / "cry.wav", 0.5))
+    assert (result["predicted_label"], result["prediction_value"], result["confidence"]) == ("Tired", 1.0, 73.11)
+    assert result["probabilities"] == {"Hungry": 0.2689, "Tired": 0.7311}
+    assert result["audio_duration"] == 0.5
+    assert result["source"] == "in-process"
+    assert result["model_version"] == inference.INFERENCE_MODEL_VERSION
+
+
+def test_batch_matches_single_clips_and_reports_errors_per_clip(tmp_path, runner):
+    paths = [
+        write_wav(tmp_path / "a.wav", 1.0, 300),
+        str(tmp_path / "missing.wav"),
+        write_wav(tmp_path / "b.wav", 0.3, 900),
+    ]
+
+    batch = classify_files(paths)
+    assert "error" in batch[1]
+    for path, result in zip([paths[0], paths[2]], [batch[0], batch[2]]):
+        single = classify_file(path)
+        assert result["predicted_label"] == single["predicted_label"]
+        assert result["probabilities"] == pytest.approx(single["probabilities"], abs=1e-3)
+
+
+def test_engine_classifies_on_its_worker_pool(tmp_path, model_path):
+    engine = InferenceEngine(model_path, workers=1)
+    path = write_wav(tmp_path / "cry.wav", 0.5)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await engine.classify(path)
+        await engine.start()
+        try:
+            return await engine.classify(path), await engine.classify_batch([path, path])
+        finally:
+            engine.shutdown()
+
+    single, batch = asyncio.run(scenario())
+    assert single["predicted_label"] in LABELS
+    assert [result["predicted_label"] for result in batch] == [single["predicted_label"]] * 2
+    stats = engine.stats()
+    assert (stats["completed"], stats["failed"]) == (3, 0)
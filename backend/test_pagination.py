@@ -0,0 +1,94 @@
+"""Unit tests for pagination.py (python -m pytest)"""
+
+import asyncio
+import base64
+from datetime import datetime, timedelta
+import mongomock
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException, Response
+from repositories import AudioPredictionRepository
+from pagination import HISTORY_SORT, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, set_next_cursor
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123000)
+    last_id = ObjectId()
+    cursor = encode_cursor({"_id": last_id, "created_at": created_at})
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": last_id}},
+    ]}
+
+
+def test_pages_follow_each_other_without_gaps():
+    collection = mongomock.MongoClient().db.history
+    start = datetime(2024, 1, 1)
+    # Pairs share a created_at, so the _id tiebreak is exercised at page edges
+    collection.insert_many([{"created_at": start + timedelta(seconds=i // 2)} for i in range(10)])
+    expected = [doc["_id"] for doc in collection.find().sort(HISTORY_SORT)]
+
+    seen, query = [], {}
+    while True:
+        page = list(collection.find(query).sort(HISTORY_SORT).limit(3))
+        seen.extend(doc["_id"] for doc in page)
+        if len(page) < 3:
+            break
+        query = decode_cursor(encode_cursor(page[-1]))
+
+    assert seen == expected
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(b"[]").decode(),
+    base64.urlsafe_b64encode(b'{"t": "2024-01-01T00:00:00"}').decode(),
+    base64.urlsafe_b64encode(b'{"t": "yesterday", "id": "65f0c0ffee0000000000beef"}').decode(),
+    base64.urlsafe_b64encode(b'{"t": "2024-01-01T00:00:00", "id": "nope"}').decode(),
+])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_next_cursor_only_for_full_pages():
+    documents = [{"_id": ObjectId(), "created_at": datetime(2024, 1, 1)} for _ in range(3)]
+
+    full = Response()
+    set_next_cursor(full, documents, 3)
+    assert full.headers[NEXT_CURSOR_HEADER] == encode_cursor(documents[-1])
+
+    partial = Response()
+    set_next_cursor(partial, documents[:2], 3)
+    assert NEXT_CURSOR_HEADER not in partial.headers
+
+
+def test_label_filter_pages_over_documents_not_yet_backfilled(db):
+    start = datetime(2024, 1, 1)
+    docs = [
+        {"predicted_label": "Hungry", "prediction_result": {"predicted_label": "Hungry"}},
+        {"prediction_result": {"predicted_label": "Hungry"}},
+        {"prediction_result": {"output": "Hungry"}},
+        {"predicted_label": "Tired", "prediction_result": {"predicted_label": "Hungry"}},
+        {"prediction_result": {"predicted_label": "Tired", "output": "Hungry"}},
+        {"prediction_result": {"predicted_label": "Hungry"}},
+    ]
+
+    async def scenario():
+        audio_predictions = AudioPredictionRepository(db)
+        for i, doc in enumerate(docs):
+            await audio_predictions.insert({**doc, "user_id": "user-1", "created_at": start + timedelta(minutes=i)})
+        await audio_predictions.insert({**docs[1], "user_id": "user-2", "created_at": start})
+        seen, after = [], None
+        while True:
+            page = await audio_predictions.list_for_user("user-1", 0, 2, after, "Hungry")
+            seen.extend(doc["created_at"].minute for doc in page)
+            if len(page) < 2:
+                return seen
+            after = decode_cursor(encode_cursor(page[-1]))
+
+    assert asyncio.run(scenario()) == [5, 2, 1, 0]
@@ -0,0 +1,55 @@
+"""Tests for the password hashing pool's back-pressure (python -m pytest)"""
+
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+import auth
+from password_pool import PASSWORD_POOL_RETRY_AFTER, PasswordPool
+from routes_auth import router
+
+
+def test_saturated_pool_rejects_with_retry_after():
+    pool = PasswordPool(workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        # One call on the worker, one waiting for it: the pool is full
+        running = [asyncio.ensure_future(pool.run(release.wait, 5)) for _ in range(2)]
+        while pool._submitted < 2:
+            await asyncio.sleep(0)
+        assert pool.queue_depth == 1
+        with pytest.raises(HTTPException) as rejected:
+            await pool.run(lambda: "too many")
+        release.set()
+        return rejected.value, await asyncio.gather(*running)
+
+    try:
+        rejected, results = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    assert rejected.status_code == 503
+    assert rejected.headers == {"Retry-After": PASSWORD_POOL_RETRY_AFTER}
+    assert results == [True, True]
+    stats = pool.stats()
+    assert (stats["submitted"], stats["completed"], stats["rejected"], stats["in_flight"]) == (2, 2, 1, 0)
+
+
+def test_pool_runs_the_function_off_the_event_loop():
+    pool = PasswordPool(workers=2, max_queue=0)
+    try:
+        thread = asyncio.run(pool.run(lambda: threading.current_thread().name))
+    finally:
+        pool.shutdown()
+    assert thread.startswith("password-hash")
+
+
+def test_login_is_a_503_while_the_pool_is_saturated(api, monkeypatch):
+    client = api(router)
+    client.post("/auth/register", json={"email": "parent@example.com", "password": "secret123", "full_name": "P"})
+    # No workers and no queue: every call is turned away
+    monkeypatch.setattr(auth, "password_pool", PasswordPool(workers=0, max_queue=0))
+
+    response = client.post("/auth/login", json={"email": "parent@example.com", "password": "secret123"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == PASSWORD_POOL_RETRY_AFTER
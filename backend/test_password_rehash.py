@@ -0,0 +1,42 @@
+"""Tests for password hash cost upgrades on login (python -m pytest)"""
+
+import asyncio
+import auth
+from auth import build_password_context
+from routes_auth import router
+
+EMAIL, PASSWORD = "parent@example.com", "secret123"
+
+
+def stored_hash(db) -> str:
+    return asyncio.run(db.users.find_one({"email": EMAIL}))["hashed_password"]
+
+
+def login(client, password: str = PASSWORD) -> int:
+    return client.post("/auth/login", json={"email": EMAIL, "password": password}).status_code
+
+
+def test_login_rehashes_an_outdated_cost(api, db, monkeypatch):
+    client = api(router)
+    monkeypatch.setattr(auth, "pwd_context", build_password_context(["bcrypt"], bcrypt_rounds=4))
+    client.post("/auth/register", json={"email": EMAIL, "password": PASSWORD, "full_name": "P"})
+    assert stored_hash(db).startswith("$2b$04$")
+
+    monkeypatch.setattr(auth, "pwd_context", build_password_context(["bcrypt"], bcrypt_rounds=5))
+    assert login(client, "wrong-password") == 401
+    assert stored_hash(db).startswith("$2b$04$")
+
+    assert login(client) == 200
+    upgraded = stored_hash(db)
+    assert upgraded.startswith("$2b$05$")
+
+    # Already at the current cost: left alone
+    assert login(client) == 200
+    assert stored_hash(db) == upgraded
+
+
+def test_lower_configured_cost_also_counts_as_outdated():
+    old = build_password_context(["bcrypt"], bcrypt_rounds=5).hash(PASSWORD)
+    valid, new_hash = build_password_context(["bcrypt"], bcrypt_rounds=4).verify_and_update(PASSWORD, old)
+    assert valid
+    assert new_hash.startswith("$2b$04$")
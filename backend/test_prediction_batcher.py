@@ -0,0 +1,83 @@
+"""Tests for prediction micro-batching (python -m pytest)"""
+
+import asyncio
+import httpx
+import pytest
+from prediction_batcher import PredictionBatcher
+
+
+class Upstream:
+    """Batch endpoint echoing its inputs, recording the batches it got"""
+
+    def __init__(self, delay: float = 0.0, drop_last: bool = False):
+        self.delay = delay
+        self.drop_last = drop_last
+        self.batches = []
+
+    async def __call__(self, inputs):
+        self.batches.append([item["n"] for item in inputs])
+        await asyncio.sleep(self.delay)
+        results = [{"echo": item["n"]} for item in inputs]
+        return results[:-1] if self.drop_last else results
+
+
+def run(batcher: PredictionBatcher, count: int):
+    async def scenario():
+        results = await asyncio.gather(
+            *(batcher.submit({"n": n}) for n in range(count)), return_exceptions=True
+        )
+        await batcher.close()
+        return results
+    return asyncio.run(scenario())
+
+
+def test_requests_within_the_window_share_a_batch():
+    upstream = Upstream()
+    batcher = PredictionBatcher(upstream, window_ms=20, max_size=10, deadline_ms=1000)
+
+    assert run(batcher, 3) == [{"echo": 0}, {"echo": 1}, {"echo": 2}]
+    assert upstream.batches == [[0, 1, 2]]
+    assert batcher.stats()["window_flushes"] == 1
+
+
+def test_full_batches_are_sent_without_waiting_for_the_window():
+    upstream = Upstream()
+    batcher = PredictionBatcher(upstream, window_ms=20, max_size=2, deadline_ms=1000)
+
+    assert run(batcher, 5) == [{"echo": n} for n in range(5)]
+    assert upstream.batches == [[0, 1], [2, 3], [4]]
+    stats = batcher.stats()
+    assert (stats["size_flushes"], stats["window_flushes"], stats["avg_batch_size"]) == (2, 1, 1.67)
+
+
+def test_slow_batch_times_out_at_the_deadline():
+    upstream = Upstream(delay=0.2)
+    batcher = PredictionBatcher(upstream, window_ms=1, max_size=10, deadline_ms=50)
+
+    results = run(batcher, 2)
+    assert all(isinstance(result, httpx.TimeoutException) for result in results)
+    assert batcher.stats()["deadline_expired"] == 2
+
+
+def test_requests_expired_before_the_flush_are_not_sent():
+    upstream = Upstream()
+    batcher = PredictionBatcher(upstream, window_ms=100, max_size=10, deadline_ms=10)
+
+    async def scenario():
+        with pytest.raises(httpx.TimeoutException):
+            await batcher.submit({"n": 0})
+        await asyncio.sleep(0.15)
+        await batcher.close()
+
+    asyncio.run(scenario())
+    assert upstream.batches == []
+    assert batcher.stats()["window_flushes"] == 1
+
+
+def test_short_batch_response_fails_every_request():
+    upstream = Upstream(drop_last=True)
+    batcher = PredictionBatcher(upstream, window_ms=5, max_size=10, deadline_ms=1000)
+
+    results = run(batcher, 3)
+    assert all(isinstance(result, httpx.DecodingError) for result in results)
+    assert batcher.stats()["errors"] == 1
@@ -0,0 +1,104 @@
+"""Tests for the prediction result cache and the X-Prediction-Cache header (python -m pytest)"""
+
+import asyncio
+import time
+import httpx
+import pytest
+import prediction_client
+from auth import get_current_user
+from prediction_cache import (
+    CACHE_COALESCED,
+    CACHE_HIT_MEMORY,
+    CACHE_HIT_MONGO,
+    CACHE_MISS,
+    PredictionCache,
+    prediction_cache_key,
+)
+from prediction_client import fetch_prediction, get_prediction_client
+from repositories import PredictionCacheRepository, get_prediction_cache_repository
+from routes_predictions import router
+
+
+def test_key_ignores_field_order_but_not_the_model_version():
+    key = prediction_cache_key({"a": 1, "b": [1, 2]}, "v1")
+    assert prediction_cache_key({"b": [1, 2], "a": 1}, "v1") == key
+    assert prediction_cache_key({"a": 1, "b": [2, 1]}, "v1") != key
+    assert prediction_cache_key({"a": 1, "b": [1, 2]}, "v2") != key
+
+
+def test_memory_tier_evicts_least_recently_used_and_expires(monkeypatch):
+    cache = PredictionCache(max_size=2, ttl_seconds=60)
+
+    async def scenario():
+        for key in ("a", "b"):
+            await cache.put(key, {"key": key})
+        await cache.get("a")
+        await cache.put("c", {"key": "c"})
+        return [(await cache.get(key))[1] for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [CACHE_HIT_MEMORY, CACHE_MISS, CACHE_HIT_MEMORY]
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert asyncio.run(cache.get("a")) == (None, CACHE_MISS)
+
+
+def test_mongo_tier_is_shared_between_workers(db):
+    store = PredictionCacheRepository(db)
+    worker, other_worker = PredictionCache(10, 60), PredictionCache(10, 60)
+
+    async def scenario():
+        await worker.put("key", {"label": "Hungry"}, store)
+        return [await other_worker.get("key", store) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [({"label": "Hungry"}, CACHE_HIT_MONGO), ({"label": "Hungry"}, CACHE_HIT_MEMORY)]
+    assert other_worker.stats()["mongo_hits"] == 1
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Fresh caches and a mock prediction API counting its calls"""
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"label": "Hungry"})
+
+    monkeypatch.setattr(prediction_client, "PREDICTION_API_URL", "http://model.test/predict")
+    monkeypatch.setattr(prediction_client, "prediction_cache", PredictionCache(10, 60))
+    return calls, httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_header_reports_memory_and_mongo_hits(api, db, upstream, monkeypatch):
+    calls, client = upstream
+    app_client = api(router)
+    app_client.app.dependency_overrides.update({
+        get_current_user: lambda: "user-1",
+        get_prediction_client: lambda: client,
+        get_prediction_cache_repository: lambda: PredictionCacheRepository(db),
+    })
+
+    def post() -> str:
+        response = app_client.post("/predictions/", json={"input_data": {"cry": [0.1, 0.2]}})
+        assert response.status_code == 201
+        assert response.json()["prediction_result"] == {"label": "Hungry"}
+        return response.headers["X-Prediction-Cache"]
+
+    assert [post(), post()] == [CACHE_MISS, CACHE_HIT_MEMORY]
+    # A restarted (or another) worker starts with an empty memory tier
+    monkeypatch.setattr(prediction_client, "prediction_cache", PredictionCache(10, 60))
+    assert [post(), post()] == [CACHE_HIT_MONGO, CACHE_HIT_MEMORY]
+    assert len(calls) == 1
+
+
+def test_identical_concurrent_misses_share_one_call(upstream):
+    calls, client = upstream
+
+    async def scenario():
+        return await asyncio.gather(*(fetch_prediction(client, {"cry": [0.3]}) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert sorted(status for _, status in results) == [CACHE_COALESCED, CACHE_COALESCED, CACHE_MISS]
+    assert all(result == {"label": "Hungry"} for result, _ in results)
+    assert len(calls) == 1
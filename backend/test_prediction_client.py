@@ -0,0 +1,88 @@
+"""Tests for the shared prediction API client (python -m pytest)"""
+
+import asyncio
+import httpx
+import pytest
+import prediction_client
+from prediction_client import (
+    UpstreamTimings,
+    _post_upstream,
+    close_prediction_client,
+    get_prediction_client,
+    start_prediction_client,
+)
+
+
+def test_one_client_is_shared_until_closed():
+    async def scenario():
+        client = start_prediction_client()
+        shared = [start_prediction_client(), get_prediction_client()]
+        await close_prediction_client()
+        reopened = get_prediction_client()
+        await close_prediction_client()
+        return client, shared, reopened
+
+    client, shared, reopened = asyncio.run(scenario())
+    assert all(other is client for other in shared)
+    assert client.is_closed
+    assert reopened is not client and reopened.is_closed
+
+
+def test_calls_reuse_a_pooled_connection(monkeypatch):
+    timings = UpstreamTimings()
+    monkeypatch.setattr(prediction_client, "upstream_timings", timings)
+    connections = []
+
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Minimal keep-alive HTTP/1.1 server answering every request with {}
+        connections.append(writer)
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                return
+            length = next(
+                int(line.split(b":")[1]) for line in head.split(b"\r\n")
+                if line.lower().startswith(b"content-length")
+            )
+            await reader.readexactly(length)
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 2\r\n\r\n{}")
+            await writer.drain()
+
+    async def scenario():
+        server = await asyncio.start_server(serve, "127.0.0.1", 0)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/predict"
+        client = start_prediction_client()
+        try:
+            for _ in range(3):
+                assert await _post_upstream(client, url, {"cry": 1}) == {}
+        finally:
+            await close_prediction_client()
+            server.close()
+
+    asyncio.run(scenario())
+    assert len(connections) == 1
+    stats = timings.stats()
+    assert (stats["calls"], stats["new_connections"]) == (3, 1)
+
+
+def test_upstream_calls_and_errors_are_counted(monkeypatch):
+    timings = UpstreamTimings()
+    monkeypatch.setattr(prediction_client, "upstream_timings", timings)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/broken":
+            return httpx.Response(500)
+        return httpx.Response(200, json={"echo": request.read().decode()})
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            result = await _post_upstream(client, "http://model.test/predict", {"cry": 1})
+            with pytest.raises(httpx.HTTPStatusError):
+                await _post_upstream(client, "http://model.test/broken", {"cry": 1})
+            return result
+
+    assert asyncio.run(scenario()) == {"echo": '{"cry": 1}'}
+    stats = timings.stats()
+    assert (stats["calls"], stats["errors"]) == (1, 1)
+    assert stats["avg_total_ms"] > 0
@@ -0,0 +1,115 @@
+"""Unit tests for prediction_stats.py (python -m pytest)"""
+
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from audio_ingest import label_fields
+from repositories import AudioPredictionRepository, PredictionStatsRepository
+from prediction_stats import (
+    bucket_hour,
+    label_from_key,
+    label_key,
+    merge_increments,
+    rebuild_prediction_stats,
+    rescore_increment,
+    stats_increment,
+    stats_summary,
+)
+
+
+@pytest.mark.parametrize("label", [None, "", "Hungry", "Belly.Pain", "$set", "100%", "%00", "%01", "a.b$c%d"])
+def test_label_key_round_trip(label):
+    assert label_from_key(label_key(label)) == label
+
+
+@pytest.mark.parametrize("label", ["", "Belly.Pain", "$set", "a.b$c%d"])
+def test_label_key_is_a_valid_field_name(label):
+    key = label_key(label)
+    assert key
+    assert "." not in key
+    assert not key.startswith("$")
+
+
+def test_none_and_empty_labels_get_distinct_keys():
+    assert len({label_key(None), label_key(""), label_key("%00"), label_key("%01")}) == 4
+
+
+def test_bucket_hour_truncates_to_utc_hour():
+    assert bucket_hour(datetime(2024, 3, 1, 10, 45, 12, 5)) == datetime(2024, 3, 1, 10)
+    aware = datetime(2024, 3, 1, 10, 45, tzinfo=timezone.utc).astimezone()
+    assert bucket_hour(aware) == datetime(2024, 3, 1, 10)
+    assert bucket_hour(None) is None
+
+
+def test_stats_increment():
+    assert stats_increment({"predicted_label": "Hungry", "confidence": 80}) == {
+        "total": 1, "labels.Hungry": 1, "confidence_sum": 80.0, "confidence_count": 1
+    }
+    assert stats_increment({"predicted_label": "", "confidence": True}, -1) == {
+        "total": -1, f"labels.{label_key('')}": -1
+    }
+    assert stats_increment(None) == {"total": 1, f"labels.{label_key(None)}": 1}
+
+
+# Older results only carry the raw model output
+LABEL_RESULTS = [
+    {"predicted_label": "Hungry", "confidence": 80},
+    {"output": "Tired", "confidence": 60},
+    {"predicted_label": None, "output": "Tired"},
+    {"predicted_label": "", "output": "Tired"},
+    {"confidence": 50},
+]
+
+
+def test_counts_and_list_filter_use_the_same_label():
+    for result in LABEL_RESULTS:
+        label = label_fields(result)["predicted_label"]
+        assert f"labels.{label_key(label)}" in stats_increment(result)
+
+
+def test_rebuild_matches_the_increments(db):
+    async def scenario():
+        audio_predictions = AudioPredictionRepository(db)
+        prediction_stats = PredictionStatsRepository(db)
+        incremented = {}
+        for result in LABEL_RESULTS:
+            await audio_predictions.insert({
+                "user_id": "user-1", "prediction_result": result, "created_at": datetime(2024, 3, 1, 10)
+            })
+            merge_increments(incremented, stats_increment(result))
+        rebuilt = await rebuild_prediction_stats(audio_predictions, prediction_stats, "user-1")
+        return incremented, rebuilt["user-1"]
+
+    incremented, rebuilt = asyncio.run(scenario())
+    assert {f"labels.{key}": count for key, count in rebuilt["labels"].items()} == {
+        field: count for field, count in incremented.items() if field.startswith("labels.")
+    }
+    assert rebuilt["labels"][label_key("Tired")] == 2
+
+
+def test_rescore_moves_the_count_between_labels():
+    increment = rescore_increment(
+        {"predicted_label": "Hungry", "confidence": 70},
+        {"predicted_label": "Tired", "confidence": 90}
+    )
+    assert increment == {"labels.Hungry": -1, "labels.Tired": 1, "confidence_sum": 20.0}
+
+
+def test_merge_increments():
+    merged = merge_increments({"total": 1, "labels.Hungry": 1}, {"total": 1, "labels.Tired": 1})
+    assert merged == {"total": 2, "labels.Hungry": 1, "labels.Tired": 1}
+
+
+def test_stats_summary():
+    summary = stats_summary({
+        "total": 4,
+        "labels": {"Hungry": 3, label_key(""): 1, "Tired": 0},
+        "confidence_sum": 300.0,
+        "confidence_count": 4,
+    })
+    assert summary == {
+        "total_predictions": 4,
+        "predictions_by_label": [{"label": "Hungry", "count": 3}, {"label": "", "count": 1}],
+        "average_confidence": 75.0,
+    }
+    assert stats_summary(None) == {"total_predictions": 0, "predictions_by_label": [], "average_confidence": 0}
@@ -0,0 +1,57 @@
+"""Tests for rescore job stats bookkeeping (python -m pytest)"""
+
+import asyncio
+from datetime import datetime
+import rescore_jobs
+from prediction_stats import bucket_hour, rebuild_prediction_stats, stats_increment, stats_summary
+from repositories import AudioPredictionRepository, PredictionStatsRepository, RescoreJobRepository
+from rescore_jobs import INFERENCE_MODEL_VERSION, RescoreJobRunner, new_job
+
+
+def test_deleted_recording_does_not_move_the_counts(db, monkeypatch):
+    monkeypatch.setattr(rescore_jobs, "get_database", lambda: db)
+    audio_predictions = AudioPredictionRepository(db)
+    prediction_stats = PredictionStatsRepository(db)
+    jobs = RescoreJobRepository(db)
+
+    async def delete_like_the_route(prediction):
+        # What DELETE /audio-predictions/{id} does: remove the document, then its counts
+        await audio_predictions.delete(str(prediction["_id"]))
+        await prediction_stats.increment(
+            prediction["user_id"], bucket_hour(prediction["created_at"]),
+            stats_increment(prediction["prediction_result"], -1)
+        )
+
+    async def classify(predictions, run_batch):
+        async for prediction in predictions:
+            if prediction["audio_filename"] == "deleted.wav":
+                await delete_like_the_route(prediction)
+            yield prediction, {"predicted_label": "Tired", "confidence": 80.0, "model_version": INFERENCE_MODEL_VERSION}
+
+    monkeypatch.setattr(rescore_jobs, "iter_audio_batches", classify)
+
+    async def scenario():
+        now = datetime.utcnow()
+        for name in ("kept.wav", "deleted.wav"):
+            result = {"predicted_label": "Hungry", "confidence": 60.0}
+            await audio_predictions.insert({
+                "user_id": "user-1", "audio_filename": name, "status": "stored",
+                "prediction_result": result, "created_at": now
+            })
+            await prediction_stats.increment("user-1", bucket_hour(now), stats_increment(result))
+
+        job = {**new_job("user-1", "user-1"), "status": "running", "owner": None}
+        job["_id"] = (await jobs.collection.insert_one(job)).inserted_id
+        runner = RescoreJobRunner(checkpoint_every=10, lease_seconds=60, poll_seconds=1)
+        runner.owner = None
+        finished = await runner.run(job, jobs)
+
+        counted = stats_summary(await prediction_stats.get("user-1"))
+        rebuilt = await rebuild_prediction_stats(audio_predictions, prediction_stats, "user-1")
+        return finished, counted, stats_summary(rebuilt["user-1"])
+
+    finished, counted, rebuilt = asyncio.run(scenario())
+    assert finished["status"] == "completed"
+    assert finished["rescored"] == 1
+    assert counted == rebuilt
+    assert counted["predictions_by_label"] == [{"label": "Tired", "count": 1}]
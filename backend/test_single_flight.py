@@ -0,0 +1,99 @@
+"""Unit tests for single_flight.py (python -m pytest)"""
+
+import asyncio
+import pytest
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert [result for result, _ in results] == ["result"] * 5
+    assert [shared for _, shared in results] == [False, True, True, True, True]
+    assert flight.stats() == {"in_flight": 0, "calls_started": 1, "coalesced": 4}
+
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        return await asyncio.gather(
+            flight.do("a", lambda: work(1)),
+            flight.do("b", lambda: work(2))
+        )
+
+    assert asyncio.run(scenario()) == [(1, False), (2, False)]
+
+
+def test_key_is_released_after_the_call():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            return "done"
+
+        first = await flight.do("key", work)
+        await asyncio.sleep(0)
+        second = await flight.do("key", work)
+        return flight, first, second
+
+    flight, first, second = asyncio.run(scenario())
+    assert first == ("done", False)
+    assert second == ("done", False)
+    assert flight.stats()["calls_started"] == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_exception_reaches_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        return flight, await asyncio.gather(
+            *(flight.do("key", work) for _ in range(3)), return_exceptions=True
+        )
+
+    flight, results = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "result"
+
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == ("result", True)
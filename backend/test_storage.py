@@ -0,0 +1,98 @@
+"""Tests for the local storage backend and Range serving (python -m pytest)"""
+
+import asyncio
+import pytest
+import routes_audio_predictions
+from auth import get_current_user
+from routes_audio_predictions import _parse_range, router
+from storage import LocalStorage, StorageBackend, guess_content_type
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorage(str(tmp_path / "storage"))
+
+
+def test_put_file_stores_a_copy_under_the_key(tmp_path, storage):
+    source = tmp_path / "upload.tmp"
+    source.write_bytes(DATA)
+
+    stored = storage.put_file("audio_predictions/cry", source, "wav")
+    assert (stored.key, stored.size) == ("audio_predictions/cry.wav", len(DATA))
+    assert stored.url.endswith("/audio-predictions/files/audio_predictions/cry.wav")
+    assert b"".join(storage.get(stored.key)) == DATA
+    assert storage.size(stored.key) == len(DATA)
+    # No temporary .part file is left next to it
+    assert [path.name for path in storage.path(stored.key).parent.iterdir()] == ["cry.wav"]
+
+
+def test_read_range_is_inclusive_and_clamped(tmp_path, storage):
+    source = tmp_path / "upload.tmp"
+    source.write_bytes(DATA)
+    key = storage.put_file("cry", source, "wav").key
+    empty = tmp_path / "empty.tmp"
+    empty.write_bytes(b"")
+
+    assert storage.read_range(key, 0, 0) == DATA[:1]
+    assert storage.read_range(key, 10, 19) == DATA[10:20]
+    assert storage.read_range(key, 1000, 5000) == DATA[1000:]
+    assert storage.read_range(storage.put_file("empty", empty).key, 0, 10) == b""
+
+
+def test_keys_cannot_leave_the_storage_root(storage):
+    with pytest.raises(ValueError):
+        storage.path("../outside.wav")
+    storage.delete("missing.wav")
+
+
+def test_backends_must_implement_the_interface():
+    class Incomplete(StorageBackend):
+        def put(self, key, reader, extension="", tags=None):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 1023)),
+    ("bytes=-24", (1000, 1023)),
+    ("bytes=-5000", (0, 1023)),
+    ("bytes=1000-5000", (1000, 1023)),
+    ("bytes=5-9, 20-30", (5, 9)),
+    ("bytes=1024-", None),
+    ("bytes=10-5", None),
+    ("items=0-10", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, len(DATA)) == expected
+
+
+def test_file_endpoint_answers_range_requests(api, db, tmp_path, storage, monkeypatch):
+    source = tmp_path / "upload.tmp"
+    source.write_bytes(DATA)
+    key = storage.put_file("audio_predictions/cry", source, "wav").key
+    asyncio.run(db.audio_predictions.insert_one({"user_id": "user-1", "storage_key": key, "storage_backend": "local"}))
+    monkeypatch.setattr(routes_audio_predictions, "get_storage_backend", lambda name=None: storage)
+    client = api(router)
+    client.app.dependency_overrides[get_current_user] = lambda: "user-1"
+    url = f"/audio-predictions/files/{key}"
+
+    whole = client.get(url)
+    assert (whole.status_code, whole.content, whole.headers["Accept-Ranges"]) == (200, DATA, "bytes")
+
+    partial = client.get(url, headers={"Range": "bytes=10-19"})
+    assert (partial.status_code, partial.content) == (206, DATA[10:20])
+    assert partial.headers["Content-Range"] == f"bytes 10-19/{len(DATA)}"
+    assert partial.headers["Content-Type"] == guess_content_type(key)
+
+    unsatisfiable = client.get(url, headers={"Range": "bytes=5000-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["Content-Range"] == f"bytes */{len(DATA)}"
+
+    client.app.dependency_overrides[get_current_user] = lambda: "user-2"
+    assert client.get(url).status_code == 404
@@ -0,0 +1,79 @@
+"""Tests for token_cache.py and token revocation in auth.py (python -m pytest)"""
+
+import asyncio
+import time
+from datetime import timedelta
+import token_cache as token_cache_module
+from auth import create_access_token, decode_token, revoke_token, verify_token
+from repositories import RevokedTokenRepository
+from token_cache import TokenCache
+
+
+def test_entries_expire_with_the_token(monkeypatch):
+    cache = TokenCache(max_size=10, ttl_seconds=300)
+    now = time.time()
+    cache.put("token", {"sub": "user", "exp": now + 5})
+
+    assert cache.get("token") == {"sub": "user", "exp": now + 5}
+    monkeypatch.setattr(token_cache_module.time, "time", lambda: now + 6)
+    assert cache.get("token") is None
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    cache = TokenCache(max_size=10, ttl_seconds=60)
+    now = time.time()
+    cache.put("token", {"sub": "user", "exp": now + 3600})
+
+    monkeypatch.setattr(token_cache_module.time, "time", lambda: now + 61)
+    assert cache.get("token") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TokenCache(max_size=2, ttl_seconds=60)
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    cache.get("a")
+    cache.put("c", {"sub": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"sub": "a"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_revocation_drops_cached_entries():
+    cache = TokenCache(max_size=10, ttl_seconds=60)
+    cache.put("token", {"sub": "user", "jti": "abc", "exp": time.time() + 60})
+    cache.revoke("abc", time.time() + 60)
+
+    assert cache.get("token") is None
+    assert cache.is_revoked("abc")
+    assert not cache.is_revoked("other")
+
+
+def test_expired_revocations_are_forgotten():
+    cache = TokenCache(max_size=10, ttl_seconds=60)
+    cache.revoke("old", time.time() - 1)
+    cache.revoke("new", time.time() + 60)
+
+    assert not cache.is_revoked("old")
+    assert cache.is_revoked("new")
+
+
+def test_revocation_reaches_other_workers(db, monkeypatch):
+    """A worker whose own cache never saw the revocation still rejects the token"""
+    revoked_tokens = RevokedTokenRepository(db)
+    token = create_access_token({"sub": "user"}, timedelta(minutes=5))
+
+    async def scenario():
+        monkeypatch.setattr("auth.token_cache", TokenCache(10, 60))
+        assert await verify_token(token, revoked_tokens) is not None
+        await revoke_token(decode_token(token), revoked_tokens)
+
+        # A fresh process: empty cache and no local revocations
+        monkeypatch.setattr("auth.token_cache", TokenCache(10, 60))
+        return await verify_token(token, revoked_tokens)
+
+    assert asyncio.run(scenario()) is None
+    stored = asyncio.run(db.revoked_tokens.find_one({}))
+    assert stored["_id"] == decode_token(token)["jti"]
+    assert stored["expires_at"] is not None
@@ -0,0 +1,82 @@
+"""Tests for trend buckets across time zones and DST (python -m pytest)"""
+
+import asyncio
+from datetime import date, datetime
+import pytest
+from auth import get_current_user
+from prediction_stats import trend_buckets, trend_range
+from routes_audio_predictions import ZoneInfo, router
+
+PARIS = ZoneInfo("Europe/Paris")
+
+
+def test_day_buckets_follow_local_midnight_across_spring_forward():
+    start, end, keys = trend_range("day", PARIS, datetime(2024, 3, 30), datetime(2024, 4, 2))
+
+    assert keys == [date(2024, 3, 30), date(2024, 3, 31), date(2024, 4, 1)]
+    assert (start, end) == (datetime(2024, 3, 29, 23), datetime(2024, 4, 1, 22))
+
+    # 2024-03-31 is 23 hours long: 00:30 local is 23:30 UTC the day before, then 22:30 UTC
+    rollups = [
+        {"hour": datetime(2024, 3, 30, 23), "total": 1, "labels": {"Hungry": 1}},
+        {"hour": datetime(2024, 3, 31, 22), "total": 2, "labels": {"Tired": 2}},
+    ]
+    buckets = trend_buckets(rollups, "day", PARIS, keys)
+    assert [(bucket["start"], bucket["total_predictions"]) for bucket in buckets] == [
+        ("2024-03-30T00:00:00+01:00", 0),
+        ("2024-03-31T00:00:00+01:00", 1),
+        ("2024-04-01T00:00:00+02:00", 2),
+    ]
+
+
+def test_hour_buckets_include_the_repeated_hour_at_fall_back():
+    start, end, keys = trend_range("hour", PARIS, datetime(2024, 10, 27, 0), datetime(2024, 10, 27, 4))
+
+    # 00:00-04:00 local on that day is five hours: 02:00 happens twice
+    assert len(keys) == 5
+    assert (start, end) == (datetime(2024, 10, 26, 22), datetime(2024, 10, 27, 3))
+    starts = [bucket["start"] for bucket in trend_buckets([], "hour", PARIS, keys)]
+    assert starts[2:4] == ["2024-10-27T02:00:00+02:00", "2024-10-27T02:00:00+01:00"]
+
+
+def test_week_buckets_start_on_monday():
+    _, _, keys = trend_range("week", PARIS, datetime(2024, 3, 27), datetime(2024, 4, 10))
+    assert keys == [date(2024, 3, 25), date(2024, 4, 1), date(2024, 4, 8)]
+
+
+def test_empty_and_oversized_ranges_are_rejected():
+    with pytest.raises(ValueError):
+        trend_range("day", PARIS, datetime(2024, 4, 2), datetime(2024, 4, 1))
+    with pytest.raises(ValueError):
+        trend_range("hour", PARIS, datetime(2000, 1, 1), datetime(2024, 1, 1))
+
+
+def test_trends_endpoint_groups_recordings_by_local_day(api, db):
+    async def seed():
+        for created_at, label in [
+            (datetime(2024, 3, 30, 22, 59), "Hungry"),  # 23:59 on the 30th in Paris
+            (datetime(2024, 3, 30, 23, 1), "Hungry"),   # 00:01 on the 31st
+            (datetime(2024, 3, 31, 21, 59), "Tired"),   # 23:59 on the 31st (after the change)
+            (datetime(2024, 3, 31, 22, 1), "Tired"),    # 00:01 on 1 April
+        ]:
+            await db.audio_predictions.insert_one({
+                "user_id": "user-1", "created_at": created_at,
+                "prediction_result": {"predicted_label": label, "confidence": 50.0}
+            })
+
+    asyncio.run(seed())
+    client = api(router)
+    client.app.dependency_overrides[get_current_user] = lambda: "user-1"
+    params = {"granularity": "day", "start": "2024-03-30T00:00:00", "end": "2024-04-02T00:00:00", "tz": "Europe/Paris"}
+
+    response = client.get("/audio-predictions/stats/trends", params=params)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["end"] == "2024-04-02T00:00:00+02:00"
+    assert [bucket["total_predictions"] for bucket in body["buckets"]] == [1, 2, 1]
+    assert body["buckets"][1]["predictions_by_label"] == [
+        {"label": "Hungry", "count": 1}, {"label": "Tired", "count": 1}
+    ]
+
+    assert client.get("/audio-predictions/stats/trends", params={**params, "tz": "Mars/Olympus"}).status_code == 400
+    assert client.get("/audio-predictions/stats/trends", params={**params, "granularity": "month"}).status_code == 400
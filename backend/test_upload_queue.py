@@ -0,0 +1,140 @@
+"""Tests for the background upload queue (python -m pytest)"""
+
+import asyncio
+import io
+from datetime import datetime
+import pytest
+from bson import ObjectId
+import upload_queue as upload_queue_module
+from storage import LocalStorage
+from upload_queue import AUDIO_STATUS_FAILED, AUDIO_STATUS_PENDING, AUDIO_STATUS_STORED, UploadQueue
+
+
+class FlakyStorage(LocalStorage):
+    """Local storage whose first `failures` uploads raise; `during_put` runs inside the upload"""
+
+    def __init__(self, root, failures=0, during_put=None):
+        super().__init__(root)
+        self.failures = failures
+        self.during_put = during_put
+        self.calls = 0
+
+    def put_file(self, key, path, extension="", tags=None):
+        self.calls += 1
+        if self.during_put:
+            self.during_put()
+        if self.calls <= self.failures:
+            raise ConnectionError("storage unavailable")
+        return super().put_file(key, path, extension, tags)
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    spool = LocalStorage(str(tmp_path / "spool"))
+    monkeypatch.setattr(upload_queue_module, "_spool_storage", spool)
+    return spool
+
+
+def use(monkeypatch, db, storage):
+    monkeypatch.setattr(upload_queue_module, "get_database", lambda: db)
+    monkeypatch.setattr(upload_queue_module, "get_storage_backend", lambda name=None: storage)
+
+
+def pending_upload(db, spool, **fields) -> str:
+    spooled = spool.put("clip.wav", io.BytesIO(b"RIFFdata"))
+    result = asyncio.run(db.audio_predictions.insert_one({
+        "user_id": "user-1",
+        "storage_backend": "local",
+        "storage_key": "audio_predictions/clip",
+        "spool_key": spooled.key,
+        "status": AUDIO_STATUS_PENDING,
+        "created_at": datetime.utcnow(),
+        **fields
+    }))
+    return str(result.inserted_id)
+
+
+def document(db, prediction_id):
+    return asyncio.run(db.audio_predictions.find_one({"_id": ObjectId(prediction_id)}))
+
+
+def files(storage):
+    return sorted(path.name for path in storage.root.rglob("*") if path.is_file())
+
+
+def test_upload_is_retried_with_backoff(db, spool, tmp_path, monkeypatch):
+    storage = FlakyStorage(str(tmp_path / "storage"), failures=2)
+    use(monkeypatch, db, storage)
+    queue = UploadQueue(workers=1, max_size=10, max_attempts=3, backoff_seconds=0)
+    prediction_id = pending_upload(db, spool)
+
+    asyncio.run(queue._process(prediction_id))
+
+    doc = document(db, prediction_id)
+    assert doc["status"] == AUDIO_STATUS_STORED
+    assert "spool_key" not in doc
+    assert files(storage) == ["clip.wav"]
+    assert files(spool) == []
+    assert queue.stats()["retries"] == 2
+
+
+def test_failed_upload_is_retried_on_start_until_max_runs(db, spool, tmp_path, monkeypatch):
+    storage = FlakyStorage(str(tmp_path / "storage"), failures=100)
+    use(monkeypatch, db, storage)
+    queue = UploadQueue(workers=1, max_size=10, max_attempts=1, backoff_seconds=0, max_runs=2)
+    audio_predictions = upload_queue_module.AudioPredictionRepository(db)
+    prediction_id = pending_upload(db, spool)
+
+    asyncio.run(queue._process(prediction_id))
+    doc = document(db, prediction_id)
+    assert doc["status"] == AUDIO_STATUS_FAILED
+    assert doc["upload_failures"] == 1
+    # Kept for the retry on the next start
+    assert files(spool) == ["clip.wav"]
+
+    assert asyncio.run(audio_predictions.retry_failed_uploads(queue.max_runs)) == 1
+    assert document(db, prediction_id)["status"] == AUDIO_STATUS_PENDING
+    asyncio.run(queue._process(prediction_id))
+
+    doc = document(db, prediction_id)
+    assert doc["status"] == AUDIO_STATUS_FAILED
+    assert doc["upload_failures"] == 2
+    assert "spool_key" not in doc
+    assert files(spool) == []
+    assert asyncio.run(audio_predictions.retry_failed_uploads(queue.max_runs)) == 0
+
+
+def test_missing_spool_file_is_not_retried(db, spool, tmp_path, monkeypatch):
+    storage = FlakyStorage(str(tmp_path / "storage"))
+    use(monkeypatch, db, storage)
+    queue = UploadQueue(workers=1, max_size=10, max_attempts=3, backoff_seconds=0, max_runs=3)
+    prediction_id = pending_upload(db, spool)
+    spool.delete(document(db, prediction_id)["spool_key"])
+
+    asyncio.run(queue._process(prediction_id))
+
+    doc = document(db, prediction_id)
+    assert doc["status"] == AUDIO_STATUS_FAILED
+    assert doc["upload_error"] == "Spooled audio file is missing"
+    assert "spool_key" not in doc
+
+
+@pytest.mark.parametrize("content_sha256", [None, "abc"])
+def test_recording_deleted_while_uploading(db, spool, tmp_path, monkeypatch, content_sha256):
+    prediction_id = None
+
+    def delete_recording():
+            asyncio.run(db.audio_predictions.delete_one({"_id": ObjectId(prediction_id)}))
+
+    storage = FlakyStorage(str(tmp_path / "storage"), during_put=delete_recording)
+    use(monkeypatch, db, storage)
+    queue = UploadQueue(workers=1, max_size=10, max_attempts=1, backoff_seconds=0)
+    extra = {"content_sha256": content_sha256} if content_sha256 else {}
+    prediction_id = pending_upload(db, spool, **extra)
+
+    asyncio.run(queue._process(prediction_id))
+
+    # The uploaded object (or our reference to it) is dropped again
+    assert files(storage) == []
+    assert files(spool) == []
+    assert asyncio.run(db.audio_blobs.count_documents({})) == 0
@@ -0,0 +1,83 @@
+"""Unit tests for the part files behind resumable uploads (python -m pytest)"""
+
+import hashlib
+import os
+import time
+import pytest
+import upload_sessions
+from upload_sessions import PartFileWriter, collect_abandoned_parts, file_sha256
+from upload_stream import UploadTooLarge
+
+
+def write_chunk(path, offset, data, **kwargs):
+    writer = PartFileWriter(path, offset, **kwargs)
+    try:
+        writer.write(data)
+        return writer.digest.hexdigest()
+    finally:
+        writer.close()
+
+
+def test_chunks_are_written_at_their_offset(tmp_path):
+    path = tmp_path / "session.part"
+    first = write_chunk(path, 0, b"hello ")
+    second = write_chunk(path, 6, b"world")
+
+    assert path.read_bytes() == b"hello world"
+    assert first == hashlib.sha256(b"hello ").hexdigest()
+    assert second == hashlib.sha256(b"world").hexdigest()
+    assert file_sha256(path) == hashlib.sha256(b"hello world").hexdigest()
+
+
+def test_bytes_past_the_committed_offset_are_dropped(tmp_path):
+    path = tmp_path / "session.part"
+    path.write_bytes(b"committed" + b"partial chunk from a dropped connection")
+
+    write_chunk(path, len(b"committed"), b"!")
+
+    assert path.read_bytes() == b"committed!"
+
+
+def test_rollback_discards_the_chunk(tmp_path):
+    path = tmp_path / "session.part"
+    write_chunk(path, 0, b"abc")
+
+    writer = PartFileWriter(path, 3)
+    writer.write(b"bad chunk")
+    writer.rollback()
+    writer.close()
+
+    assert path.read_bytes() == b"abc"
+
+
+def test_oversized_chunk_is_rejected(tmp_path):
+    writer = PartFileWriter(tmp_path / "session.part", 0, max_chunk_bytes=4)
+    try:
+        writer.write(b"1234")
+        with pytest.raises(UploadTooLarge):
+            writer.write(b"5")
+    finally:
+        writer.close()
+
+
+def test_upload_past_the_file_limit_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_sessions, "MAX_AUDIO_UPLOAD_BYTES", 10)
+    writer = PartFileWriter(tmp_path / "session.part", 8)
+    try:
+        with pytest.raises(UploadTooLarge):
+            writer.write(b"abc")
+    finally:
+        writer.close()
+
+
+def test_only_stale_part_files_are_collected(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_sessions, "AUDIO_UPLOAD_SESSION_DIR", str(tmp_path))
+    stale, fresh = tmp_path / "stale.part", tmp_path / "fresh.part"
+    stale.write_bytes(b"x")
+    fresh.write_bytes(b"x")
+    old = time.time() - 7200
+    os.utime(stale, (old, old))
+
+    assert collect_abandoned_parts(max_age_seconds=3600) == ["stale"]
+    assert not stale.exists()
+    assert fresh.exists()
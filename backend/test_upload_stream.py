@@ -0,0 +1,62 @@
+"""Tests for chunked, size-limited upload reading (python -m pytest)"""
+
+import io
+import tempfile
+import pytest
+from fastapi import HTTPException, UploadFile
+from storage import LocalStorage
+from upload_stream import BoundedUploadReader, UploadTooLarge, open_upload_reader
+
+
+def test_reader_yields_bounded_chunks_and_counts_bytes():
+    reader = BoundedUploadReader(io.BytesIO(b"x" * 10), max_bytes=10, chunk_size=4)
+
+    assert [len(chunk) for chunk in reader] == [4, 4, 2]
+    assert reader.bytes_read == 10
+    # A retrying uploader rewinds the reader and starts counting again
+    reader.seek(0)
+    assert reader.bytes_read == 0
+    assert reader.read() == b"x" * 4
+
+
+def test_reader_stops_once_the_limit_is_passed():
+    reader = BoundedUploadReader(io.BytesIO(b"x" * 10), max_bytes=6, chunk_size=4)
+
+    assert reader.read() == b"x" * 4
+    with pytest.raises(UploadTooLarge):
+        reader.read()
+
+
+@pytest.mark.parametrize("spooled", [False, True])
+def test_too_large_upload_leaves_nothing_in_storage(tmp_path, spooled):
+    storage = LocalStorage(str(tmp_path))
+    if spooled:
+        # Backed by a real file: rejected from its size before copying
+        source = tempfile.TemporaryFile()
+        source.write(b"x" * 10)
+        source.seek(0)
+    else:
+        source = io.BytesIO(b"x" * 10)
+
+    with source, pytest.raises(UploadTooLarge):
+        storage.put("cry", BoundedUploadReader(source, max_bytes=6, chunk_size=4), "wav")
+    assert list(tmp_path.iterdir()) == []
+
+
+def upload(data: bytes, size=None) -> UploadFile:
+    file = tempfile.SpooledTemporaryFile()
+    file.write(data)
+    return UploadFile(file, size=size, filename="cry.wav")
+
+
+def test_open_upload_reader_rejects_a_known_oversize_upload():
+    with pytest.raises(HTTPException) as rejected:
+        open_upload_reader(upload(b"x" * 10, size=10), max_bytes=6)
+    assert rejected.value.status_code == 413
+
+
+def test_open_upload_reader_rewinds_the_spooled_upload():
+    reader = open_upload_reader(upload(b"RIFFdata"), max_bytes=100)
+
+    assert reader.name == "cry.wav"
+    assert b"".join(reader) == b"RIFFdata"
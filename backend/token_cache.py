@@ -0,0 +1,107 @@
+"""
+Cache of verified JWTs.
+
+The mobile app reuses the same bearer token for thousands of requests, so
+verified claims are kept in a bounded LRU keyed by the raw token. Entries
+never outlive the token's own `exp`, and tokens can be revoked by their
+`jti` claim (e.g. on logout), which also invalidates cached entries.
+
+The cache and its revocation list are per process. auth.revoke_token also
+records the jti in the revoked_tokens collection, which every worker checks
+before caching a token, so a revocation survives restarts and reaches the
+other workers once their cached entry lapses (TOKEN_CACHE_TTL_SECONDS at most).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+
+
+class TokenCache:
+    """Thread-safe LRU/TTL cache of token -> verified claims"""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # get_current_user is a sync dependency, so it runs on the threadpool
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # jti -> token exp, kept until the token would have expired anyway
+        self._revoked: Dict[str, float] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return cached claims, or None if missing, expired or revoked"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            expires_at, claims = entry
+            if expires_at <= now or claims.get("jti") in self._revoked:
+                del self._entries[token]
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(token)
+            self._hits += 1
+            return claims
+
+    def put(self, token: str, claims: Dict[str, Any]):
+        """Cache verified claims until min(exp, now + ttl)"""
+        if self.max_size <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+
+        with self._lock:
+            self._entries[token] = (expires_at, claims)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def revoke(self, jti: str, exp: Optional[float] = None):
+        """Revoke every token carrying this jti"""
+        if not jti:
+            return
+        now = time.time()
+        with self._lock:
+            self._revoked[jti] = float(exp) if exp else now + self.ttl_seconds
+            # Drop revocations whose tokens have expired on their own
+            for expired in [key for key, until in self._revoked.items() if until <= now]:
+                del self._revoked[expired]
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        with self._lock:
+            return jti is not None and jti in self._revoked
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for the /metrics endpoint"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0,
+                "evictions": self._evictions,
+                "revoked": len(self._revoked),
+            }
+
+
+token_cache = TokenCache(TOKEN_CACHE_MAX_SIZE, TOKEN_CACHE_TTL_SECONDS)
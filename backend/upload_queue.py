@@ -0,0 +1,247 @@
+"""
+Background upload queue for asynchronous audio ingest.
+
+With AUDIO_INGEST_MODE=async, POST /audio-predictions spools the recording to
+AUDIO_SPOOL_DIR, inserts the document with status "pending" and returns 202
+straight away. A fixed number of asyncio workers drain a bounded queue: each
+job uploads the spooled file to the document's storage backend (in a thread,
+retrying with exponential backoff) and flips the document to "stored" or
+"failed". Documents still pending after a restart are re-queued on startup,
+and so are failed ones until they have failed UPLOAD_MAX_RUNS times; then
+their spool file is deleted.
+Deduplicated recordings (see audio_ingest.py) take a reference on the
+audio_blobs entry instead of uploading again when the content is already
+stored.
+"""
+
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from database import get_database
+from repositories import AudioBlobRepository, AudioPredictionRepository
+from storage import LocalStorage, StoredObject, get_storage_backend
+from audio_normalize import media_fields, normalize_for_storage, remove_normalized
+
+load_dotenv()
+
+# "sync" uploads inside the request (the original behaviour), "async" uses the queue
+AUDIO_INGEST_MODE = os.getenv("AUDIO_INGEST_MODE", "sync").lower()
+AUDIO_SPOOL_DIR = os.getenv("AUDIO_SPOOL_DIR", "uploads/spool")
+UPLOAD_QUEUE_WORKERS = int(os.getenv("UPLOAD_QUEUE_WORKERS", "2"))
+UPLOAD_QUEUE_MAX_SIZE = int(os.getenv("UPLOAD_QUEUE_MAX_SIZE", "100"))
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "4"))
+# Failed uploads are retried on the next startups until they have failed this often
+UPLOAD_MAX_RUNS = int(os.getenv("UPLOAD_MAX_RUNS", "3"))
+# Delay before the first retry; doubles on every further attempt
+UPLOAD_RETRY_BACKOFF_SECONDS = float(os.getenv("UPLOAD_RETRY_BACKOFF_SECONDS", "1"))
+
+# Values of the audio_predictions "status" field
+AUDIO_STATUS_PENDING = "pending"
+AUDIO_STATUS_STORED = "stored"
+AUDIO_STATUS_FAILED = "failed"
+
+_spool_storage: Optional[LocalStorage] = None
+
+
+def get_spool_storage() -> LocalStorage:
+    """Local directory holding recordings that wait for upload"""
+    global _spool_storage
+    if _spool_storage is None:
+        _spool_storage = LocalStorage(AUDIO_SPOOL_DIR)
+    return _spool_storage
+
+
+class UploadQueue:
+    """Bounded queue of pending audio uploads drained by a fixed worker pool"""
+
+    def __init__(self, workers: int, max_size: int, max_attempts: int, backoff_seconds: float, max_runs: int = 1):
+        self.workers = workers
+        self.max_size = max_size
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.max_runs = max(1, max_runs)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._active = 0
+        self._enqueued = 0
+        self._rejected = 0
+        self._stored = 0
+        self._failed = 0
+        self._retries = 0
+
+    def start(self):
+        """Start the workers and re-queue documents left pending (or failed) by a previous run"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._requeue_pending()))
+
+    async def stop(self):
+        """Cancel the workers; unfinished uploads stay pending until the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def enqueue(self, prediction_id: str) -> bool:
+        """Queue an upload; False when the queue is full or not running"""
+        if self._queue is None:
+            self._rejected += 1
+            return False
+        try:
+            self._queue.put_nowait(prediction_id)
+        except asyncio.QueueFull:
+            self._rejected += 1
+            return False
+        self._enqueued += 1
+        return True
+
+    def has_room(self) -> bool:
+        return self._queue is not None and not self._queue.full()
+
+    async def _requeue_pending(self):
+        try:
+            audio_predictions = AudioPredictionRepository(get_database())
+            retried = await audio_predictions.retry_failed_uploads(self.max_runs)
+            if retried:
+                print(f"✓ Retrying {retried} failed audio uploads")
+            pending = await audio_predictions.list_pending_ids()
+        except Exception as e:
+            print(f"Warning: Could not load pending audio uploads: {e}")
+            return
+        for prediction_id in pending:
+            # Waits for room instead of dropping recovered uploads
+            await self._queue.put(prediction_id)
+            self._enqueued += 1
+        if pending:
+            print(f"✓ Re-queued {len(pending)} pending audio uploads")
+
+    async def _worker(self):
+        while True:
+            prediction_id = await self._queue.get()
+            self._active += 1
+            try:
+                await self._process(prediction_id)
+            except Exception as e:
+                print(f"Warning: Audio upload {prediction_id} crashed: {e}")
+            finally:
+                self._active -= 1
+                self._queue.task_done()
+
+    async def _process(self, prediction_id: str):
+        audio_predictions = AudioPredictionRepository(get_database())
+        prediction = await audio_predictions.find_by_id(prediction_id)
+        if not prediction or prediction.get("status") != AUDIO_STATUS_PENDING:
+            return
+
+        storage = get_storage_backend(prediction["storage_backend"])
+        content_hash = prediction.get("content_sha256")
+        audio_blobs = AudioBlobRepository(get_database())
+        spool_path = get_spool_storage().path(prediction["spool_key"])
+        tags = [prediction["user_id"], "audio_prediction"]
+        stored = None
+        media: Dict[str, Any] = {}
+        error = ""
+
+        # An identical recording may have been stored since this one was spooled
+        blob = await audio_blobs.acquire(content_hash, storage.name) if content_hash else None
+        if blob is not None:
+            stored = StoredObject(blob["storage_key"], blob["audio_url"], blob["size"])
+            media = blob.get("media") or {}
+
+        normalized = await normalize_for_storage(spool_path) if stored is None else None
+        if normalized is not None:
+            source, extension = normalized.path, normalized.extension
+            media = media_fields(normalized)
+        else:
+            source, extension = spool_path, spool_path.suffix.lstrip(".")
+
+        try:
+            for attempt in range(1, self.max_attempts + 1 if stored is None else 1):
+                try:
+                    stored = await run_in_threadpool(
+                        storage.put_file, prediction["storage_key"], source, extension, tags
+                    )
+                    break
+                except FileNotFoundError:
+                    error = "Spooled audio file is missing"
+                    break
+                except Exception as e:
+                    error = f"Failed to upload audio to {storage.name} storage: {e}"
+                    if attempt < self.max_attempts:
+                        self._retries += 1
+                        await asyncio.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+        finally:
+            remove_normalized(normalized)
+
+        if stored is None:
+            self._failed += 1
+            failures = prediction.get("upload_failures", 0) + 1
+            # The spool file is kept for a retry on the next start, up to max_runs
+            give_up = failures >= self.max_runs or not spool_path.exists()
+            failed = await audio_predictions.finish_upload(prediction_id, {
+                "status": AUDIO_STATUS_FAILED,
+                "upload_error": error,
+                "upload_failures": failures
+            }, unset=["spool_key"] if give_up else None)
+            if failed and give_up:
+                get_spool_storage().delete(prediction["spool_key"])
+            return
+
+        if content_hash and blob is None:
+            blob = await audio_blobs.add_reference(content_hash, storage.name, {
+                "storage_key": stored.key,
+                "audio_url": stored.url,
+                "size": stored.size,
+                "media": media
+            })
+            stored = StoredObject(blob["storage_key"], blob["audio_url"], blob["size"])
+            media = blob.get("media") or {}
+
+        updated = await audio_predictions.finish_upload(prediction_id, {
+            **media,
+            "status": AUDIO_STATUS_STORED,
+            "storage_key": stored.key,
+            "audio_url": stored.url,
+            "audio_size": media.get("audio_size") or prediction.get("audio_size") or stored.size
+        }, unset=["spool_key", "upload_error"])
+        if not updated:
+            # Deleted while the upload was running: drop our reference (or the object)
+            if content_hash:
+                released = await audio_blobs.release(content_hash, storage.name)
+                orphan_key = released["storage_key"] if released else None
+            else:
+                orphan_key = stored.key
+            if orphan_key:
+                await run_in_threadpool(storage.delete, orphan_key)
+        else:
+            self._stored += 1
+        get_spool_storage().delete(prediction["spool_key"])
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue counters for the /metrics endpoint"""
+        return {
+            "mode": AUDIO_INGEST_MODE,
+            "workers": self.workers,
+            "max_size": self.max_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "active": self._active,
+            "enqueued": self._enqueued,
+            "rejected": self._rejected,
+            "stored": self._stored,
+            "failed": self._failed,
+            "retries": self._retries,
+        }
+
+
+upload_queue = UploadQueue(
+    UPLOAD_QUEUE_WORKERS,
+    UPLOAD_QUEUE_MAX_SIZE,
+    UPLOAD_MAX_ATTEMPTS,
+    UPLOAD_RETRY_BACKOFF_SECONDS,
+    UPLOAD_MAX_RUNS
+)
@@ -0,0 +1,126 @@
+"""
+On-disk part files for resumable audio uploads.
+
+A resumable upload is a session document (upload_sessions collection) plus
+one part file under AUDIO_UPLOAD_SESSION_DIR. Each chunk is written at the
+session's committed offset and hashed on the way in; a chunk whose checksum
+does not match is truncated away, so a client only ever resends the chunk
+that failed. Sessions idle for longer than AUDIO_UPLOAD_SESSION_TTL_SECONDS
+are dropped by a TTL index, and a periodic sweep deletes their part files.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+from upload_stream import MAX_AUDIO_UPLOAD_BYTES, UploadTooLarge
+
+load_dotenv()
+
+AUDIO_UPLOAD_SESSION_DIR = os.getenv("AUDIO_UPLOAD_SESSION_DIR", "uploads/sessions")
+AUDIO_UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("AUDIO_UPLOAD_SESSION_TTL_SECONDS", str(24 * 3600)))
+AUDIO_UPLOAD_MAX_CHUNK_BYTES = int(os.getenv("AUDIO_UPLOAD_MAX_CHUNK_BYTES", str(8 * 1024 * 1024)))
+AUDIO_UPLOAD_SESSION_GC_SECONDS = int(os.getenv("AUDIO_UPLOAD_SESSION_GC_SECONDS", "3600"))
+
+# Values of the upload_sessions "status" field
+SESSION_OPEN = "open"
+SESSION_FINALIZING = "finalizing"
+
+
+def part_path(session_id: str) -> Path:
+    """Part file holding the bytes received so far for a session"""
+    root = Path(AUDIO_UPLOAD_SESSION_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    return root / f"{session_id}.part"
+
+
+class PartFileWriter:
+    """Writes one chunk into a part file at a given offset, hashing it as it goes"""
+
+    def __init__(self, path: Path, offset: int, max_chunk_bytes: int = AUDIO_UPLOAD_MAX_CHUNK_BYTES):
+        self.offset = offset
+        self.max_chunk_bytes = max_chunk_bytes
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self._file = open(path, "r+b" if path.exists() else "w+b")
+        # Drop anything past the committed offset left by an interrupted chunk
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_chunk_bytes or self.offset + self.size > MAX_AUDIO_UPLOAD_BYTES:
+            raise UploadTooLarge(self.offset + self.size)
+        self._file.write(data)
+        self.digest.update(data)
+
+    def rollback(self):
+        """Discard the chunk written so far"""
+        self._file.truncate(self.offset)
+
+    def close(self):
+        self._file.close()
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 of a whole part file, read in bounded chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def delete_part(session_id: str):
+    try:
+        part_path(session_id).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def collect_abandoned_parts(max_age_seconds: int = AUDIO_UPLOAD_SESSION_TTL_SECONDS) -> List[str]:
+    """Delete part files not written to within the session TTL; returns their session ids"""
+    cutoff = time.time() - max_age_seconds
+    removed = []
+    for path in Path(AUDIO_UPLOAD_SESSION_DIR).glob("*.part"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed.append(path.stem)
+        except FileNotFoundError:
+            continue
+    return removed
+
+
+_gc_task: Optional[asyncio.Task] = None
+
+
+async def _gc_loop():
+    while True:
+        try:
+            removed = await run_in_threadpool(collect_abandoned_parts)
+            if removed:
+                print(f"✓ Removed {len(removed)} abandoned upload part files")
+        except Exception as e:
+            print(f"Warning: Upload session cleanup failed: {e}")
+        await asyncio.sleep(AUDIO_UPLOAD_SESSION_GC_SECONDS)
+
+
+def start_session_gc():
+    """Start the periodic sweep of abandoned part files (called on app startup)"""
+    global _gc_task
+    if _gc_task is None:
+        _gc_task = asyncio.create_task(_gc_loop())
+
+
+async def stop_session_gc():
+    """Stop the sweep (called on app shutdown)"""
+    global _gc_task
+    if _gc_task is not None:
+        _gc_task.cancel()
+        await asyncio.gather(_gc_task, return_exceptions=True)
+        _gc_task = None
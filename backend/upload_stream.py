@@ -0,0 +1,94 @@
+"""
+Chunked, size-limited reading of uploaded audio.
+
+Starlette spools multipart uploads to a temporary file once they pass 1MB,
+so an UploadFile is cheap to hold. Reading it with `await file.read()` pulls
+the whole recording back into RAM; instead the storage backend is handed a
+file-like reader that yields bounded chunks and enforces the size limit as
+bytes flow through.
+"""
+
+import os
+from typing import BinaryIO, Optional
+from fastapi import HTTPException, UploadFile, status
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_AUDIO_UPLOAD_BYTES = int(os.getenv("MAX_AUDIO_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+# Cloudinary requires chunks of at least 5MB (except the last one)
+AUDIO_UPLOAD_CHUNK_SIZE = int(os.getenv("AUDIO_UPLOAD_CHUNK_SIZE", str(6 * 1024 * 1024)))
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds MAX_AUDIO_UPLOAD_BYTES"""
+
+
+def upload_too_large_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Audio file exceeds the {MAX_AUDIO_UPLOAD_BYTES} byte limit"
+    )
+
+
+class BoundedUploadReader:
+    """File-like wrapper that counts bytes read and enforces a size limit"""
+
+    def __init__(
+        self,
+        fileobj: BinaryIO,
+        max_bytes: int = MAX_AUDIO_UPLOAD_BYTES,
+        chunk_size: int = AUDIO_UPLOAD_CHUNK_SIZE,
+        name: Optional[str] = None
+    ):
+        self._file = fileobj
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.name = name or "stream"
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.chunk_size
+        data = self._file.read(size)
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise UploadTooLarge(self.bytes_read)
+        return data
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        position = self._file.seek(offset, whence)
+        if whence == os.SEEK_SET and offset == 0:
+            self.bytes_read = 0
+        return position
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def close(self):
+        # The UploadFile owns the underlying file and closes it after the request
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_upload_reader(upload: UploadFile, max_bytes: int = MAX_AUDIO_UPLOAD_BYTES) -> BoundedUploadReader:
+    """Wrap an UploadFile for streaming; rejects with 413 early when the size is known"""
+    if upload.size is not None and upload.size > max_bytes:
+        raise upload_too_large_error()
+    upload.file.seek(0)
+    return BoundedUploadReader(upload.file, max_bytes=max_bytes, name=upload.filename)